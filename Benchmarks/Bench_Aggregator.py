@@ -0,0 +1,201 @@
+"""
+Benchmark: DataAggregator and Analytics Queries
+Measures how every DataAggregator method and the Defect Analytics page computations scale with
+history size, over synthetic histories in the save_result schema. Each method is reported as a
+curve of (wafers, seconds, peak allocated MB) points.
+
+Usage:
+    python Benchmarks/Bench_Aggregator.py
+    python Benchmarks/Bench_Aggregator.py --sizes 10000 100000 1000000 --days 60
+    python Benchmarks/Bench_Aggregator.py --no-memory --output aggregator.json
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from Bench_Common import peak_rss_mb, write_report
+from Synthetic_Results import write_history
+
+from Repository.Data_Aggregator import DataAggregator
+
+import pandas as pd
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+DEFAULT_SIZES = [10000, 100000]
+DEFAULT_DAYS = 30
+DEFAULT_REPEAT = 3
+
+
+# ------------------------------------------------------------------------------------------
+# Analytics Page Computations
+# ------------------------------------------------------------------------------------------
+def analytics_filter(aggregator: DataAggregator, machine_types: List[str], start_date, end_date) -> List[Dict]:
+    """Machine type + simulation date range filter, as done by the Defect Analytics page."""
+    filtered = [r for r in aggregator.data if r.get('machine_type') in machine_types]
+    result = []
+    for r in filtered:
+        sim_date = r.get('simulation_date')
+        if sim_date and start_date <= datetime.strptime(sim_date, '%Y-%m-%d').date() <= end_date:
+            result.append(r)
+    return result
+
+
+def analytics_frame(records: List[Dict]) -> pd.DataFrame:
+    """DataFrame rebuild of the filtered records, as done by the Defect Analytics page."""
+    df = pd.DataFrame(records)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+
+def analytics_daily_trend(df: pd.DataFrame) -> pd.DataFrame:
+    """Per simulation date defect percentage and wafer count (trend charts)."""
+    return df.groupby('simulation_date').agg(
+        defect_percentage=('defect_percentage', 'mean'),
+        wafers=('wafer_id', 'count')
+    )
+
+
+# ------------------------------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------------------------------
+def measure(func: Callable, repeat: int, memory: bool) -> Dict:
+    """
+    Time a call (median of repeat) and, optionally, measure its peak Python allocation.
+
+    Memory is measured in a separate call so tracemalloc overhead does not skew the timing.
+
+    Returns:
+        Dictionary with seconds and peak_alloc_mb (None when memory is off)
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        finally:
+            tracemalloc.stop()
+    return {"seconds": round(durations[len(durations) // 2], 6), "peak_alloc_mb": peak_mb}
+
+
+def bench_size(results_dir: Path, num_wafers: int, repeat: int, memory: bool) -> Dict[str, Dict]:
+    """
+    Benchmark every aggregator method and page computation over one history.
+
+    Args:
+        results_dir: Directory holding the synthetic history
+        num_wafers: Number of wafers in the history (for progress output)
+        repeat: Timed calls per method
+        memory: Also measure peak allocations
+
+    Returns:
+        Dictionary method name -> {"seconds", "peak_alloc_mb"}
+    """
+    # Loads are slow at large sizes, so they are timed once. Every measured call uses a fresh
+    # aggregator: a second load on the same one would be served from its per-file cache
+    measurements = {"load_results": measure(lambda: DataAggregator(results_dir=results_dir).load_results(),
+                                            1, memory)}
+    aggregator = DataAggregator(results_dir=results_dir)
+    aggregator.load_results()
+    dates = aggregator.get_available_simulation_dates()
+    latest = dates[0]
+
+    measurements["load_results (simulation_date)"] = measure(
+        lambda: DataAggregator(results_dir=results_dir).load_results(simulation_date=latest), 1, memory)
+    measurements["refresh (no new results)"] = measure(aggregator.refresh, repeat, memory)
+
+    start_date = datetime.strptime(dates[-1], '%Y-%m-%d').date()
+    end_date = start_date + timedelta(days=len(dates) // 2)
+    filtered = analytics_filter(aggregator, ["Mechanical", "Electrical"], start_date, end_date)
+    frame = analytics_frame(filtered)
+
+    methods = {
+        "get_summary_statistics": aggregator.get_summary_statistics,
+        "get_machine_statistics": aggregator.get_machine_statistics,
+        "get_defect_distribution": aggregator.get_defect_distribution,
+        "get_date_statistics": aggregator.get_date_statistics,
+        "get_daily_statistics": lambda: aggregator.get_daily_statistics(latest),
+        "get_anomalies": aggregator.get_anomalies,
+        "get_machine_performance_ranking": aggregator.get_machine_performance_ranking,
+        "get_time_series_data": aggregator.get_time_series_data,
+        "get_available_simulation_dates": aggregator.get_available_simulation_dates,
+        "filter_by_simulation_date": lambda: aggregator.filter_by_simulation_date(latest),
+        "format_for_llm": aggregator.format_for_llm,
+        "analytics: filter": lambda: analytics_filter(aggregator, ["Mechanical", "Electrical"], start_date, end_date),
+        "analytics: dataframe": lambda: analytics_frame(filtered),
+        "analytics: daily trend": lambda: analytics_daily_trend(frame),
+    }
+    for name, func in methods.items():
+        print(f"  {name} ({num_wafers} wafers)...")
+        measurements[name] = measure(func, repeat, memory)
+    return measurements
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> Path:
+    """Run the aggregator benchmarks over each history size and write the JSON report."""
+    parser = argparse.ArgumentParser(description="Benchmark DataAggregator over synthetic histories")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="History sizes in wafers (10k to 10M)")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Simulation dates per history")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed calls per method")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (faster)")
+    parser.add_argument("--output", type=Path, default=None, help="Report file (default: Benchmarks/results/)")
+    args = parser.parse_args(argv)
+
+    curves = {}
+    histories = {}
+    for num_wafers in sorted(args.sizes):
+        with tempfile.TemporaryDirectory(prefix="bench_aggregator_") as tmp:
+            print(f"Generating {num_wafers} wafers over {args.days} dates...")
+            start = time.perf_counter()
+            manifests = write_history(Path(tmp), num_wafers, args.days)
+            histories[str(num_wafers)] = {
+                "generate_seconds": round(time.perf_counter() - start, 3),
+                "runs": len(manifests),
+                "disk_mb": round(sum(f.stat().st_size for f in Path(tmp).iterdir()) / (1024 * 1024), 2)
+            }
+            for name, point in bench_size(Path(tmp), num_wafers, args.repeat, not args.no_memory).items():
+                curves.setdefault(name, []).append({"wafers": num_wafers, **point})
+
+    config = {
+        "sizes": sorted(args.sizes),
+        "days": args.days,
+        "repeat": args.repeat,
+        "memory": not args.no_memory,
+        "pandas": pd.__version__
+    }
+    results = {"curves": curves, "histories": histories, "peak_rss_mb": peak_rss_mb()}
+    output = write_report("aggregator", config, results, args.output)
+
+    sizes = sorted(args.sizes)
+    print(f"\n{'Method':34s}" + "".join(f"{str(n) + ' wafers':>22s}" for n in sizes))
+    for name, points in curves.items():
+        cells = []
+        for point in points:
+            memory = f" / {point['peak_alloc_mb']:.1f} MB" if point["peak_alloc_mb"] is not None else ""
+            cells.append(f"{point['seconds'] * 1000:.1f} ms{memory}")
+        print(f"{name:34s}" + "".join(f"{cell:>22s}" for cell in cells))
+    print(f"\nPeak RSS: {results['peak_rss_mb']} MB")
+    print(f"Report saved to: {output}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
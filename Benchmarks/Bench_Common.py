@@ -0,0 +1,151 @@
+"""
+Shared Helpers for the Benchmark Scripts
+Environment fingerprint, peak memory, timing summaries and machine-readable JSON reports
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Make "Repository.*" importable when a benchmark is run as a script
+BASE_DIR = Path(__file__).parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from Repository.Performance_Monitor import LatencyHistogram
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+BENCH_RESULTS_DIR = Path(__file__).parent / "results"
+REPORT_VERSION = 1
+
+
+# ------------------------------------------------------------------------------------------
+# Environment
+# ------------------------------------------------------------------------------------------
+def git_commit() -> Optional[str]:
+    """Get the short hash of the checked-out commit (None outside a git checkout)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment() -> Dict:
+    """Describe the machine the benchmark ran on, so reports are only compared like for like."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Get the peak resident set size of this process so far.
+
+    Returns:
+        Peak RSS in MB, or None if it cannot be measured on this platform
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+# ------------------------------------------------------------------------------------------
+# Measurements
+# ------------------------------------------------------------------------------------------
+def summarize_seconds(samples: List[float]) -> Dict:
+    """
+    Summarize a list of durations with the pipeline's latency histogram.
+
+    Args:
+        samples: Durations in seconds
+
+    Returns:
+        Dictionary with count, mean, min, max and p50/p95/p99 in milliseconds
+    """
+    histogram = LatencyHistogram()
+    for seconds in samples:
+        histogram.record(seconds)
+    return histogram.to_dict()
+
+
+def time_call(func, *args, repeat: int = 1, **kwargs) -> Dict:
+    """
+    Time a function call.
+
+    Args:
+        func: Function to call
+        repeat: Number of calls (the median is reported)
+
+    Returns:
+        Dictionary with seconds (median) and peak_rss_mb after the calls
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    return {"seconds": round(durations[len(durations) // 2], 6), "peak_rss_mb": peak_rss_mb()}
+
+
+# ------------------------------------------------------------------------------------------
+# Reports
+# ------------------------------------------------------------------------------------------
+def write_report(name: str, config: Dict, results: Dict, output: Optional[Path] = None) -> Path:
+    """
+    Write a machine-readable benchmark report.
+
+    Reports share one layout (name, commit, environment, config, results), so two runs of the
+    same benchmark on the same machine can be diffed across commits.
+
+    Args:
+        name: Benchmark name (e.g. "pipeline")
+        config: Parameters the benchmark ran with
+        results: Measurements
+        output: Destination file (default: Benchmarks/results/<name>_<commit>_<timestamp>.json)
+
+    Returns:
+        Path to the report
+    """
+    commit = git_commit()
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if output is None:
+        BENCH_RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = BENCH_RESULTS_DIR / f"{name}_{commit or 'nogit'}_{timestamp}.json"
+    output = Path(output)
+    report = {
+        "version": REPORT_VERSION,
+        "benchmark": name,
+        "git_commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "environment": environment(),
+        "config": config,
+        "results": results
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    return output
@@ -0,0 +1,181 @@
+"""
+Benchmark: Import Time of the Entry Points
+Imports each entry module in a fresh interpreter with -X importtime and checks, as a
+regression guard, that non-inference entry points stay under their time budget, never load
+the inference stack (torch, torchvision, cv2, PIL) and create no files when imported.
+
+Usage:
+    python Benchmarks/Bench_Imports.py
+    python Benchmarks/Bench_Imports.py --repeat 5 --budget 0.5
+Exit status is 1 when a check fails.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from Bench_Common import BASE_DIR, write_report
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+# Modules that only the inference path (prediction, defect counting, rendering) may import
+INFERENCE_MODULES = ["torch", "torchvision", "cv2", "PIL"]
+
+# Entry module -> whether it must stay fast (False: only checked for inference imports)
+ENTRY_MODULES = {
+    "Repository.Data_Aggregator": True,
+    "Repository.LLM_Monitoring_Agent": True,
+    "Repository.Query_Processor": True,
+    "Repository.Summary_Generator": True,
+    "RUN_LLM_Agent": True,
+    "Repository.Result_Stream": True,
+    "Repository.Manufacturing_Simulation": False,
+}
+
+DEFAULT_BUDGET_SECONDS = 1.0
+DEFAULT_REPEAT = 3
+TOP_MODULES = 10
+
+# Directories an import must not create anything in
+WATCHED_DIRS = [BASE_DIR / "Manufacturing_Output", BASE_DIR / "LLM_Output"]
+
+# Run in the child interpreter: import the module, then report wall time and loaded inference modules
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {inference} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "inference_modules": loaded}}))
+"""
+
+
+# ------------------------------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------------------------------
+def snapshot_outputs() -> Set[str]:
+    """List every directory and non-image file under the watched output directories."""
+    paths = set()
+    for root in WATCHED_DIRS:
+        if not root.exists():
+            continue
+        paths.add(str(root))
+        for dirpath, dirnames, filenames in os.walk(root):
+            paths.update(os.path.join(dirpath, d) for d in dirnames)
+            paths.update(os.path.join(dirpath, f) for f in filenames if not f.endswith(".jpg"))
+    return paths
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    Parse -X importtime output.
+
+    Returns:
+        List of {"module", "self_ms", "cumulative_ms"}, slowest cumulative first
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            modules.append({
+                "module": name.strip(),
+                "self_ms": round(int(self_us) / 1000, 2),
+                "cumulative_ms": round(int(cumulative_us) / 1000, 2)
+            })
+        except ValueError:
+            continue
+    return sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)
+
+
+def profile_import(module: str, repeat: int) -> Dict:
+    """
+    Import a module in fresh interpreters and measure it.
+
+    Args:
+        module: Module to import
+        repeat: Number of fresh interpreters (the median time is reported)
+
+    Returns:
+        Dictionary with seconds, inference_modules, created_files, top_modules (or error)
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(BASE_DIR), os.environ.get("PYTHONPATH")])))
+    command = [sys.executable, "-X", "importtime", "-c",
+               CHILD_SCRIPT.format(module=module, inference=INFERENCE_MODULES)]
+    runs = []
+    created = set()
+    stderr = ""
+    for _ in range(repeat):
+        before = snapshot_outputs()
+        completed = subprocess.run(command, cwd=BASE_DIR, env=env, capture_output=True, text=True)
+        created |= snapshot_outputs() - before
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()
+            return {"error": error[-1] if error else f"exit status {completed.returncode}"}
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        stderr = completed.stderr
+
+    seconds = sorted(run["seconds"] for run in runs)
+    return {
+        "seconds": round(seconds[len(seconds) // 2], 4),
+        "inference_modules": runs[-1]["inference_modules"],
+        "created_files": sorted(os.path.relpath(p, BASE_DIR) for p in created),
+        "top_modules": parse_importtime(stderr)[:TOP_MODULES]
+    }
+
+
+def check(result: Dict, fast: bool, budget: float) -> List[str]:
+    """Return the failed checks of one entry module (empty if it passed)."""
+    if "error" in result:
+        return [f"import failed: {result['error']}"]
+    failures = []
+    if result["inference_modules"]:
+        failures.append(f"imports {', '.join(result['inference_modules'])}")
+    if result["created_files"]:
+        failures.append(f"creates {', '.join(result['created_files'])}")
+    if fast and result["seconds"] > budget:
+        failures.append(f"{result['seconds']:.3f}s > {budget:.3f}s budget")
+    return failures
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> int:
+    """Profile the entry modules, write the JSON report and return the exit status."""
+    parser = argparse.ArgumentParser(description="Profile and check the import time of the entry points")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Fresh interpreters per module")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Import time budget of the non-inference entry points (seconds)")
+    parser.add_argument("--modules", nargs="+", default=list(ENTRY_MODULES), help="Entry modules to profile")
+    parser.add_argument("--output", type=Path, default=None, help="Report file (default: Benchmarks/results/)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    failed = False
+    print(f"{'Module':40s} {'seconds':>8s}  status")
+    for module in args.modules:
+        result = profile_import(module, args.repeat)
+        failures = check(result, ENTRY_MODULES.get(module, True), args.budget)
+        result["failures"] = failures
+        results[module] = result
+        failed = failed or bool(failures)
+        seconds = f"{result['seconds']:8.3f}" if "seconds" in result else f"{'-':>8s}"
+        print(f"{module:40s} {seconds}  {'FAIL: ' + '; '.join(failures) if failures else 'ok'}")
+        for entry in result.get("top_modules", [])[:3]:
+            print(f"{'':44s}{entry['cumulative_ms']:8.1f} ms  {entry['module']}")
+
+    config = {"repeat": args.repeat, "budget_seconds": args.budget, "inference_modules": INFERENCE_MODULES}
+    output = write_report("imports", config, {"modules": results, "passed": not failed}, args.output)
+    print(f"\nReport saved to: {output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Benchmark: LLM Orchestration Overhead
+Runs LLMMonitoringAgent and QueryProcessor against the local mock LLM server (deterministic
+latency and token rate, no network, no API key) over a synthetic results history, and reports
+how much time our side adds on top of the simulated model: prompt building, client, retries,
+streaming and concurrency.
+
+Usage:
+    python Benchmarks/Bench_LLM.py
+    python Benchmarks/Bench_LLM.py --latency 0.5 --tokens-per-second 80 --calls 20 --concurrency 16
+    python Benchmarks/Bench_LLM.py --error-rate 0.2 --output llm.json
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from Bench_Common import summarize_seconds, peak_rss_mb, write_report
+from Synthetic_Results import write_history
+
+from Repository.Async_LLM_Client import AsyncLLMClient
+from Repository.Conversation_Session import ConversationSession
+from Repository.Data_Aggregator import DataAggregator
+from Repository.LLM_Context_Builder import ContextBuilder, count_tokens
+from Repository.LLM_Monitoring_Agent import LLMMonitoringAgent
+from Repository.Mock_LLM_Server import MockLLMServer
+from Repository.Query_Processor import QueryProcessor
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+DEFAULT_LATENCY = 0.2
+DEFAULT_TOKENS_PER_SECOND = 200.0
+DEFAULT_RESPONSE_TOKENS = 100
+DEFAULT_CALLS = 10
+DEFAULT_CONCURRENCY = 8
+DEFAULT_HISTORY_WAFERS = 5000
+
+MOCK_API_KEY = "sk-mock-benchmark"
+
+# The AI assistant's quick questions (one per main query type)
+QUERIES = [
+    "Which machine has the highest defect rate?",
+    "What are the most common defect types?",
+    "Show me recent anomalies",
+    "Why do we see Center defects?",
+]
+
+
+# ------------------------------------------------------------------------------------------
+# Scenarios
+# ------------------------------------------------------------------------------------------
+def bench_context(aggregator: DataAggregator) -> Dict:
+    """Prompt data context: build time and size against the token budget."""
+    builder = ContextBuilder(aggregator)
+    start = time.perf_counter()
+    builder.build()
+    return dict(builder.last_build, build_seconds=round(time.perf_counter() - start, 4))
+
+
+def bench_calls(agent: LLMMonitoringAgent, calls: int, server_seconds: float) -> Dict:
+    """Sequential _call_llm: latency and overhead over the simulated model time."""
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        agent._call_llm(f"Benchmark prompt {i}")
+        samples.append(time.perf_counter() - start)
+    summary = summarize_seconds(samples)
+    summary["overhead_ms"] = round((sum(samples) / len(samples) - server_seconds) * 1000, 2)
+    return summary
+
+
+def bench_answer_query(agent: LLMMonitoringAgent, calls: int, server_seconds: float) -> Dict:
+    """answer_query end to end (data refresh + prompt building + call)."""
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        agent.answer_query(f"{QUERIES[i % len(QUERIES)]} (run {i})")
+        samples.append(time.perf_counter() - start)
+    summary = summarize_seconds(samples)
+    summary["overhead_ms"] = round((sum(samples) / len(samples) - server_seconds) * 1000, 2)
+    return summary
+
+
+def bench_stream(agent: LLMMonitoringAgent, calls: int, latency: float) -> Dict:
+    """stream_answer_query: time to first token and total time."""
+    first_token, total = [], []
+    for i in range(calls):
+        start = time.perf_counter()
+        first = None
+        for _ in agent.stream_answer_query(f"{QUERIES[i % len(QUERIES)]} (stream {i})"):
+            if first is None:
+                first = time.perf_counter() - start
+        first_token.append(first)
+        total.append(time.perf_counter() - start)
+    return {
+        "time_to_first_token": summarize_seconds(first_token),
+        "total": summarize_seconds(total),
+        "first_token_overhead_ms": round((sum(first_token) / len(first_token) - latency) * 1000, 2)
+    }
+
+
+def bench_concurrent(agent: LLMMonitoringAgent, concurrency: int, server_seconds: float) -> Dict:
+    """_call_llm_many: wall time of independent calls run in parallel."""
+    start = time.perf_counter()
+    agent._call_llm_many([f"Concurrent prompt {i}" for i in range(concurrency)])
+    wall = time.perf_counter() - start
+    return {
+        "calls": concurrency,
+        "wall_seconds": round(wall, 4),
+        "sequential_server_seconds": round(concurrency * server_seconds, 4),
+        "speedup": round(concurrency * server_seconds / wall, 2)
+    }
+
+
+def bench_query_processor(processor: QueryProcessor, server_seconds: float) -> Dict:
+    """process_query per quick question (structured questions are answered locally)."""
+    results = {}
+    for query in QUERIES:
+        start = time.perf_counter()
+        result = processor.process_query(query, use_llm=True, refresh=True)
+        seconds = time.perf_counter() - start
+        results[query] = {"query_type": result["query_type"], "answered_by": result["answered_by"],
+                          "seconds": round(seconds, 4),
+                          "overhead_ms": round((seconds - server_seconds) * 1000, 2)}
+    return results
+
+
+def bench_batch(processor: QueryProcessor, server_seconds: float) -> Dict:
+    """process_queries vs one process_query per question, every question sent to the LLM."""
+    start = time.perf_counter()
+    for query in QUERIES:
+        processor.process_query(query, use_llm=True, refresh=True, deep=True)
+    sequential = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    results = processor.process_queries(QUERIES, use_llm=True, refresh=True, deep=True)
+    batch = time.perf_counter() - start
+    return {
+        "queries": len(QUERIES),
+        "sequential_seconds": round(sequential, 4),
+        "batch_seconds": round(batch, 4),
+        "speedup": round(sequential / batch, 2),
+        "per_query": {r["query"]: {"local_seconds": r["local_seconds"], "seconds": r["seconds"]} for r in results},
+        "server_seconds_per_call": round(server_seconds, 4)
+    }
+
+
+def bench_conversation(processor: QueryProcessor) -> Dict:
+    """Prompt tokens per turn of a conversation, against the same questions asked standalone."""
+    session = ConversationSession(processor.aggregator)
+    for query in QUERIES:
+        processor.process_query(query, use_llm=True, refresh=True, deep=True, session=session)
+    stats = session.stats()
+    standalone = [count_tokens(processor.llm_agent._build_query_prompt(query)) for query in QUERIES]
+    return dict(stats, standalone_turn_tokens=standalone)
+
+
+def bench_errors(agent: LLMMonitoringAgent, server: MockLLMServer, calls: int, error_rate: float) -> Dict:
+    """Sequential calls with injected 429s: success rate and time spent retrying."""
+    server.configure(error_rate=error_rate, retry_after=None)
+    retries_before = agent.llm_client.stats()["retries"]
+    samples, failures = [], 0
+    for i in range(calls):
+        start = time.perf_counter()
+        response = agent._call_llm(f"Error benchmark prompt {i}")
+        samples.append(time.perf_counter() - start)
+        failures += response.startswith("Error")
+    server.configure(error_rate=0.0)
+    return {
+        "error_rate": error_rate,
+        "calls": calls,
+        "failed_calls": failures,
+        "retries": agent.llm_client.stats()["retries"] - retries_before,
+        "latency": summarize_seconds(samples)
+    }
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> Path:
+    """Run the LLM benchmarks against the mock server and write the JSON report."""
+    parser = argparse.ArgumentParser(description="Benchmark LLM orchestration against the mock LLM server")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY, help="Mock time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND)
+    parser.add_argument("--response-tokens", type=int, default=DEFAULT_RESPONSE_TOKENS)
+    parser.add_argument("--calls", type=int, default=DEFAULT_CALLS, help="Calls per sequential scenario")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Calls in the parallel scenario")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Injected 429 rate of the error scenario")
+    parser.add_argument("--rps", type=float, default=None, help="Client rate limit (default: unlimited)")
+    parser.add_argument("--wafers", type=int, default=DEFAULT_HISTORY_WAFERS, help="Synthetic history size")
+    parser.add_argument("--output", type=Path, default=None, help="Report file (default: Benchmarks/results/)")
+    args = parser.parse_args(argv)
+
+    server = MockLLMServer(port=0, latency_seconds=args.latency, tokens_per_second=args.tokens_per_second,
+                           response_tokens=args.response_tokens).start()
+    server_seconds = args.latency + args.response_tokens / args.tokens_per_second
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_llm_") as tmp:
+            write_history(Path(tmp), args.wafers, num_days=7)
+
+            aggregator = DataAggregator(results_dir=Path(tmp))
+            agent = LLMMonitoringAgent(api_key=MOCK_API_KEY, use_cache=False, base_url=server.base_url,
+                                       aggregator=aggregator)
+            if agent.llm_client is None:
+                raise RuntimeError(f"LLM client not initialized: {agent.initialization_error}")
+            # Dedicated client: the rate limit under test instead of the process-wide default
+            agent.llm_client = AsyncLLMClient(MOCK_API_KEY, server.base_url, max_concurrency=args.concurrency,
+                                              requests_per_second=args.rps, backoff_base=0.05, seed=0)
+            processor = QueryProcessor(aggregator=aggregator)
+            processor.llm_agent = agent
+
+            print("Prompt context...")
+            results["context"] = bench_context(agent.aggregator)
+            agent._call_llm("Warm-up")  # Opens the pooled connection
+            print("Sequential calls...")
+            results["call_llm"] = bench_calls(agent, args.calls, server_seconds)
+            print("answer_query...")
+            results["answer_query"] = bench_answer_query(agent, args.calls, server_seconds)
+            print("Streaming...")
+            results["stream_answer_query"] = bench_stream(agent, args.calls, args.latency)
+            print("Concurrent calls...")
+            results["call_llm_many"] = bench_concurrent(agent, args.concurrency, server_seconds)
+            print("QueryProcessor...")
+            results["process_query"] = bench_query_processor(processor, server_seconds)
+            print("Batch of queries...")
+            results["process_queries"] = bench_batch(processor, server_seconds)
+            print("Conversation...")
+            results["conversation"] = bench_conversation(processor)
+            print("Error injection...")
+            results["errors"] = bench_errors(agent, server, args.calls, args.error_rate)
+            results["client"] = agent.llm_client.stats()
+            agent.llm_client.close()
+    finally:
+        results["server"] = server.stats()
+        server.stop()
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    config = {
+        "latency_seconds": args.latency,
+        "tokens_per_second": args.tokens_per_second,
+        "response_tokens": args.response_tokens,
+        "server_seconds_per_call": round(server_seconds, 4),
+        "calls": args.calls,
+        "concurrency": args.concurrency,
+        "rps": args.rps,
+        "history_wafers": args.wafers
+    }
+    output = write_report("llm", config, results, args.output)
+
+    context = results["context"]
+    print(f"\nPrompt context: {context['tokens']}/{context['budget']} tokens ({context['tokenizer']}), "
+          f"built in {context['build_seconds'] * 1000:.0f} ms")
+    print(f"Simulated model time per call: {server_seconds * 1000:.0f} ms")
+    for name in ("call_llm", "answer_query"):
+        r = results[name]
+        print(f"{name:22s} p50 {r['p50_ms']:8.1f} ms  p95 {r['p95_ms']:8.1f} ms  overhead {r['overhead_ms']:7.1f} ms")
+    stream = results["stream_answer_query"]
+    print(f"{'stream first token':22s} p50 {stream['time_to_first_token']['p50_ms']:8.1f} ms  "
+          f"overhead {stream['first_token_overhead_ms']:7.1f} ms")
+    concurrent = results["call_llm_many"]
+    print(f"{'call_llm_many':22s} {concurrent['calls']} calls in {concurrent['wall_seconds']:.2f}s "
+          f"(speedup x{concurrent['speedup']})")
+    batch = results["process_queries"]
+    print(f"{'process_queries':22s} {batch['queries']} queries in {batch['batch_seconds']:.2f}s vs "
+          f"{batch['sequential_seconds']:.2f}s one by one (speedup x{batch['speedup']})")
+    conversation = results["conversation"]
+    print(f"{'conversation':22s} data sent {conversation['context_sends']}x ({conversation['prefix_tokens']} tokens), "
+          f"new prompt tokens per turn {conversation['turn_tokens']} vs {conversation['standalone_turn_tokens']} standalone")
+    errors = results["errors"]
+    print(f"{'errors':22s} {errors['failed_calls']}/{errors['calls']} failed, {errors['retries']} retries "
+          f"at {errors['error_rate']:.0%} injected 429s")
+    print(f"\nReport saved to: {output}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Benchmark: Wafer Analysis Pipeline
+Measures DefectCounter.count_defects, WaferDefectPredictor.predict (single and batched) and
+process_wafer_with_analysis + save_result across worker counts, offline on CPU.
+
+Usage:
+    python Benchmarks/Bench_Pipeline.py
+    python Benchmarks/Bench_Pipeline.py --images 500 --batch-sizes 1 8 32 --workers 1 2 4 8
+    python Benchmarks/Bench_Pipeline.py --synthetic --output pipeline.json
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from Bench_Common import summarize_seconds, peak_rss_mb, write_report
+
+from Repository.Defect_Prediction import WaferDefectPredictor, DefectCounter
+from Repository.Manufacturing_Simulation import ManufacturingProcessController, TEST_DATASET_PATH, MODEL_PATH
+from Repository.Performance_Monitor import StageLatencyRecorder
+from Repository.Results_Sink import ShardedResultsSink
+from Repository.Synthetic_Wafer_Generator import SyntheticWaferGenerator
+
+import torch
+import torch.nn as nn
+from PIL import Image
+from torchvision import models
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+DEFAULT_IMAGES = 200
+DEFAULT_BATCH_SIZES = [1, 4, 16]
+DEFAULT_WORKERS = [1, 2, 4]
+WARMUP_IMAGES = 5
+NUM_CLASSES = 9
+
+
+# ------------------------------------------------------------------------------------------
+# Inputs
+# ------------------------------------------------------------------------------------------
+def make_synthetic_wafers(count: int, output_dir: Path, seed: int = 0) -> List[str]:
+    """
+    Render synthetic wafer maps of all defect patterns (70% Normal, like the simulation).
+
+    Args:
+        count: Number of images
+        output_dir: Directory to write the JPEGs to
+        seed: RNG seed (the same seed gives the same images)
+
+    Returns:
+        List of image paths
+    """
+    generator = SyntheticWaferGenerator()
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        path = output_dir / f"synthetic_{i:05d}.jpg"
+        generator.write(generator.select_source(rng=rng), str(path))
+        paths.append(str(path))
+    return paths
+
+
+def collect_images(count: int, synthetic: bool, work_dir: Path) -> Tuple[List[str], str]:
+    """
+    Get the benchmark images: the test dataset (cycled up to count), or synthetic wafers.
+
+    Returns:
+        Tuple (image paths, source description)
+    """
+    dataset = sorted(str(p) for p in Path(TEST_DATASET_PATH).glob("*/*.jpg")) if not synthetic else []
+    if dataset:
+        return [dataset[i % len(dataset)] for i in range(count)], f"dataset ({len(dataset)} unique images)"
+    return make_synthetic_wafers(count, work_dir), "synthetic"
+
+
+def load_predictor(model_path: Path, work_dir: Path) -> Tuple[WaferDefectPredictor, str]:
+    """
+    Load the predictor; without a trained model, use randomly initialized ResNet18 weights.
+
+    Untrained weights have the same architecture and cost, so latencies stay representative
+    (the predicted classes are meaningless).
+
+    Returns:
+        Tuple (predictor, weights description)
+    """
+    if Path(model_path).exists():
+        return WaferDefectPredictor(str(model_path), num_classes=NUM_CLASSES), str(model_path)
+    model = models.resnet18(weights=None)
+    model.fc = nn.Linear(model.fc.in_features, NUM_CLASSES)
+    untrained_path = work_dir / "untrained_resnet18.pth"
+    torch.save(model.state_dict(), untrained_path)
+    return WaferDefectPredictor(str(untrained_path), num_classes=NUM_CLASSES), "untrained (model file not found)"
+
+
+# ------------------------------------------------------------------------------------------
+# Benchmarks
+# ------------------------------------------------------------------------------------------
+def bench_count_defects(images: List[str]) -> Dict:
+    """Benchmark DefectCounter.count_defects one image at a time."""
+    counter = DefectCounter()
+    for path in images[:WARMUP_IMAGES]:
+        counter.count_defects(path)
+
+    decode, total = [], []
+    start = time.perf_counter()
+    for path in images:
+        timings = {}
+        call_start = time.perf_counter()
+        counter.count_defects(path, timings=timings)
+        total.append(time.perf_counter() - call_start)
+        decode.append(timings.get("decode", 0.0))
+    elapsed = time.perf_counter() - start
+    return {
+        "images_per_second": round(len(images) / elapsed, 2),
+        "latency": {"decode": summarize_seconds(decode), "total": summarize_seconds(total)},
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def bench_predict(predictor: WaferDefectPredictor, images: List[str]) -> Dict:
+    """Benchmark WaferDefectPredictor.predict one image at a time."""
+    for path in images[:WARMUP_IMAGES]:
+        predictor.predict(path)
+
+    decode, total = [], []
+    start = time.perf_counter()
+    for path in images:
+        timings = {}
+        call_start = time.perf_counter()
+        predictor.predict(path, timings=timings)
+        total.append(time.perf_counter() - call_start)
+        decode.append(timings.get("decode", 0.0))
+    elapsed = time.perf_counter() - start
+    return {
+        "images_per_second": round(len(images) / elapsed, 2),
+        "latency": {"decode": summarize_seconds(decode), "total": summarize_seconds(total)},
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def predict_batch(predictor: WaferDefectPredictor, paths: List[str]):
+    """Classify several images with one forward pass (same preprocessing as predict())."""
+    tensors = [predictor.transform(Image.open(path).convert('RGB')) for path in paths]
+    batch = torch.stack(tensors).to(predictor.device)
+    with torch.no_grad():
+        return torch.softmax(predictor.model(batch), dim=1).max(dim=1)
+
+
+def bench_predict_batches(predictor: WaferDefectPredictor, images: List[str], batch_sizes: List[int]) -> Dict:
+    """Benchmark batched forward passes, to size the gain of batching the analysis."""
+    results = {}
+    for batch_size in batch_sizes:
+        batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+        predict_batch(predictor, batches[0])  # Warm-up
+
+        per_batch = []
+        start = time.perf_counter()
+        for batch in batches:
+            batch_start = time.perf_counter()
+            predict_batch(predictor, batch)
+            per_batch.append(time.perf_counter() - batch_start)
+        elapsed = time.perf_counter() - start
+        results[str(batch_size)] = {
+            "images_per_second": round(len(images) / elapsed, 2),
+            "batch_latency": summarize_seconds(per_batch),
+            "peak_rss_mb": peak_rss_mb()
+        }
+    return results
+
+
+def bench_pipeline(predictor: WaferDefectPredictor, images: List[str], worker_counts: List[int],
+                   work_dir: Path) -> Dict:
+    """
+    Benchmark process_wafer_with_analysis + save_result with concurrent workers.
+
+    The controller uses the benchmarked predictor and writes its results and logs under
+    work_dir, so Manufacturing_Output is not touched.
+    """
+    controller = ManufacturingProcessController(num_mechanical=0, num_electrical=0, num_thermal=0,
+                                                output_dir=work_dir / "output", predictor=predictor)
+    controller.defect_counter = DefectCounter()
+
+    results = {}
+    for workers in worker_counts:
+        controller.results = []
+        controller.results_sink = ShardedResultsSink(work_dir, f"bench_w{workers}")
+        latency = StageLatencyRecorder()
+
+        def analyze(index_path):
+            index, path = index_path
+            wafer_info = {
+                "wafer_id": f"BENCH_W{index:05d}",
+                "machine_id": "BENCH_01",
+                "machine_type": "Benchmark",
+                "image_path": path,
+                "timestamp": datetime.now().isoformat(),
+                "process_step": "Benchmark"
+            }
+            timings = {}
+            wafer_start = time.perf_counter()
+            result = controller.process_wafer_with_analysis(wafer_info, timings)
+            controller.save_result(result, timings)
+            timings["total"] = time.perf_counter() - wafer_start
+            latency.record_many("Benchmark", timings)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(analyze, enumerate(images)))
+        elapsed = time.perf_counter() - start
+        controller.results_sink.close()
+
+        results[str(workers)] = {
+            "images_per_second": round(len(images) / elapsed, 2),
+            "latency": latency.snapshot().get("Benchmark", {}),
+            "peak_rss_mb": peak_rss_mb()
+        }
+    return results
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> Path:
+    """Run the pipeline benchmarks and write the JSON report."""
+    parser = argparse.ArgumentParser(description="Benchmark the wafer analysis pipeline (CPU, offline)")
+    parser.add_argument("--images", type=int, default=DEFAULT_IMAGES, help="Images per benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument("--model", type=Path, default=MODEL_PATH, help="Model file (untrained weights if missing)")
+    parser.add_argument("--synthetic", action="store_true", help="Use synthetic wafers even if the dataset exists")
+    parser.add_argument("--output", type=Path, default=None, help="Report file (default: Benchmarks/results/)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+        work_dir = Path(tmp)
+        images, source = collect_images(args.images, args.synthetic, work_dir)
+        predictor, weights = load_predictor(args.model, work_dir)
+        config = {
+            "images": len(images),
+            "image_source": source,
+            "weights": weights,
+            "device": str(predictor.device),
+            "torch_threads": torch.get_num_threads(),
+            "batch_sizes": args.batch_sizes,
+            "workers": args.workers
+        }
+        print(f"Benchmarking {len(images)} images from {source} on {predictor.device}")
+
+        results = {}
+        print("count_defects...")
+        results["count_defects"] = bench_count_defects(images)
+        print("predict...")
+        results["predict"] = bench_predict(predictor, images)
+        print("predict_batch...")
+        results["predict_batch"] = bench_predict_batches(predictor, images, args.batch_sizes)
+        print("pipeline (process_wafer_with_analysis + save_result)...")
+        results["pipeline"] = bench_pipeline(predictor, images, args.workers, work_dir)
+        results["peak_rss_mb"] = peak_rss_mb()
+
+    output = write_report("pipeline", config, results, args.output)
+
+    print(f"\n{'Benchmark':32s} {'images/s':>10s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for name in ("count_defects", "predict"):
+        total = results[name]["latency"]["total"]
+        print(f"{name:32s} {results[name]['images_per_second']:10.2f} "
+              f"{total.get('p50_ms', 0):9.2f} {total.get('p95_ms', 0):9.2f} {total.get('p99_ms', 0):9.2f}")
+    for batch_size, stats in results["predict_batch"].items():
+        print(f"{'predict_batch (batch=' + batch_size + ')':32s} {stats['images_per_second']:10.2f}")
+    for workers, stats in results["pipeline"].items():
+        total = stats["latency"].get("total", {})
+        print(f"{'pipeline (workers=' + workers + ')':32s} {stats['images_per_second']:10.2f} "
+              f"{total.get('p50_ms', 0):9.2f} {total.get('p95_ms', 0):9.2f} {total.get('p99_ms', 0):9.2f}")
+    print(f"\nPeak RSS: {results['peak_rss_mb']} MB")
+    print(f"Report saved to: {output}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Benchmark: Query Classification
+Compares the compiled single-pass QueryClassifier with the previous first-hit regex loop on a
+labeled query corpus: accuracy (overall and per query type), entity extraction accuracy,
+classification time per query, and how the time grows with query length.
+
+Usage:
+    python Benchmarks/Bench_Query_Classifier.py
+    python Benchmarks/Bench_Query_Classifier.py --repeat 200 --lengths 100 1000 10000
+    python Benchmarks/Bench_Query_Classifier.py --show-errors --output classifier.json
+"""
+
+import argparse
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from Bench_Common import summarize_seconds, write_report
+
+from Repository.Query_Classifier import QueryClassifier, QueryType
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+DEFAULT_REPEAT = 50
+DEFAULT_LENGTHS = [100, 1000, 10000]
+
+# Labeled corpus: (query, expected query type, expected entities)
+LABELED_QUERIES = [
+    ("Which machine has the highest defect rate?", "machine_performance", {}),
+    ("Which machine has the best and worst performance?", "machine_performance", {}),
+    ("Rank the tools by pass rate", "machine_performance", {}),
+    ("How is MECH_02 performing?", "machine_performance", {"machine_ids": ["MECH_02"]}),
+    ("What is the yield of each equipment?", "machine_performance", {}),
+    ("Which tool produces the most defects?", "machine_performance", {}),
+    ("Show machine performance for the thermal machines", "machine_performance", {"machine_types": ["Thermal"]}),
+    ("Which machine is worst?", "machine_performance", {}),
+    ("Pass rate of ELEC 3", "machine_performance", {"machine_ids": ["ELEC_03"]}),
+    ("What are the most common defect types?", "defect_distribution", {}),
+    ("Show me the defect distribution", "defect_distribution", {}),
+    ("Give me a breakdown of defect classes", "defect_distribution", {}),
+    ("How many wafers of each defect pattern?", "defect_distribution", {}),
+    ("What defect types do we see most frequently?", "defect_distribution", {}),
+    ("Which defect pattern is most common?", "defect_distribution", {}),
+    ("What is the frequency of each defect class?", "defect_distribution", {}),
+    ("Is the pass rate improving?", "trend_analysis", {}),
+    ("Show the trend over the last 2 weeks", "trend_analysis", {"last_days": 14}),
+    ("How did the defect rate change over time?", "trend_analysis", {}),
+    ("Which date had the most defects?", "trend_analysis", {}),
+    ("Are we getting worse since last week?", "trend_analysis", {"last_days": 7}),
+    ("Daily pass rate history for the past month", "trend_analysis", {"last_days": 30}),
+    ("Show the results by date", "trend_analysis", {}),
+    ("What happened on 2026-10-15?", "trend_analysis", {"dates": ["2026-10-15"]}),
+    ("Is quality deteriorating?", "trend_analysis", {}),
+    ("Why do we see Center defects?", "root_cause", {"defect_classes": ["Center"]}),
+    ("What causes scratches on mechanical tools?", "root_cause",
+     {"defect_classes": ["Scratch"], "machine_types": ["Mechanical"]}),
+    ("What is the root cause of the edge-ring pattern?", "root_cause", {"defect_classes": ["Edge-Ring"]}),
+    ("Why is the pass rate so low?", "root_cause", {}),
+    ("What is the reason for the donut defects?", "root_cause", {"defect_classes": ["Donut"]}),
+    ("Why are there so many near-full wafers?", "root_cause", {"defect_classes": ["Near-Full"]}),
+    ("What caused the drop on THERM_01?", "root_cause", {"machine_ids": ["THERM_01"]}),
+    ("Explain the source of the random defects", "root_cause", {"defect_classes": ["Random"]}),
+    ("What recommendations do you have?", "recommendations", {}),
+    ("Generate recommendations for improvement", "recommendations", {}),
+    ("What should we do about the Edge-Loc defects?", "recommendations", {"defect_classes": ["Edge-Loc"]}),
+    ("How do we fix the scratch problem?", "recommendations", {"defect_classes": ["Scratch"]}),
+    ("Suggest corrective actions", "recommendations", {}),
+    ("How can we prevent center defects?", "recommendations", {"defect_classes": ["Center"]}),
+    ("What are the next steps?", "recommendations", {}),
+    ("How can we improve the yield of MECH_04?", "recommendations", {"machine_ids": ["MECH_04"]}),
+    ("Give me a summary of today's results", "summary", {"last_days": 1}),
+    ("Overall status", "summary", {}),
+    ("Generate a daily report", "summary", {}),
+    ("Summarize the manufacturing run", "summary", {}),
+    ("Give me an overview", "summary", {}),
+    ("How are we doing?", "summary", {}),
+    ("Compare MECH_01 and MECH_02", "comparison", {"machine_ids": ["MECH_01", "MECH_02"]}),
+    ("Thermal vs electrical machines", "comparison", {"machine_types": ["Thermal", "Electrical"]}),
+    ("What is the difference between 2026-10-01 and 2026-10-15?", "comparison",
+     {"dates": ["2026-10-01", "2026-10-15"]}),
+    ("Is THERM_02 better than THERM_01?", "comparison", {"machine_ids": ["THERM_02", "THERM_01"]}),
+    ("Comparison of the mechanical and thermal lines", "comparison",
+     {"machine_types": ["Mechanical", "Thermal"]}),
+    ("Tell me about center defects", "specific_defect", {"defect_classes": ["Center"]}),
+    ("What is a donut pattern?", "specific_defect", {"defect_classes": ["Donut"]}),
+    ("Edge-Loc", "specific_defect", {"defect_classes": ["Edge-Loc"]}),
+    ("Describe the scratch defect", "specific_defect", {"defect_classes": ["Scratch"]}),
+    ("Local defects", "specific_defect", {"defect_classes": ["Local"]}),
+    ("Info on near full wafers", "specific_defect", {"defect_classes": ["Near-Full"]}),
+    ("Show me recent anomalies", "anomaly_analysis", {}),
+    ("Which wafers exceed the threshold?", "anomaly_analysis", {}),
+    ("List the outliers", "anomaly_analysis", {}),
+    ("Show the problem wafers from yesterday", "anomaly_analysis", {"last_days": 2}),
+    ("Any anomalous wafers on ELEC_02?", "anomaly_analysis", {"machine_ids": ["ELEC_02"]}),
+    ("Show the worst wafers", "anomaly_analysis", {}),
+    ("Are there any alerts?", "anomaly_analysis", {}),
+    ("Hello", "general", {}),
+    ("What can you do?", "general", {}),
+    ("Who built this system?", "general", {}),
+    ("Tell me something interesting", "general", {}),
+]
+
+# Previous classifier: first matching pattern in type order (kept here as the baseline)
+LEGACY_PATTERNS = {
+    "machine_performance": [r"which.*machine.*(?:best|worst|highest|lowest|most|least)", r"machine.*performance",
+                            r"which.*tool.*defect", r"machine.*rate", r"equipment.*performance"],
+    "defect_distribution": [r"defect.*distribution", r"most.*common.*defect", r"defect.*type", r"what.*defect",
+                            r"defect.*pattern"],
+    "trend_analysis": [r"trend", r"over.*time", r"last.*(?:day|week|month)", r"improving|worsening",
+                       r"change.*time"],
+    "root_cause": [r"why.*defect", r"cause.*defect", r"root.*cause", r"reason.*defect", r"what.*cause"],
+    "recommendations": [r"recommend", r"what.*should.*do", r"action", r"suggest", r"how.*fix"],
+    "summary": [r"summary", r"overview", r"overall", r"status", r"report"],
+    "specific_defect": [r"center.*defect", r"scratch.*defect", r"edge.*defect", r"donut.*defect",
+                        r"local.*defect"],
+    "anomaly_analysis": [r"anomal", r"outlier", r"exceed", r"threshold", r"problem.*wafer"]
+}
+
+
+def legacy_classify(query: str) -> str:
+    """Previous QueryProcessor.classify_query (uncompiled patterns, first hit wins)."""
+    query_lower = query.lower()
+    for query_type, patterns in LEGACY_PATTERNS.items():
+        for pattern in patterns:
+            if re.search(pattern, query_lower):
+                return query_type
+    return "general"
+
+
+# ------------------------------------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------------------------------------
+def evaluate(classify: Callable[[str], str]) -> Dict:
+    """Accuracy of a classifier over the labeled corpus, overall and per expected type."""
+    per_type = defaultdict(lambda: {"total": 0, "correct": 0})
+    errors = []
+    for query, expected, _ in LABELED_QUERIES:
+        predicted = classify(query)
+        per_type[expected]["total"] += 1
+        if predicted == expected:
+            per_type[expected]["correct"] += 1
+        else:
+            errors.append({"query": query, "expected": expected, "predicted": predicted})
+    correct = sum(t["correct"] for t in per_type.values())
+    return {
+        "accuracy": round(correct / len(LABELED_QUERIES), 4),
+        "per_type": {k: round(v["correct"] / v["total"], 4) for k, v in sorted(per_type.items())},
+        "errors": errors
+    }
+
+
+def evaluate_entities(classifier: QueryClassifier) -> Dict:
+    """Share of corpus queries whose extracted entities match the labels exactly."""
+    errors = []
+    for query, _, expected in LABELED_QUERIES:
+        entities = classifier.analyze(query)["entities"]
+        got = {k: v for k, v in entities.items() if v}
+        want = {k: sorted(v) if isinstance(v, list) and k == "dates" else v for k, v in expected.items()}
+        if got != want:
+            errors.append({"query": query, "expected": want, "extracted": got})
+    return {"accuracy": round(1 - len(errors) / len(LABELED_QUERIES), 4), "errors": errors}
+
+
+def time_classifier(classify: Callable[[str], object], queries: List[str], repeat: int) -> Dict:
+    """Time per classification over the queries."""
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            classify(query)
+            samples.append(time.perf_counter() - start)
+    return summarize_seconds(samples)
+
+
+def length_curve(classify: Callable[[str], object], lengths: List[int], repeat: int) -> List[Dict]:
+    """Classification time of long queries (corpus queries concatenated up to each length)."""
+    text = " ".join(query for query, _, _ in LABELED_QUERIES)
+    points = []
+    for length in lengths:
+        query = (text * (length // len(text) + 1))[:length]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            classify(query)
+        points.append({"chars": length, "ms": round((time.perf_counter() - start) / repeat * 1000, 4)})
+    return points
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> Path:
+    """Run the classifier benchmark and write the JSON report."""
+    parser = argparse.ArgumentParser(description="Benchmark query classification on a labeled corpus")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Passes over the corpus for timing")
+    parser.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_LENGTHS,
+                        help="Query lengths (characters) of the scaling curve")
+    parser.add_argument("--show-errors", action="store_true", help="Print the misclassified queries")
+    parser.add_argument("--output", type=Path, default=None, help="Report file (default: Benchmarks/results/)")
+    args = parser.parse_args(argv)
+
+    classifier = QueryClassifier()
+    classifiers = {
+        "legacy": legacy_classify,
+        "compiled": lambda query: classifier.classify(query).value
+    }
+    queries = [query for query, _, _ in LABELED_QUERIES]
+
+    results = {}
+    for name, classify in classifiers.items():
+        results[name] = evaluate(classify)
+        results[name]["latency"] = time_classifier(classify, queries, args.repeat)
+        results[name]["length_curve"] = length_curve(classify, args.lengths, max(1, args.repeat // 10))
+    results["compiled"]["entities"] = evaluate_entities(classifier)
+
+    config = {"corpus_size": len(LABELED_QUERIES), "repeat": args.repeat, "lengths": args.lengths,
+              "query_types": [t.value for t in QueryType]}
+    output = write_report("query_classifier", config, results, args.output)
+
+    print(f"Labeled corpus: {len(LABELED_QUERIES)} queries\n")
+    print(f"{'classifier':12s} {'accuracy':>9s} {'p50 us':>9s} {'p95 us':>9s}  "
+          + "  ".join(f"{p['chars']:>6d} ch" for p in results['compiled']['length_curve']))
+    for name in classifiers:
+        r = results[name]
+        print(f"{name:12s} {r['accuracy']:9.1%} {r['latency']['p50_ms'] * 1000:9.1f} "
+              f"{r['latency']['p95_ms'] * 1000:9.1f}  "
+              + "  ".join(f"{p['ms']:6.2f} ms" for p in r["length_curve"]))
+    print(f"\nEntity extraction accuracy (compiled): {results['compiled']['entities']['accuracy']:.1%}")
+    if args.show_errors:
+        for name in classifiers:
+            print(f"\n{name} errors:")
+            for error in results[name]["errors"]:
+                print(f"  {error['query']!r}: expected {error['expected']}, got {error['predicted']}")
+        for error in results["compiled"]["entities"]["errors"]:
+            print(f"  entities {error['query']!r}: expected {error['expected']}, got {error['extracted']}")
+    print(f"\nReport saved to: {output}")
+    return output
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Synthetic Results Generator
+Produces large manufacturing histories (10k to 10M wafers) across many dates and machines in
+exactly the schema ManufacturingProcessController.save_result writes, as sharded runs with
+manifests, for load-testing the analytics path.
+
+Usage:
+    python Benchmarks/Synthetic_Results.py --wafers 100000 --days 30 --output-dir /tmp/history
+"""
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+BASE_DIR = Path(__file__).parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from Repository.Results_Sink import ShardedResultsSink, RESULTS_SHARD_MAX_RECORDS
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+DEFECT_CLASSES = ['Center', 'Donut', 'Edge-Loc', 'Edge-Ring', 'Local',
+                  'Near-Full', 'Normal', 'Random', 'Scratch']
+NORMAL_PROBABILITY = 0.7  # Same default as WaferImageGenerator.select_source_image
+DEFECT_THRESHOLD = 40.0   # Same pass/fail threshold as process_wafer_with_analysis
+
+# Typical defect percentage range per class (uniform draw)
+DEFECT_PERCENTAGE_RANGES = {
+    'Normal': (0.0, 8.0),
+    'Center': (10.0, 45.0),
+    'Donut': (15.0, 50.0),
+    'Edge-Loc': (5.0, 30.0),
+    'Edge-Ring': (15.0, 45.0),
+    'Local': (3.0, 25.0),
+    'Near-Full': (60.0, 98.0),
+    'Random': (20.0, 70.0),
+    'Scratch': (2.0, 20.0),
+}
+
+# Must match ManufacturingMachine._get_process_step() and the controller's machine IDs
+MACHINE_TYPES = {
+    "Mechanical": ("MECH", "Mechanical Processing (Dicing, Grinding, Polishing)"),
+    "Electrical": ("ELEC", "Electrical Testing (Probe Testing, Parametric Testing)"),
+    "Thermal": ("THERM", "Thermal Processing (Annealing, Stress Relief, Burn-in)"),
+}
+
+
+def build_machines(num_mechanical: int, num_electrical: int, num_thermal: int) -> List[Dict]:
+    """Build the machine list ({"machine_id", "machine_type", "process_step"})."""
+    machines = []
+    for machine_type, count in (("Mechanical", num_mechanical), ("Electrical", num_electrical),
+                                ("Thermal", num_thermal)):
+        prefix, process_step = MACHINE_TYPES[machine_type]
+        machines.extend({
+            "machine_id": f"{prefix}_{i+1:02d}",
+            "machine_type": machine_type,
+            "process_step": process_step
+        } for i in range(count))
+    return machines
+
+
+# ------------------------------------------------------------------------------------------
+# Generator
+# ------------------------------------------------------------------------------------------
+def generate_results(num_wafers: int, num_days: int = 30, end_date: Optional[datetime] = None,
+                     num_mechanical: int = 4, num_electrical: int = 4, num_thermal: int = 2,
+                     seed: int = 0) -> Iterator[Dict]:
+    """
+    Generate synthetic wafer results in save_result order (by simulation date, then time).
+
+    Args:
+        num_wafers: Number of wafers to generate
+        num_days: Number of simulation dates the wafers are spread over
+        end_date: Last simulation date (default: today)
+        num_mechanical: Number of mechanical machines
+        num_electrical: Number of electrical machines
+        num_thermal: Number of thermal machines
+        seed: RNG seed (the same arguments and seed give the same history)
+
+    Yields:
+        Wafer result dictionaries
+    """
+    rng = random.Random(seed)
+    machines = build_machines(num_mechanical, num_electrical, num_thermal)
+    end_date = (end_date or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    wafer_counters = {}
+    other_classes = [c for c in DEFECT_CLASSES if c != 'Normal']
+
+    for day in range(num_days):
+        day_start = end_date - timedelta(days=num_days - 1 - day) + timedelta(hours=8)
+        simulation_date = day_start.strftime("%Y-%m-%d")
+        wafers_today = num_wafers // num_days + (1 if day < num_wafers % num_days else 0)
+        seconds_per_wafer = 8 * 3600 / max(wafers_today, 1)  # Spread over an 8-hour shift
+
+        for i in range(wafers_today):
+            machine = machines[rng.randrange(len(machines))]
+            counter_key = (simulation_date, machine["machine_id"])
+            wafer_counters[counter_key] = wafer_counters.get(counter_key, 0) + 1
+            wafer_id = f"{machine['machine_type']}_{machine['machine_id']}_W{wafer_counters[counter_key]:04d}"
+
+            defect_class = 'Normal' if rng.random() < NORMAL_PROBABILITY else rng.choice(other_classes)
+            low, high = DEFECT_PERCENTAGE_RANGES[defect_class]
+            defect_percentage = round(rng.uniform(low, high), 2)
+            confidence = round(rng.uniform(0.55, 0.999), 4)
+            timestamp = day_start + timedelta(seconds=i * seconds_per_wafer)
+            is_pass = defect_percentage <= DEFECT_THRESHOLD
+
+            yield {
+                "wafer_id": wafer_id,
+                "machine_id": machine["machine_id"],
+                "machine_type": machine["machine_type"],
+                "image_path": f"Manufacturing_Output/processed_images/{machine['machine_type']}_{wafer_id}_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}.jpg",
+                "timestamp": timestamp.isoformat(timespec="microseconds"),
+                "process_step": machine["process_step"],
+                "prediction": {"Defect Class": defect_class, "Confidence Score": confidence},
+                "defect_count": {"defect_percentage": defect_percentage},
+                "analysis_timestamp": (timestamp + timedelta(milliseconds=rng.randint(50, 400))).isoformat(timespec="microseconds"),
+                "quality_status": "PASS" if is_pass else "FAIL",
+                "quality_reason": (
+                    f"Defect Percentage: {defect_percentage}% "
+                    f"{'(>40% threshold)' if defect_percentage > DEFECT_THRESHOLD else '(<=40% threshold)'}, "
+                    f"Defect Class: {defect_class}, "
+                    f"Confidence: {confidence:.2%}"
+                ),
+                "defect_threshold": DEFECT_THRESHOLD,
+                "defect_percentage": defect_percentage,
+                "threshold_exceeded": defect_percentage > DEFECT_THRESHOLD,
+                "simulation_date": simulation_date
+            }
+
+
+def write_history(output_dir: Path, num_wafers: int, num_days: int = 30,
+                  shard_size: int = RESULTS_SHARD_MAX_RECORDS, seed: int = 0, **machine_counts) -> List[Path]:
+    """
+    Write a synthetic history as one sharded run (shards + manifest) per simulation date.
+
+    Args:
+        output_dir: Directory to write to (used as DataAggregator results_dir)
+        num_wafers: Number of wafers
+        num_days: Number of simulation dates
+        shard_size: Records per shard
+        seed: RNG seed
+        **machine_counts: num_mechanical / num_electrical / num_thermal
+
+    Returns:
+        List of manifest files written
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifests = []
+    sink = None
+    current_date = None
+    batch = []
+
+    def flush():
+        if batch:
+            sink.append_many(batch)
+            batch.clear()
+
+    for result in generate_results(num_wafers, num_days, seed=seed, **machine_counts):
+        if result["simulation_date"] != current_date:
+            if sink is not None:
+                flush()
+                sink.close()
+            current_date = result["simulation_date"]
+            run_id = f"synthetic_{current_date.replace('-', '')}"
+            # Disk writes are not fsynced: this is throw-away benchmark data
+            sink = ShardedResultsSink(output_dir, run_id, max_records=shard_size,
+                                      max_bytes=None, max_seconds=None, fsync=False)
+            manifests.append(sink.manifest_file)
+        batch.append(result)
+        if len(batch) >= shard_size:
+            flush()
+    if sink is not None:
+        flush()
+        sink.close()
+    return manifests
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic manufacturing results history")
+    parser.add_argument("--wafers", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--output-dir", type=Path, required=True,
+                        help="Directory to write to (point DataAggregator(results_dir=...) at it)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifests = write_history(args.output_dir, args.wafers, args.days, seed=args.seed)
+    print(f"Wrote {args.wafers} wafers over {args.days} dates ({len(manifests)} runs) to {args.output_dir}")
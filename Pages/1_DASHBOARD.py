@@ -2,6 +2,7 @@
 Dashboard Page - Real-Time Monitoring
 """
 import streamlit as st
+import os
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -12,7 +13,10 @@ import threading
 sys.path.insert(0, str(Path(__file__).parent.parent / "Repository"))
 
 from Repository.Data_Aggregator import DataAggregator
-from Repository.Manufacturing_Simulation import ManufacturingProcessController
+from Repository.Result_Stream import ResultsTail
+from Repository.config_LLM import RESULTS_DIR
+from Repository.Manufacturing_Simulation import ManufacturingProcessController, SHUTDOWN_DRAIN_TIMEOUT, MODEL_PATH
+from Repository.Model_Registry import MODEL_REGISTRY
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -33,6 +37,10 @@ if 'simulation_start_time' not in st.session_state:
     st.session_state.simulation_start_time = None
 if 'simulation_duration' not in st.session_state:
     st.session_state.simulation_duration = None
+if 'live_aggregator' not in st.session_state:
+    st.session_state.live_aggregator = None  # Results loaded once, then updated incrementally
+    st.session_state.live_cursor = None
+    st.session_state.live_source = None
 
 
 # Simulation Control Section - always visible
@@ -61,6 +69,24 @@ with st.expander("⚙️ Simulation Settings", expanded=False):
         value=datetime.now().date(),
         help="Date to associate with this simulation run"
     )
+    
+    # The defect model is loaded once per process and shared across runs and reruns
+    model_info = MODEL_REGISTRY.info().get(os.path.abspath(MODEL_PATH))
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if model_info:
+            st.caption(f"Model loaded {model_info['loaded_at'][:19]} "
+                       f"(sha256 {model_info['sha256'][:12]}, load {model_info['load_seconds']}s)")
+        else:
+            st.caption("Model not loaded yet (loads on first Start)")
+    with col2:
+        if st.button("🔁 Reload Model", width='stretch', disabled=st.session_state.simulation_running,
+                     help="Reload the model file (e.g. after replacing MLModelv4.pth)"):
+            try:
+                MODEL_REGISTRY.reload(str(MODEL_PATH))
+                st.success("✅ Model reloaded")
+            except Exception as e:
+                st.error(f"Error reloading model: {str(e)}")
 
 # Quick Actions
 col1, col2, col3 = st.columns(3)
@@ -115,13 +141,24 @@ with col2:
     if st.button("⏹️ Stop Simulation", width='stretch', disabled=not st.session_state.simulation_running):
         if st.session_state.simulation_controller:
             try:
-                st.session_state.simulation_controller.stop_all_machines()
+                # Graceful stop: refuse new wafers, drain in-flight ones and let the
+                # simulation thread seal the results before the state is cleared
+                controller = st.session_state.simulation_controller
+                with st.spinner("Stopping simulation - draining in-flight wafers..."):
+                    controller.stop()
+                    if st.session_state.simulation_thread is not None:
+                        st.session_state.simulation_thread.join(timeout=SHUTDOWN_DRAIN_TIMEOUT + 5)
+                report = controller.shutdown_report
                 st.session_state.simulation_running = False
                 st.session_state.simulation_controller = None
                 st.session_state.simulation_thread = None
                 st.session_state.simulation_start_time = None
                 st.session_state.simulation_duration = None
-                st.success("✅ Simulation stopped!")
+                if report:
+                    st.success(f"✅ Simulation stopped! Drained {report['drained']} in-flight wafer(s), "
+                               f"dropped {report['dropped']}.")
+                else:
+                    st.success("✅ Simulation stopped!")
                 time.sleep(0.5)
                 st.rerun()
             except Exception as e:
@@ -131,6 +168,7 @@ with col2:
 
 with col3:
     if st.button("🔄 Refresh Data", width='stretch'):
+        st.session_state.live_aggregator = None  # Force a full reload from disk
         st.rerun()
 
 # Check if simulation duration has elapsed (auto-stop detection)
@@ -161,7 +199,7 @@ if st.session_state.simulation_running:
     if should_stop:
         if st.session_state.simulation_controller:
             try:
-                st.session_state.simulation_controller.stop_all_machines()
+                st.session_state.simulation_controller.stop()
             except:
                 pass
         st.session_state.simulation_running = False
@@ -182,6 +220,17 @@ if st.session_state.simulation_finished:
 # Simulation status
 if st.session_state.simulation_running:
     st.info("🟢 **Simulation is running** - Processing wafers in the background...")
+    
+    # Live throughput straight from the controller (no result files read)
+    if st.session_state.simulation_controller:
+        live_metrics = st.session_state.simulation_controller.get_metrics()
+        overall = live_metrics['throughput'].get('All', {})
+        overall_latency = live_metrics['latency'].get('All', {}).get('total', {})
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Wafers/sec (recent)", f"{overall.get('recent_wafers_per_second', 0):.2f}")
+        col2.metric("Wafers Saved", f"{overall.get('total', 0):,}")
+        col3.metric("In Flight", live_metrics['queue_depth'])
+        col4.metric("p95 Wafer Latency", f"{overall_latency.get('p95_ms', 0):.0f} ms")
 else:
     st.info("⚪ **Simulation stopped** - Click 'Start Simulation' to begin")
     
@@ -189,9 +238,24 @@ st.markdown("---")
 
 st.markdown("### Key Performance Indicators")
 
-# Initialize data aggregator
-aggregator = DataAggregator()
-aggregator.load_results()
+# Initialize data aggregator: results are read from disk once, then new wafers stream in
+# incrementally - from the in-process controller while it runs, otherwise by tailing the
+# results shards (e.g. a simulation started with RUN_ManProcess.py)
+live_controller = st.session_state.simulation_controller
+live_source = id(live_controller) if live_controller else "files"
+if st.session_state.live_aggregator is None or st.session_state.live_source != live_source:
+    # Subscribe before loading so nothing saved in between is missed (duplicates are ignored)
+    if live_controller:
+        st.session_state.live_cursor = live_controller.subscribe(from_offset=0)
+    else:
+        st.session_state.live_cursor = ResultsTail(RESULTS_DIR, from_start=False)
+    aggregator = DataAggregator()
+    aggregator.load_results()
+    st.session_state.live_aggregator = aggregator
+    st.session_state.live_source = live_source
+else:
+    aggregator = st.session_state.live_aggregator
+    aggregator.add_results(st.session_state.live_cursor.poll())
 
 # Get available simulation dates
 available_dates = aggregator.get_available_simulation_dates()
@@ -229,6 +293,7 @@ with col1:
     auto_refresh = st.checkbox("🔄 Auto-refresh (5s)", value=True)
 with col2:
     if st.button("🔄 Refresh Now"):
+        st.session_state.live_aggregator = None  # Force a full reload from disk
         st.rerun()
 
 # Get summary statistics - handle no data gracefully
@@ -398,8 +463,8 @@ with col2:
                     
                     deleted_count = 0
                     
-                    # Delete all results JSON files
-                    results_files = list(RESULTS_DIR.glob("results_*.json"))
+                    # Delete all results JSON files (and shard manifests)
+                    results_files = list(RESULTS_DIR.glob("results_*.json")) + list(RESULTS_DIR.glob("manifest_*.json"))
                     for file in results_files:
                         file.unlink()
                         deleted_count += 1
@@ -413,12 +478,13 @@ with col2:
                     
                     # Delete all log files
                     if LOGS_DIR.exists():
-                        log_files = list(LOGS_DIR.glob("*.log"))
+                        log_files = list(LOGS_DIR.glob("*.log")) + list(LOGS_DIR.glob("*.jsonl"))
                         for file in log_files:
                             file.unlink()
                             deleted_count += 1
                     
                     st.session_state.confirm_clear = False
+                    st.session_state.live_aggregator = None
                     st.success(f"✅ Successfully cleared {deleted_count} files! All manufacturing data has been deleted.")
                     time.sleep(1)
                     st.rerun()
@@ -3,6 +3,7 @@ AI Assistant Page - Queries & Reports
 """
 import streamlit as st
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -12,6 +13,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "Repository"))
 from Repository.Query_Processor import QueryProcessor
 from Repository.Summary_Generator import SummaryGenerator
 from Repository.LLM_Monitoring_Agent import LLMMonitoringAgent
+from Repository.Data_Aggregator import DataAggregator
+from Repository.Conversation_Session import ConversationSession
 
 # Page code runs directly (no show() function needed for Streamlit pages)
 st.title("🤖 AI Assistant - Chat Interface")
@@ -92,11 +95,20 @@ if 'current_query' not in st.session_state:
 if 'query_input_key' not in st.session_state:
     st.session_state.query_input_key = 0
 
-# Initialize components
+# Initialize components (one aggregator per session, shared by all of them: a rerun only
+# re-parses results files that changed since the previous one)
 try:
-    processor = QueryProcessor()
-    generator = SummaryGenerator()
-    agent = LLMMonitoringAgent()
+    if 'aggregator' not in st.session_state:
+        st.session_state.aggregator = DataAggregator()
+    processor = QueryProcessor(aggregator=st.session_state.aggregator)
+    generator = SummaryGenerator(aggregator=st.session_state.aggregator)
+    agent = LLMMonitoringAgent(aggregator=st.session_state.aggregator)
+    processor.llm_agent = agent
+    generator.llm_agent = agent
+    # Conversation memory: follow-up questions send a rolling summary and the data changes,
+    # not the whole data again
+    if 'conversation' not in st.session_state:
+        st.session_state.conversation = ConversationSession(st.session_state.aggregator)
     llm_available = agent.client is not None
 except Exception as e:
     st.warning(f"⚠️ Some components may not be available: {str(e)}")
@@ -131,6 +143,23 @@ with st.expander("💡 Quick Questions", expanded=False):
                 st.session_state.current_query = question
                 st.session_state.process_query_now = True
                 st.rerun()
+    
+    # All quick questions in one batch: statistics computed once, LLM calls made concurrently
+    if st.button("⚡ Ask all quick questions", key="quick_all", width='stretch', disabled=processor is None):
+        with st.spinner(f"🤔 Processing {len(quick_questions)} questions..."):
+            try:
+                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                for result in processor.process_queries(quick_questions, use_llm=llm_available):
+                    st.session_state.conversation.add_turn(result['query'], result['answer'],
+                                                           result['query_type'], result['answered_by'])
+                    st.session_state.conversation_history.append({
+                        'question': result['query'],
+                        'answer': result['answer'] or 'No answer available',
+                        'timestamp': timestamp
+                    })
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error processing quick questions: {str(e)}")
 
 st.markdown("---")
 
@@ -158,6 +187,20 @@ def escape_html(text):
     escaped = re.sub(r'(<br>\s*){3,}', '<br><br>', escaped)
     return escaped
 
+# Minimum seconds between re-renders of a streaming answer (each render is sent to the browser)
+STREAM_RENDER_INTERVAL = 0.05
+
+def render_streaming_message(question, answer, timestamp):
+    """Build the chat HTML of a question and its (partial) answer, with a typing cursor."""
+    return (
+        '<div class="chat-message user-message"><div class="message-content">'
+        f'<div class="message-header">👤 You • {escape_html(timestamp)}</div>'
+        f'<div class="message-text">{escape_html(question)}</div></div></div>'
+        '<div class="chat-message assistant-message"><div class="message-content">'
+        f'<div class="message-header">🤖 AI Assistant • {escape_html(timestamp)}</div>'
+        f'<div class="message-text">{escape_html(answer)}▌</div></div></div>'
+    )
+
 # Create scrollable chat container
 if st.session_state.conversation_history:
     # Build HTML for all messages with proper formatting
@@ -236,11 +279,38 @@ with col2:
 with col3:
     if st.button("🗑️ Clear Chat", use_container_width=True):
         st.session_state.conversation_history = []
+        if 'conversation' in st.session_state:
+            st.session_state.conversation.reset()  # The next question starts a new conversation
         st.session_state.current_query = ""
         st.session_state.process_query_now = False
         st.session_state.query_input_key += 1  # Force text_area to reset
         st.rerun()
 
+# Repeated questions about unchanged data are answered from the response cache
+force_refresh = st.checkbox(
+    "♻️ Force fresh answer (bypass response cache)",
+    value=False,
+    disabled=not llm_available,
+    help="Cached answers are reused only while the question and the manufacturing data are unchanged"
+)
+# Structured questions (machines, defect types, anomalies, trends) are answered instantly from
+# the statistics; deep questions and everything else go to the LLM
+deep_analysis = st.checkbox(
+    "🔬 Deep analysis (always ask the LLM)",
+    value=False,
+    disabled=not llm_available,
+    help="Questions worded with 'why', 'explain', 'detailed'... are sent to the LLM automatically"
+)
+if agent and agent.cache is not None:
+    cache_stats = agent.get_cache_stats()
+    st.caption(f"Response cache: {cache_stats['entries']} cached answers • "
+               f"{cache_stats['hits']} hits / {cache_stats['misses']} misses since startup")
+if 'conversation' in st.session_state and st.session_state.conversation.stats()['llm_turns']:
+    conversation_stats = st.session_state.conversation.stats()
+    st.caption(f"Conversation: {conversation_stats['turns']} turns • data sent "
+               f"{conversation_stats['context_sends']}x ({conversation_stats['prefix_tokens']} tokens, "
+               f"reused by follow-ups) • last question added {conversation_stats['last_turn_tokens']} tokens")
+
 # Process query if button clicked or quick question selected
 should_process = (ask_button or st.session_state.process_query_now) and user_query and processor
 
@@ -254,15 +324,27 @@ if should_process:
     
     with st.spinner("🤔 Processing your question..."):
         try:
-            result = processor.process_query(query_to_process, use_llm=llm_available)
+            # Render the answer while it streams in (local statistics first, then the LLM tokens)
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            live_message = st.empty()
+            answer = ""
+            last_render = 0.0
+            for chunk in processor.stream_query(query_to_process, use_llm=llm_available,
+                                                refresh=force_refresh, deep=deep_analysis,
+                                                session=st.session_state.conversation):
+                answer += chunk
+                if time.monotonic() - last_render >= STREAM_RENDER_INTERVAL:
+                    live_message.markdown(render_streaming_message(query_to_process, answer, timestamp),
+                                          unsafe_allow_html=True)
+                    last_render = time.monotonic()
             
-            answer = result.get('answer', 'No answer available')
+            answer = answer or 'No answer available'
             
             # Add to conversation history
             st.session_state.conversation_history.append({
                 'question': query_to_process,
                 'answer': answer,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'timestamp': timestamp
             })
             
             # Clear current query after processing
@@ -298,7 +380,7 @@ report_type = st.selectbox(
 # Get available simulation dates for filtering
 if generator:
     try:
-        generator.aggregator.load_results()
+        generator.aggregator.refresh()
         available_dates = generator.aggregator.get_available_simulation_dates()
     except:
         available_dates = []
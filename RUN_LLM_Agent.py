@@ -4,6 +4,7 @@ Interactive interface for querying and generating reportsd
 """
 
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -12,6 +13,7 @@ sys.path.insert(0, str(Path(__file__).parent / "Repository"))
 
 from Repository.config_LLM import validate_config
 from Repository.LLM_Monitoring_Agent import LLMMonitoringAgent
+from Repository.Conversation_Session import ConversationSession
 from Repository.Query_Processor import QueryProcessor
 from Repository.Summary_Generator import SummaryGenerator
 
@@ -46,8 +48,9 @@ def generate_summary(agent: LLMMonitoringAgent):
     """Generate and display daily summary."""
     print("\nGenerating daily summary...")
     print("-"*70)
-    summary = agent.generate_daily_summary()
-    print(summary)
+    for chunk in agent.stream_daily_summary():
+        print(chunk, end="", flush=True)
+    print()
 
 
 def interactive_query(processor: QueryProcessor):
@@ -59,6 +62,9 @@ def interactive_query(processor: QueryProcessor):
     print("Type 'back' to return to main menu.")
     print("-"*70)
     
+    # Follow-up questions reuse the conversation (summary of earlier turns + data changes only)
+    session = ConversationSession(processor.aggregator)
+    
     while True:
         query = input("\nYour question: ").strip()
         
@@ -70,8 +76,10 @@ def interactive_query(processor: QueryProcessor):
         
         print("\nProcessing query...")
         print("-"*70)
-        result = processor.process_query(query, use_llm=True)
-        print(f"\nAnswer:\n{result['answer']}")
+        print("\nAnswer:")
+        for chunk in processor.stream_query(query, use_llm=True, session=session):
+            print(chunk, end="", flush=True)
+        print()
         print("-"*70)
 
 
@@ -166,11 +174,17 @@ def test_examples(processor: QueryProcessor):
         "Show me a summary of today's manufacturing results"
     ]
     
-    for i, query in enumerate(test_queries, 1):
+    # One batch: data and statistics computed once, LLM calls run concurrently
+    print("\nProcessing all examples...")
+    start = time.perf_counter()
+    results = processor.process_queries(test_queries, use_llm=True)
+    print(f"✓ {len(results)} examples answered in {time.perf_counter() - start:.1f}s")
+    
+    for i, result in enumerate(results, 1):
         print(f"\n{'='*70}")
-        print(f"Example {i}: {query}")
+        print(f"Example {i}: {result['query']}")
+        print(f"Type: {result['query_type']} (answered by: {result['answered_by']}, {result['seconds']:.2f}s)")
         print(f"{'='*70}")
-        result = processor.process_query(query, use_llm=True)
         print(f"\nAnswer:\n{result['answer'][:500]}...")  # Show first 500 chars
         input("\nPress Enter to continue to next example...")
 
@@ -196,8 +210,10 @@ def main():
     print("\nInitializing components...")
     try:
         agent = LLMMonitoringAgent()
-        processor = QueryProcessor()
-        generator = SummaryGenerator()
+        processor = QueryProcessor(aggregator=agent.aggregator)
+        generator = SummaryGenerator(aggregator=agent.aggregator)
+        processor.llm_agent = agent
+        generator.llm_agent = agent
         print("✓ Components initialized successfully")
     except Exception as e:
         print(f"⚠️  Error initializing components: {e}")
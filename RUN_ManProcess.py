@@ -9,11 +9,9 @@ from pathlib import Path
 # Add Repository to path for imports
 sys.path.insert(0, str(Path(__file__).parent / "Repository"))
 
-from Repository.Manufacturing_Simulation import ManufacturingProcessController
-import logging
-
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+from Repository.Manufacturing_Simulation import ManufacturingProcessController, setup_logging
+from Repository.Async_Simulation import AsyncManufacturingProcessController
+from Repository.Distributed_Simulation import SimulationCoordinator
 
 if __name__ == "__main__":
     # Configuration - Modify these values as needed
@@ -22,6 +20,15 @@ if __name__ == "__main__":
     NUM_THERMAL = 2
     SIMULATION_DURATION = 60  # seconds
     MAX_WAFERS = None  # Set to a number to limit, or None for unlimited
+    SEED = None  # Set to an integer for a reproducible workload, or None for random
+    RECORD_WORKLOAD = None  # Path to record the workload to (e.g. "workload.json"), or None
+    REPLAY_WORKLOAD = None  # Path of a recorded workload to replay, or None
+    METRICS_PORT = None  # Port for the Prometheus metrics endpoint on localhost (e.g. 9108), or None
+    CONSOLE_LOG_SAMPLE_RATE = 1  # Print 1 out of every N per-wafer log lines to the console (all go to the log file)
+    ENGINE = "threads"  # "threads" (one thread per machine), "asyncio" (machine coroutines, for large tool counts)
+                        # or "distributed" (machines spread over NUM_WORKERS local worker processes)
+    NUM_WORKERS = 2  # Worker processes for the "distributed" engine
+    IMAGE_SOURCE = "dataset"  # "dataset" (copy Repository/Test images) or "synthetic" (rendered wafer maps, for load tests)
     
     print("="*70)
     print("SEMICONDUCTOR MANUFACTURING PROCESS SIMULATION")
@@ -31,27 +38,60 @@ if __name__ == "__main__":
     print(f"  - Electrical Machines: {NUM_ELECTRICAL}")
     print(f"  - Thermal Machines: {NUM_THERMAL}")
     print(f"  - Simulation Duration: {SIMULATION_DURATION} seconds")
+    print(f"  - Engine: {ENGINE}")
+    print(f"  - Image Source: {IMAGE_SOURCE}")
     if MAX_WAFERS:
         print(f"  - Max Wafers: {MAX_WAFERS}")
+    if SEED is not None:
+        print(f"  - Seed: {SEED}")
+    if REPLAY_WORKLOAD:
+        print(f"  - Replaying Workload: {REPLAY_WORKLOAD}")
     print("\nThe simulation will:")
-    print("  1. Generate wafer images from test dataset")
+    print("  1. Generate wafer images from test dataset" if IMAGE_SOURCE == "dataset" else "  1. Render synthetic wafer images")
     print("  2. Analyze each wafer for defects")
     print("  3. Save results to Manufacturing_Output/ directory")
     print("\n" + "="*70)
     
+    # Asynchronous logging: text log, per-wafer events file and sampled console output
+    setup_logging(console_sample_rate=CONSOLE_LOG_SAMPLE_RATE)
+    
     # Create and run simulation
     try:
-        controller = ManufacturingProcessController(
+        if ENGINE == "distributed":
+            coordinator = SimulationCoordinator(
+                num_mechanical=NUM_MECHANICAL,
+                num_electrical=NUM_ELECTRICAL,
+                num_thermal=NUM_THERMAL,
+                num_workers=NUM_WORKERS,
+                seed=SEED,
+                image_source=IMAGE_SOURCE
+            )
+            coordinator.run_simulation(duration_seconds=SIMULATION_DURATION, max_wafers=MAX_WAFERS)
+            print("\nSimulation completed successfully!")
+            sys.exit(0)
+        
+        controller_class = AsyncManufacturingProcessController if ENGINE == "asyncio" else ManufacturingProcessController
+        controller = controller_class(
             num_mechanical=NUM_MECHANICAL,
             num_electrical=NUM_ELECTRICAL,
-            num_thermal=NUM_THERMAL
+            num_thermal=NUM_THERMAL,
+            seed=SEED,
+            image_source=IMAGE_SOURCE
         )
         
+        if METRICS_PORT:
+            server = controller.start_metrics_server(port=METRICS_PORT)
+            print(f"Metrics endpoint: {server.url}")
+        
         controller.run_simulation(
             duration_seconds=SIMULATION_DURATION,
-            max_wafers=MAX_WAFERS
+            max_wafers=MAX_WAFERS,
+            record_workload=RECORD_WORKLOAD,
+            replay_workload=REPLAY_WORKLOAD
         )
         
+        controller.stop_metrics_server()
+        
         print("\nSimulation completed successfully!")
         print(f"Check the Manufacturing_Output/ directory for results and logs.")
         
@@ -0,0 +1,398 @@
+"""
+Async LLM Client
+Concurrent OpenAI chat-completions client: one pooled HTTP connection set, bounded concurrency,
+token-bucket rate limiting and exponential backoff with jitter on rate-limit/overload errors.
+The client runs on its own event loop thread, so synchronous callers (Streamlit pages, the CLI,
+the report generator) can submit independent calls and let them run in parallel.
+"""
+
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from Repository.config_LLM import (
+    OPENAI_MODEL, LLM_TEMPERATURE, MAX_TOKENS,
+    LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_SECOND, LLM_RATE_BURST, LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS, LLM_REQUEST_TIMEOUT_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server overload
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Connection-level errors (openai exception class names, matched without importing openai)
+RETRY_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether a failed request may succeed if sent again."""
+    if "insufficient_quota" in str(error):  # A 429 that waiting does not fix
+        return False
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUS_CODES
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRY_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server's Retry-After hint (seconds) from an API error, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def build_messages(prompt: str, system_prompt: str) -> List[Dict[str, str]]:
+    """Build the chat messages of a system + user prompt."""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+
+# ------------------------------------------------------------------------------------------
+# Rate Limiting
+# ------------------------------------------------------------------------------------------
+class TokenBucket:
+    """Asyncio token bucket: allows bursts of `capacity` requests, then `rate` per second."""
+
+    def __init__(self, rate: Optional[float], capacity: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second (None or 0: unlimited)
+            capacity: Maximum number of stored tokens
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._state_lock = threading.Lock()  # Guards tokens/updated across loops
+        self._locks = weakref.WeakKeyDictionary()  # Waiting-line lock per event loop
+
+    async def acquire(self) -> float:
+        """
+        Take one token, waiting for the refill if the bucket is empty.
+
+        Returns:
+            Seconds spent waiting (including behind earlier waiters)
+        """
+        if not self.rate:
+            return 0.0
+        loop = asyncio.get_running_loop()
+        with self._state_lock:
+            lock = self._locks.get(loop)
+            if lock is None:
+                lock = self._locks[loop] = asyncio.Lock()
+        start = time.monotonic()
+        async with lock:  # First come, first served (within a loop)
+            while True:
+                with self._state_lock:
+                    now = time.monotonic()
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return now - start
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+
+# ------------------------------------------------------------------------------------------
+# Client
+# ------------------------------------------------------------------------------------------
+class AsyncLLMClient:
+    """
+    Chat-completions client with pooled connections, a concurrency limit, rate limiting and
+    retries.
+
+    Every request takes a rate-limit token and a concurrency slot; rate-limited (429),
+    overloaded (5xx) and dropped requests are retried with exponential backoff and full jitter,
+    honoring Retry-After. Coroutines (complete, stream, complete_many) run on any loop: each
+    loop gets its own connection pool and concurrency limit (asyncio objects cannot be shared
+    between loops), while the rate limit is shared. The *_sync/submit methods run them on the
+    client's own loop thread, which also keeps the connection pool alive between calls.
+    Thread-safe.
+    """
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_second: Optional[float] = LLM_REQUESTS_PER_SECOND,
+                 burst: int = LLM_RATE_BURST, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE_SECONDS, backoff_max: float = LLM_BACKOFF_MAX_SECONDS,
+                 timeout: float = LLM_REQUEST_TIMEOUT_SECONDS, seed: Optional[int] = None):
+        """
+        Initialize the client (no connection is made until the first request).
+
+        Args:
+            api_key: OpenAI API key
+            base_url: API base URL (None for the OpenAI default)
+            max_concurrency: Requests in flight at once per event loop (also the connection pool size)
+            requests_per_second: Rate limit (None for unlimited)
+            burst: Requests that may start back to back before the rate limit applies
+            max_retries: Retries per request
+            backoff_base: First retry delay bound in seconds (doubles per attempt)
+            backoff_max: Maximum retry delay bound in seconds
+            timeout: Request timeout in seconds
+            seed: Seed of the backoff jitter (None: non-deterministic)
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self._rng = random.Random(seed)
+        self._loop_clients = weakref.WeakKeyDictionary()  # Event loop -> (AsyncOpenAI, Semaphore)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0,
+                       "max_in_flight": 0, "throttled_seconds": 0.0, "backoff_seconds": 0.0}
+
+    def _get_client(self) -> Tuple:
+        """
+        Get the OpenAI async client and concurrency semaphore of the running loop.
+
+        Both are created on first use in a loop: the HTTP connections and the semaphore are
+        bound to the loop they are used on.
+
+        Returns:
+            Tuple (AsyncOpenAI client, asyncio.Semaphore)
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loop_clients.get(loop)
+            if state is None:
+                import httpx
+                from openai import AsyncOpenAI
+
+                limits = httpx.Limits(max_connections=self.max_concurrency,
+                                      max_keepalive_connections=self.max_concurrency)
+                # Retries are handled here (with the rate limiter), not by the SDK
+                client = AsyncOpenAI(
+                    api_key=self.api_key, base_url=self.base_url, timeout=self.timeout, max_retries=0,
+                    http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout)
+                )
+                state = self._loop_clients[loop] = (client, asyncio.Semaphore(self.max_concurrency))
+        return state
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before a retry: a uniform draw in [0, min(max, base * 2^attempt)] (full jitter),
+        but never shorter than the server's Retry-After hint.
+
+        Args:
+            attempt: Retry number, starting at 0
+            retry_after: Retry-After hint in seconds
+
+        Returns:
+            Delay in seconds
+        """
+        delay = self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    async def _send(self, create):
+        """Send one request with rate limiting and retries; create() starts the API call."""
+        attempt = 0
+        while True:
+            self._stats["throttled_seconds"] += await self.bucket.acquire()
+            self._stats["requests"] += 1
+            try:
+                return await create()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._stats["failures"] += 1
+                    raise
+                delay = self.backoff_delay(attempt, retry_after_seconds(e))
+                logger.warning(f"LLM request failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                self._stats["retries"] += 1
+                self._stats["backoff_seconds"] += delay
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def _enter(self):
+        self._stats["in_flight"] += 1
+        self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+
+    def _exit(self):
+        self._stats["in_flight"] -= 1
+
+    async def complete(self, prompt: str, system_prompt: str, temperature: float = LLM_TEMPERATURE,
+                       max_tokens: int = MAX_TOKENS, model: str = OPENAI_MODEL) -> str:
+        """
+        Get a chat completion.
+
+        Args:
+            prompt: User prompt
+            system_prompt: System prompt
+            temperature: Sampling temperature
+            max_tokens: Response token limit
+            model: Model name
+
+        Returns:
+            Response text
+
+        Raises:
+            Exception: The API error, once retries are exhausted or when it is not retryable
+        """
+        client, semaphore = self._get_client()
+        async with semaphore:
+            self._enter()
+            try:
+                response = await self._send(lambda: client.chat.completions.create(
+                    model=model, messages=build_messages(prompt, system_prompt),
+                    temperature=temperature, max_tokens=max_tokens
+                ))
+            finally:
+                self._exit()
+        return response.choices[0].message.content
+
+    async def stream(self, prompt: str, system_prompt: str, temperature: float = LLM_TEMPERATURE,
+                     max_tokens: int = MAX_TOKENS, model: str = OPENAI_MODEL) -> AsyncIterator[str]:
+        """
+        Stream a chat completion.
+
+        Opening the stream is retried like complete(); an error after text was received is
+        raised as is (the partial response cannot be resumed).
+
+        Yields:
+            Response text chunks
+        """
+        client, semaphore = self._get_client()
+        async with semaphore:
+            self._enter()
+            try:
+                events = await self._send(lambda: client.chat.completions.create(
+                    model=model, messages=build_messages(prompt, system_prompt),
+                    temperature=temperature, max_tokens=max_tokens, stream=True
+                ))
+                async for event in events:
+                    if event.choices and event.choices[0].delta.content:
+                        yield event.choices[0].delta.content
+            finally:
+                self._exit()
+
+    async def complete_many(self, requests: List[Dict]) -> List:
+        """
+        Run independent completions concurrently (within the concurrency and rate limits).
+
+        Args:
+            requests: complete() keyword arguments per request
+
+        Returns:
+            Response text or the raised exception per request, in request order
+        """
+        return await asyncio.gather(*(self.complete(**r) for r in requests), return_exceptions=True)
+
+    # --------------------------------------------------------------------------------------
+    # Synchronous Interface (client event loop thread)
+    # --------------------------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro) -> Future:
+        """
+        Run a coroutine on the client's event loop.
+
+        Returns:
+            concurrent.futures.Future of its result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def complete_sync(self, prompt: str, system_prompt: str, **kwargs) -> str:
+        """Blocking complete() (see complete for the arguments)."""
+        return self.submit(self.complete(prompt, system_prompt, **kwargs)).result()
+
+    def complete_many_sync(self, requests: List[Dict]) -> List:
+        """Blocking complete_many() (see complete_many)."""
+        return self.submit(self.complete_many(requests)).result()
+
+    def stream_sync(self, prompt: str, system_prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Blocking stream(): yields text chunks as the client's loop receives them.
+
+        Closing the iterator early cancels the request.
+        """
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for text in self.stream(prompt, system_prompt, **kwargs):
+                    chunks.put(("text", text))
+            except Exception as e:
+                chunks.put(("error", e))
+            finally:
+                chunks.put(("end", None))
+
+        future = self.submit(pump())
+        try:
+            while True:
+                kind, value = chunks.get()
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            future.cancel()
+
+    def stats(self) -> Dict:
+        """
+        Get request statistics.
+
+        Returns:
+            Dictionary with requests (attempts), retries, failures, in_flight, max_in_flight,
+            throttled_seconds (rate-limit waits) and backoff_seconds
+        """
+        return {k: round(v, 3) if isinstance(v, float) else v for k, v in self._stats.items()}
+
+    async def aclose(self):
+        """Close the connection pool of the running loop (call before that loop is closed)."""
+        with self._lock:
+            state = self._loop_clients.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].close()
+
+    def close(self):
+        """Close the connection pool of the client's own loop and stop its thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+
+# Process-wide clients by (api_key, base_url), shared by every agent (and every Streamlit rerun)
+_CLIENTS: Dict[Tuple[str, Optional[str]], AsyncLLMClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_llm_client(api_key: str, base_url: Optional[str] = None) -> AsyncLLMClient:
+    """Get the process-wide client of an API key and base URL (created on first use)."""
+    with _CLIENTS_LOCK:
+        key = (api_key, base_url)
+        if key not in _CLIENTS:
+            _CLIENTS[key] = AsyncLLMClient(api_key, base_url)
+        return _CLIENTS[key]
@@ -0,0 +1,165 @@
+"""
+Asyncio Engine for the Manufacturing Simulation
+Runs every machine as a coroutine on a single event loop instead of one OS thread per machine;
+the blocking wafer generation and defect analysis are offloaded to a bounded thread pool
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from Repository.Manufacturing_Simulation import (
+    ManufacturingProcessController, ManufacturingMachine, STATUS_LOG_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+# Threads running wafer generation + analysis (independent of the number of machines)
+DEFAULT_ANALYSIS_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+# ------------------------------------------------------------------------------------------
+# Async Manufacturing Process Controller
+# ------------------------------------------------------------------------------------------
+class AsyncManufacturingProcessController(ManufacturingProcessController):
+    """
+    Manufacturing process controller driven by an asyncio event loop.
+
+    Machines are coroutines that wait with asyncio.sleep(), so hundreds of simulated tools
+    cost no more threads than the analysis pool. The run_simulation() API, result format,
+    results shards, metrics and workload record/replay are the same as the threaded controller.
+    """
+
+    def __init__(self, num_mechanical: int = 2, num_electrical: int = 2, num_thermal: int = 1,
+                 seed: Optional[int] = None, analysis_workers: int = DEFAULT_ANALYSIS_WORKERS,
+                 image_source: str = "dataset"):
+        """
+        Initialize the async manufacturing process controller.
+
+        Args:
+            num_mechanical: Number of mechanical machines
+            num_electrical: Number of electrical machines
+            num_thermal: Number of thermal machines
+            seed: Seed for the per-machine RNGs (None for a non-deterministic run)
+            analysis_workers: Size of the thread pool running wafer generation and analysis
+            image_source: "dataset" (copy test images) or "synthetic" (render wafer maps)
+        """
+        super().__init__(num_mechanical, num_electrical, num_thermal, seed=seed, image_source=image_source)
+        self.analysis_workers = analysis_workers
+
+    async def _async_sleep_until(self, deadline: float):
+        """Sleep until the given time.time() deadline, waking early if the simulation stops."""
+        while self.is_running:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, 0.5))
+
+    async def _admit_and_run_async(self, executor: ThreadPoolExecutor, machine: ManufacturingMachine,
+                                   virtual_time: float, source_image: Optional[str] = None) -> bool:
+        """
+        Reserve a wafer slot and process the wafer in the analysis pool.
+
+        Returns:
+            False if admission was refused (max_wafers reached or admission closed)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._admit_and_run, machine, virtual_time, source_image)
+
+    async def _machine_coroutine(self, executor: ThreadPoolExecutor, machine: ManufacturingMachine,
+                                 start_time: float, end_time: float):
+        """Coroutine driving one machine."""
+        if self.workload_trace is not None:
+            await self._replay_coroutine(executor, machine, start_time, end_time)
+            return
+
+        while self.is_running and time.time() < end_time:
+            if not await self._admit_and_run_async(executor, machine, time.time() - start_time):
+                break
+
+            # Wait random interval before next wafer
+            await self._async_sleep_until(time.time() + machine.next_interval())
+
+    async def _replay_coroutine(self, executor: ThreadPoolExecutor, machine: ManufacturingMachine,
+                                start_time: float, end_time: float):
+        """Coroutine replaying the recorded workload of one machine."""
+        for event in self.workload_trace.events_for(machine.machine_id):
+            await self._async_sleep_until(start_time + event["virtual_time"])
+            if not self.is_running or time.time() >= end_time:
+                break
+            if not await self._admit_and_run_async(executor, machine, event["virtual_time"],
+                                                   source_image=event["source_image"]):
+                break
+
+    async def _status_coroutine(self, start_time: float):
+        """Log a status line every STATUS_LOG_INTERVAL seconds."""
+        while self.is_running:
+            await asyncio.sleep(STATUS_LOG_INTERVAL)
+            self._log_status(start_time)
+
+    async def _run_machines(self, start_time: float, end_time: float):
+        """Run all machine coroutines until the duration ends or every machine is done."""
+        executor = ThreadPoolExecutor(max_workers=self.analysis_workers, thread_name_prefix="wafer-analysis")
+        machine_tasks = [
+            asyncio.create_task(self._machine_coroutine(executor, machine, start_time, end_time))
+            for machine in self.machines
+        ]
+        status_task = asyncio.create_task(self._status_coroutine(start_time))
+        try:
+            while time.time() < end_time and not self.admission.closed:
+                _, pending = await asyncio.wait(machine_tasks, timeout=min(end_time - time.time(), 0.5))
+                if not pending:
+                    break  # All machines finished early (max_wafers reached or replay done)
+        finally:
+            # Stop admission and the machines; wafers already being analyzed keep running in
+            # the pool and are drained by shutdown() once the event loop has exited
+            self.stop()
+            status_task.cancel()
+            for task in machine_tasks:
+                task.cancel()
+            await asyncio.gather(*machine_tasks, status_task, return_exceptions=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run_simulation(self, duration_seconds: int = 60, max_wafers: Optional[int] = None, simulation_date: Optional[str] = None,
+                       record_workload: Optional[str] = None, replay_workload: Optional[str] = None):
+        """
+        Run the manufacturing simulation on an asyncio event loop.
+
+        Args:
+            duration_seconds: How long to run the simulation (in seconds)
+            max_wafers: Maximum number of wafers to process (None for unlimited)
+            simulation_date: Date string (YYYY-MM-DD) for this simulation run, or None to use today's date
+            record_workload: File to record the (machine, source image, virtual time) sequence to
+            replay_workload: Workload file to replay instead of drawing random wafers
+        """
+        start_time = self._begin_run(duration_seconds, max_wafers, simulation_date, record_workload, replay_workload)
+        logger.info(f"Async engine: {len(self.machines)} machine coroutines, {self.analysis_workers} analysis workers")
+
+        try:
+            asyncio.run(self._run_machines(start_time, start_time + duration_seconds))
+        except KeyboardInterrupt:
+            logger.info("Simulation interrupted by user")
+
+        # Drain in-flight wafers and seal the results
+        self.shutdown()
+        self._finish_run(record_workload)
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    # Full-fab scale: hundreds of tools on one event loop
+    controller = AsyncManufacturingProcessController(
+        num_mechanical=100,
+        num_electrical=100,
+        num_thermal=100,
+        seed=42
+    )
+    controller.run_simulation(duration_seconds=60)
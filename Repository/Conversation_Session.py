@@ -0,0 +1,272 @@
+"""
+Conversation Session
+Multi-turn memory of the AI assistant. The manufacturing data is sent once per conversation,
+in a system prompt that stays identical from turn to turn (so the API's prompt cache can serve
+it); a follow-up only adds a rolling summary of the earlier turns, the previous answer, what
+changed in the data since it was sent, and the question. Follow-ups cost a bounded number of
+new prompt tokens instead of the whole data context again.
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from Repository.config_LLM import (
+    SYSTEM_PROMPT, DEFECT_PERCENTAGE_THRESHOLD, LLM_CONTEXT_TOKEN_BUDGET,
+    CONVERSATION_SUMMARY_TOKEN_BUDGET, CONVERSATION_LAST_ANSWER_TOKENS,
+    CONVERSATION_TURN_SUMMARY_CHARS, CONVERSATION_REBASE_GROWTH
+)
+from Repository.LLM_Context_Builder import ContextBuilder, count_tokens
+
+# Separator and header lines of the query handlers' answers (no content, skipped in summaries)
+DECORATION_PATTERN = re.compile(r"^\s*(?:=+|-+|(?:Detailed |Enhanced )?Analysis:)\s*$", re.MULTILINE)
+
+# Instructions sent once with the data (the per-turn prompt only carries the question)
+SESSION_INSTRUCTIONS = """You are answering an operator's questions about the manufacturing process in a conversation.
+
+The manufacturing data below was captured at the start of the conversation ({captured}). Each question comes with a summary of the conversation so far and the changes of the data since it was captured; take both into account.
+
+The manufacturing data includes simulation_date information (format: YYYY-MM-DD) that indicates when each wafer was processed. When answering questions about dates, trends over time, or which date has the most defects, use the date statistics provided.
+
+Provide clear, technical answers with specific numbers, statistics, dates, and actionable recommendations. If a question relates to defect causes, explain the multi-physics aspects (thermal, mechanical, electrical domains).
+
+MANUFACTURING DATA:
+{context}"""
+
+
+def compact_answer(answer: str, max_chars: int = CONVERSATION_TURN_SUMMARY_CHARS) -> str:
+    """
+    One-line gist of an answer: decoration dropped, whitespace collapsed, truncated.
+
+    Args:
+        answer: Answer text
+        max_chars: Maximum length of the gist
+
+    Returns:
+        Gist of the answer
+    """
+    text = " ".join(DECORATION_PATTERN.sub("", answer or "").split())
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text to about max_tokens tokens.
+
+    Args:
+        text: Text to cut
+        max_tokens: Maximum tokens
+
+    Returns:
+        The text, or its beginning followed by "…"
+    """
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep = int(len(text) * max_tokens / tokens)
+    while keep > 0 and count_tokens(text[:keep]) > max_tokens:
+        keep = int(keep * 0.9)
+    return text[:keep].rstrip() + " …"
+
+
+# ------------------------------------------------------------------------------------------
+# Conversation Session Class
+# ------------------------------------------------------------------------------------------
+class ConversationSession:
+    """Turns, rolling summary and data already sent of one AI assistant conversation."""
+
+    def __init__(self, aggregator, token_budget: int = LLM_CONTEXT_TOKEN_BUDGET,
+                 summary_token_budget: int = CONVERSATION_SUMMARY_TOKEN_BUDGET,
+                 last_answer_tokens: int = CONVERSATION_LAST_ANSWER_TOKENS,
+                 rebase_growth: float = CONVERSATION_REBASE_GROWTH,
+                 anomaly_threshold: float = DEFECT_PERCENTAGE_THRESHOLD):
+        """
+        Initialize an empty conversation.
+
+        Args:
+            aggregator: DataAggregator the answers are based on (shared with the agent)
+            token_budget: Maximum tokens of the data context sent with the first LLM turn
+            summary_token_budget: Maximum tokens of the earlier turns' summary
+            last_answer_tokens: The previous answer is kept verbatim up to this size
+            rebase_growth: Re-send the data once the wafer count changed by this fraction
+            anomaly_threshold: Defect percentage above which a wafer is an anomaly
+        """
+        self.aggregator = aggregator
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.last_answer_tokens = last_answer_tokens
+        self.rebase_growth = rebase_growth
+        self.anomaly_threshold = anomaly_threshold
+        self.reset()
+
+    def reset(self):
+        """Forget the turns and the data sent: the next question starts a new conversation."""
+        self.turns = []  # {"question", "answer", "query_type", "answered_by", "timestamp"}
+        self.system_prompt = None  # Instructions + data context, sent with every LLM turn
+        self._snapshot = None  # Data statistics of the context in system_prompt
+        self._stats = {"llm_turns": 0, "context_sends": 0, "turn_tokens": []}
+
+    # --------------------------------------------------------------------------------------
+    # Prompts
+    # --------------------------------------------------------------------------------------
+    def prepare(self, query: str, base_system_prompt: str = SYSTEM_PROMPT,
+                task: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Build the prompts of the next LLM turn.
+
+        The data context is built on the first LLM turn and rebuilt only when the data grew
+        or shrank by more than rebase_growth; otherwise only its changes are described.
+
+        Args:
+            query: Operator's question
+            base_system_prompt: System prompt the session instructions and data are added to
+            task: Answer instructions of the request, if it asks for more than an answer
+                (e.g. the structure of a recommendations list)
+
+        Returns:
+            Tuple (user prompt, system prompt)
+        """
+        current = self._data_snapshot()
+        changes = None
+        if self.system_prompt is None or self._needs_rebase(current):
+            context = ContextBuilder(self.aggregator, token_budget=self.token_budget,
+                                     anomaly_threshold=self.anomaly_threshold).build()
+            # Labeled by the data, not the clock: the same data gives the same prefix, so the
+            # first question of a new conversation can still be answered from the response cache
+            captured = f"{current['wafers']} wafers, latest result {current['latest_timestamp'] or 'none'}"
+            self.system_prompt = (base_system_prompt.rstrip() + "\n\n"
+                                  + SESSION_INSTRUCTIONS.format(captured=captured, context=context))
+            self._snapshot = current
+            self._stats["context_sends"] += 1
+        else:
+            changes = self._describe_changes(current)
+
+        parts = []
+        summary = self.summary()
+        if summary:
+            parts.append(f"Conversation so far:\n{summary}")
+        if self.turns:
+            last = self.turns[-1]
+            parts.append(f"Previous question: {last['question']}\n"
+                         f"Previous answer:\n{truncate_tokens(last['answer'], self.last_answer_tokens)}")
+        if changes:
+            parts.append(f"Data changes since the manufacturing data above: {changes}")
+        parts.append(f"Operator's Question: {query}")
+        if task:
+            parts.append(f"Answer instructions:\n{task}")
+        prompt = "\n\n".join(parts)
+
+        self._stats["llm_turns"] += 1
+        self._stats["turn_tokens"].append(count_tokens(prompt))
+        return prompt, self.system_prompt
+
+    def add_turn(self, question: str, answer: str, query_type: Optional[str] = None,
+                 answered_by: Optional[str] = None):
+        """
+        Record a completed turn (answered locally or by the LLM).
+
+        Args:
+            question: Operator's question
+            answer: Full answer text
+            query_type: Query type of the question
+            answered_by: "llm" or "local"
+        """
+        self.turns.append({
+            "question": question,
+            "answer": answer,
+            "query_type": query_type,
+            "answered_by": answered_by,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    def summary(self) -> str:
+        """
+        Rolling summary of the turns before the last one, newest kept first when over budget.
+
+        Returns:
+            One "- Q: ... -> A: ..." line per summarized turn ("" if there are none)
+        """
+        earlier = self.turns[:-1]
+        lines, tokens = [], 0
+        for turn in reversed(earlier):
+            line = f"- Q: {turn['question']} -> A: {compact_answer(turn['answer'])}"
+            line_tokens = count_tokens(line + "\n")
+            if tokens + line_tokens > self.summary_token_budget:
+                break
+            lines.append(line)
+            tokens += line_tokens
+        omitted = len(earlier) - len(lines)
+        if omitted:
+            lines.append(f"- ({omitted} earlier turns omitted)")
+        return "\n".join(reversed(lines))
+
+    # --------------------------------------------------------------------------------------
+    # Data Changes
+    # --------------------------------------------------------------------------------------
+    def _data_snapshot(self) -> Dict:
+        """Headline statistics the data changes are described with."""
+        summary = self.aggregator.get_summary_statistics()
+        if "error" in summary:
+            return {"wafers": 0, "pass_rate": 0.0, "avg_defect": 0.0, "anomalies": 0,
+                    "latest_date": None, "latest_timestamp": None}
+        dates = self.aggregator.get_available_simulation_dates()
+        return {
+            "wafers": summary["total_wafers"],
+            "pass_rate": summary["pass_rate"],
+            "avg_defect": summary["average_defect_percentage"],
+            "anomalies": len(self.aggregator.get_anomalies(self.anomaly_threshold)),
+            "latest_date": max(dates) if dates else None,
+            "latest_timestamp": max((r.get("timestamp") or "" for r in self.aggregator.data), default="") or None
+        }
+
+    def _needs_rebase(self, current: Dict) -> bool:
+        """Whether the data changed too much to be described as a delta."""
+        sent = self._snapshot["wafers"]
+        return abs(current["wafers"] - sent) > self.rebase_growth * max(sent, 1)
+
+    def _describe_changes(self, current: Dict) -> str:
+        """One line describing the data changes since the context was sent."""
+        sent = self._snapshot
+        if current == sent:
+            return "none (the data above is current)"
+        changes = [f"wafers {sent['wafers']} -> {current['wafers']} ({current['wafers'] - sent['wafers']:+d})",
+                   f"pass rate {sent['pass_rate']:.1f}% -> {current['pass_rate']:.1f}%",
+                   f"avg defect {sent['avg_defect']:.2f}% -> {current['avg_defect']:.2f}%",
+                   f"anomalies(>{self.anomaly_threshold:g}%) {sent['anomalies']} -> {current['anomalies']}"]
+        if current["latest_date"] != sent["latest_date"]:
+            changes.append(f"latest date {sent['latest_date']} -> {current['latest_date']}")
+        return ", ".join(changes)
+
+    def stats(self) -> Dict:
+        """
+        Conversation cost statistics.
+
+        Returns:
+            Dictionary with the turns, LLM turns, context sends, the tokens of the data prefix
+            (identical on every LLM turn) and the new prompt tokens of each LLM turn
+        """
+        turn_tokens = self._stats["turn_tokens"]
+        return {
+            "turns": len(self.turns),
+            "llm_turns": self._stats["llm_turns"],
+            "context_sends": self._stats["context_sends"],
+            "prefix_tokens": count_tokens(self.system_prompt) if self.system_prompt else 0,
+            "turn_tokens": list(turn_tokens),
+            "last_turn_tokens": turn_tokens[-1] if turn_tokens else 0
+        }
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point for Testing
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    from Repository.Data_Aggregator import DataAggregator
+
+    aggregator = DataAggregator()
+    aggregator.load_results()
+    session = ConversationSession(aggregator)
+    for question in ["Which machine has the highest defect rate?", "Why is that?", "What should we check first?"]:
+        prompt, system_prompt = session.prepare(question)
+        print(f"{'='*70}\n{prompt}\n")
+        session.add_turn(question, f"(answer to: {question})", answered_by="llm")
+    print(session.stats())
@@ -5,13 +5,29 @@ Parses JSON results files and provides aggregated statistics
 
 import json
 import os
+from contextlib import contextmanager
+from functools import wraps
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from collections import defaultdict
-import pandas as pd
 
 from Repository.config_LLM import RESULTS_DIR
+from Repository.LLM_Context_Builder import ContextBuilder
+from Repository.Results_Sink import load_manifest, shard_matches
+
+
+def batch_cached(method):
+    """Compute a statistics method once per arguments inside DataAggregator.cached_statistics()."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._stats_memo is None:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in self._stats_memo:
+            self._stats_memo[key] = method(self, *args, **kwargs)
+        return self._stats_memo[key]
+    return wrapper
 
 
 class DataAggregator:
@@ -27,41 +43,160 @@ class DataAggregator:
         self.results_dir = results_dir or RESULTS_DIR
         self.data = []
         self.df = None
-        
-    def load_results(self, file_path: Optional[Path] = None) -> List[Dict]:
+        self.shards_skipped = 0  # Shards skipped via manifest metadata in the last load
+        self._record_keys = None  # (wafer_id, timestamp) of loaded records, built on first add_results()
+        self._file_cache = {}  # results file -> ((size, mtime_ns), records) as last parsed
+        self._loaded_fingerprint = None  # Results files seen by the last unfiltered scan (see refresh())
+        self.files_parsed = 0  # Files actually parsed by the last load (the others came from the cache)
+        self._stats_memo = None  # Statistics computed inside cached_statistics(), None outside it
+        
+    def load_results(self, file_path: Optional[Path] = None, simulation_date: Optional[str] = None,
+                     start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> List[Dict]:
         """
         Load results from a specific JSON file or scan directory.
         
+        When scanning, results shards listed in a run manifest are skipped entirely if the
+        manifest's min/max timestamp and simulation dates show they cannot match the filters.
+        Files whose size and modification time are unchanged since they were last parsed are
+        not read again.
+        
         Args:
             file_path: Specific file to load, or None to load latest
+            simulation_date: Only keep wafers of this simulation date (YYYY-MM-DD)
+            start_time: Only keep wafers with a timestamp at or after this time
+            end_time: Only keep wafers with a timestamp at or before this time
             
         Returns:
             List of wafer result dictionaries
         """
+        start_iso = start_time.isoformat() if isinstance(start_time, datetime) else start_time
+        end_iso = end_time.isoformat() if isinstance(end_time, datetime) else end_time
+        self.shards_skipped = 0
+        filtered = bool(simulation_date or start_iso or end_iso)
+        fingerprint = None
+        
         if file_path:
-            files_to_load = [file_path]
+            files_to_load = [Path(file_path)]
         else:
-            # Find all results JSON files
-            files_to_load = sorted(
-                self.results_dir.glob("results_*.json"),
-                key=lambda x: x.stat().st_mtime,
-                reverse=True
-            )
+            # Shards described by a manifest can be skipped using its metadata
+            skipped = set()
+            if filtered:
+                for manifest_file in self.results_dir.glob("manifest_*.json"):
+                    manifest = load_manifest(manifest_file)
+                    if manifest is None:
+                        continue
+                    for shard in manifest["shards"]:
+                        shard_file = self.results_dir / shard["file"]
+                        if not shard_matches(shard, simulation_date, start_iso, end_iso):
+                            skipped.add(shard_file)
+            self.shards_skipped = len(skipped)
+            
+            # Find all results JSON files, newest first
+            fingerprint = self._results_fingerprint()
+            files_to_load = [
+                self.results_dir / name
+                for name, _, _ in sorted(fingerprint, key=lambda entry: entry[2], reverse=True)
+                if self.results_dir / name not in skipped
+            ]
+            # Forget files that no longer exist
+            names = {name for name, _, _ in fingerprint}
+            self._file_cache = {f: v for f, v in self._file_cache.items()
+                                if f.parent != self.results_dir or f.name in names}
         
         all_results = []
-        for file_path in files_to_load:
-            try:
-                with open(file_path, 'r') as f:
-                    results = json.load(f)
-                    if isinstance(results, list):
-                        all_results.extend(results)
-                    else:
-                        all_results.append(results)
-            except Exception as e:
-                print(f"Error loading {file_path}: {e}")
+        self.files_parsed = 0
+        for results_file in files_to_load:
+            all_results.extend(self._read_results_file(results_file))
+        
+        # Apply record-level filters (shards may only partially overlap the range)
+        if simulation_date:
+            all_results = [r for r in all_results if r.get('simulation_date') == simulation_date]
+        if start_iso:
+            all_results = [r for r in all_results if r.get('timestamp', '') >= start_iso]
+        if end_iso:
+            all_results = [r for r in all_results if r.get('timestamp', '') <= end_iso]
         
         self.data = all_results
+        self._record_keys = None
+        self._clear_statistics()
+        self._loaded_fingerprint = fingerprint if fingerprint is not None and not filtered else None
+        self._build_dataframe()
+        
+        return all_results
+    
+    def refresh(self) -> bool:
+        """
+        Bring the loaded results up to date, at no parsing cost when nothing changed.
+        
+        Compares the size and modification time of the results files with those seen by the
+        last unfiltered load_results(): only when a file was added, rewritten or removed are
+        the results reloaded (and only the changed files parsed again).
+        
+        Returns:
+            True if the results were reloaded, False if they were already current
+        """
+        if self._loaded_fingerprint is not None and self._results_fingerprint() == self._loaded_fingerprint:
+            return False
+        self.load_results()
+        return True
+    
+    @contextmanager
+    def cached_statistics(self):
+        """
+        Compute each statistics method at most once (per arguments) inside the block.
+        
+        Used to answer a batch of queries from one pass over the data; the cache is cleared
+        whenever the results are reloaded or extended. Cached statistics are shared between
+        callers and must not be modified.
+        """
+        if self._stats_memo is not None:  # Nested: the outer block owns the cache
+            yield self
+            return
+        self._stats_memo = {}
+        try:
+            yield self
+        finally:
+            self._stats_memo = None
+    
+    def _clear_statistics(self):
+        """Forget statistics cached by cached_statistics() (the data changed)."""
+        if self._stats_memo is not None:
+            self._stats_memo.clear()
+    
+    def _results_fingerprint(self) -> Tuple:
+        """(name, size, mtime_ns) of every results file in the results directory."""
+        entries = []
+        for results_file in self.results_dir.glob("results_*.json"):
+            try:
+                stat = results_file.stat()
+            except OSError:  # Removed between glob and stat
+                continue
+            entries.append((results_file.name, stat.st_size, stat.st_mtime_ns))
+        return tuple(sorted(entries))
+    
+    def _read_results_file(self, results_file: Path) -> List[Dict]:
+        """Records of one results file, parsed again only if its size or mtime changed."""
+        try:
+            stat = results_file.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            cached = self._file_cache.get(results_file)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            with open(results_file, 'r') as f:
+                results = json.load(f)
+            records = results if isinstance(results, list) else [results]
+            self._file_cache[results_file] = (signature, records)
+            self.files_parsed += 1
+            return records
+        except Exception as e:
+            print(f"Error loading {results_file}: {e}")
+            return []
+    
+    def _build_dataframe(self):
+        """Rebuild the DataFrame from the loaded records."""
+        self.df = None
         if self.data:
+            import pandas as pd  # Deferred: importing this module should not load pandas
             self.df = pd.DataFrame(self.data)
             # Convert timestamp to datetime
             if 'timestamp' in self.df.columns:
@@ -70,8 +205,39 @@ class DataAggregator:
             if 'simulation_date' not in self.df.columns:
                 sim_dates = [r.get('simulation_date') for r in self.data]
                 self.df['simulation_date'] = sim_dates
+    
+    def add_results(self, results: List[Dict]) -> int:
+        """
+        Append newly saved results without re-reading any files.
         
-        return all_results
+        Used with a ResultStream cursor or ResultsTail to update incrementally. Results that
+        are already loaded (same wafer_id and timestamp) are ignored.
+        
+        Args:
+            results: New wafer result dictionaries
+            
+        Returns:
+            Number of results added
+        """
+        if self._record_keys is None:
+            self._record_keys = {(r.get('wafer_id'), r.get('timestamp')) for r in self.data}
+        new_results = []
+        for result in results:
+            key = (result.get('wafer_id'), result.get('timestamp'))
+            if key not in self._record_keys:
+                self._record_keys.add(key)
+                new_results.append(result)
+        if not new_results:
+            return 0
+        
+        self.data.extend(new_results)
+        self._clear_statistics()
+        import pandas as pd
+        new_df = pd.DataFrame(new_results)
+        if 'timestamp' in new_df.columns:
+            new_df['timestamp'] = pd.to_datetime(new_df['timestamp'])
+        self.df = new_df if self.df is None else pd.concat([self.df, new_df], ignore_index=True)
+        return len(new_results)
     
     def filter_by_simulation_date(self, simulation_date: str) -> List[Dict]:
         """
@@ -87,6 +253,25 @@ class DataAggregator:
             return []
         return [r for r in self.data if r.get('simulation_date') == simulation_date]
     
+    def load_simulation_date(self, simulation_date: str) -> 'DataAggregator':
+        """
+        Load the results of one simulation date into a new aggregator.
+        
+        Uses load_results(simulation_date=...), so results shards whose manifest shows they
+        hold no wafer of that date are not read; files this aggregator already parsed are
+        taken from its cache.
+        
+        Args:
+            simulation_date: Date string (YYYY-MM-DD)
+            
+        Returns:
+            DataAggregator holding only that date's results
+        """
+        daily = DataAggregator(results_dir=self.results_dir)
+        daily._file_cache = self._file_cache  # Shared: both aggregators parse each file once
+        daily.load_results(simulation_date=simulation_date)
+        return daily
+    
     def get_available_simulation_dates(self) -> List[str]:
         """
         Get list of available simulation dates.
@@ -103,6 +288,7 @@ class DataAggregator:
                 dates.add(sim_date)
         return sorted(list(dates), reverse=True)  # Most recent first
     
+    @batch_cached
     def get_daily_statistics(self, simulation_date: str) -> Dict:
         """
         Get statistics for a specific simulation date.
@@ -113,20 +299,20 @@ class DataAggregator:
         Returns:
             Dictionary with daily statistics
         """
-        daily_data = self.filter_by_simulation_date(simulation_date)
-        if not daily_data:
+        if self.data:
+            # Already loaded: filter in memory
+            daily = DataAggregator(results_dir=self.results_dir)
+            daily.data = self.filter_by_simulation_date(simulation_date)
+            daily._build_dataframe()
+        else:
+            # Nothing loaded: read only the shards that can hold this date
+            daily = self.load_simulation_date(simulation_date)
+        if not daily.data:
             return {"error": f"No data found for date {simulation_date}"}
         
-        # Create temporary aggregator with filtered data
-        temp_aggregator = DataAggregator()
-        temp_aggregator.data = daily_data
-        if daily_data:
-            temp_aggregator.df = pd.DataFrame(daily_data)
-            if 'timestamp' in temp_aggregator.df.columns:
-                temp_aggregator.df['timestamp'] = pd.to_datetime(temp_aggregator.df['timestamp'])
-        
-        return temp_aggregator.get_summary_statistics()
+        return daily.get_summary_statistics()
     
+    @batch_cached
     def get_summary_statistics(self) -> Dict:
         """
         Get overall summary statistics.
@@ -167,6 +353,7 @@ class DataAggregator:
             "average_confidence": round(avg_confidence, 4)
         }
     
+    @batch_cached
     def get_machine_statistics(self) -> Dict:
         """
         Get statistics grouped by machine.
@@ -219,6 +406,7 @@ class DataAggregator:
         
         return formatted_stats
     
+    @batch_cached
     def get_defect_distribution(self) -> Dict:
         """
         Get defect class distribution.
@@ -245,6 +433,7 @@ class DataAggregator:
         
         return distribution
     
+    @batch_cached
     def get_time_series_data(self, days: int = 7) -> Dict:
         """
         Get time series data for trend analysis.
@@ -286,6 +475,7 @@ class DataAggregator:
             "daily_breakdown": daily_stats.to_dict('records')
         }
     
+    @batch_cached
     def get_anomalies(self, threshold_percentage: float = 50.0) -> List[Dict]:
         """
         Get wafers that exceed defect threshold.
@@ -310,6 +500,7 @@ class DataAggregator:
         
         return anomalies
     
+    @batch_cached
     def get_machine_performance_ranking(self) -> List[Dict]:
         """
         Rank machines by performance (pass rate).
@@ -333,6 +524,7 @@ class DataAggregator:
         
         return ranking
     
+    @batch_cached
     def get_date_statistics(self) -> Dict:
         """
         Get statistics grouped by simulation date.
@@ -388,66 +580,17 @@ class DataAggregator:
         
         return formatted_stats
     
-    def format_for_llm(self) -> str:
+    def format_for_llm(self, token_budget: Optional[int] = None) -> str:
         """
         Format aggregated data as a string for LLM processing.
         
+        Args:
+            token_budget: Maximum tokens (default: LLM_CONTEXT_TOKEN_BUDGET)
+            
         Returns:
-            Formatted string with key statistics
+            Compact tables of the key statistics, fitted into the token budget
         """
-        summary = self.get_summary_statistics()
-        machine_stats = self.get_machine_statistics()
-        defect_dist = self.get_defect_distribution()
-        anomalies = self.get_anomalies()
-        date_stats = self.get_date_statistics()
-        
-        from Repository.config_LLM import DEFECT_PERCENTAGE_THRESHOLD
-        
-        formatted = "="*70 + "\n"
-        formatted += "MANUFACTURING RESULTS SUMMARY\n"
-        formatted += "="*70 + "\n\n"
-        
-        # Date-based statistics
-        if date_stats:
-            formatted += "STATISTICS BY SIMULATION DATE:\n"
-            for date in sorted(date_stats.keys(), reverse=True):
-                stats = date_stats[date]
-                formatted += f"  Date: {date}\n"
-                formatted += f"    Total Wafers: {stats['total_wafers']}\n"
-                formatted += f"    Pass Rate: {stats['pass_rate']:.2f}% ({stats['pass_count']} pass, {stats['fail_count']} fail)\n"
-                formatted += f"    Avg Defect %: {stats['avg_defect_percentage']:.2f}%\n"
-                formatted += f"    Anomalies (>{DEFECT_PERCENTAGE_THRESHOLD}%): {stats['anomalies']} wafers\n"
-            formatted += "\n"
-        
-        formatted += f"Total Wafers Processed: {summary['total_wafers']}\n"
-        formatted += f"Pass Rate: {summary['pass_rate']:.2f}% ({summary['pass_count']} wafers)\n"
-        formatted += f"Fail Rate: {summary['fail_rate']:.2f}% ({summary['fail_count']} wafers)\n"
-        formatted += f"Average Defect Percentage: {summary['average_defect_percentage']:.2f}%\n"
-        formatted += f"Average Confidence Score: {summary['average_confidence']:.4f}\n\n"
-        
-        formatted += "DEFECT CLASS DISTRIBUTION:\n"
-        for defect_class, count in sorted(defect_dist['counts'].items(), key=lambda x: x[1], reverse=True):
-            pct = defect_dist['percentages'].get(defect_class, 0)
-            formatted += f"  {defect_class}: {count} ({pct}%)\n"
-        formatted += "\n"
-        
-        formatted += "MACHINE PERFORMANCE:\n"
-        for machine, stats in machine_stats.items():
-            formatted += f"  {machine}:\n"
-            formatted += f"    Total: {stats['total_wafers']}, Pass Rate: {stats['pass_rate']:.2f}%\n"
-            formatted += f"    Avg Defect %: {stats['average_defect_percentage']:.2f}%\n"
-        formatted += "\n"
-        
-        if anomalies:
-            formatted += f"ANOMALIES (>{DEFECT_PERCENTAGE_THRESHOLD}% defect): {len(anomalies)} wafers\n"
-            formatted += "Top 5 Anomalies:\n"
-            for i, anomaly in enumerate(anomalies[:5], 1):
-                sim_date = anomaly.get('simulation_date', 'Unknown')
-                formatted += f"  {i}. {anomaly.get('wafer_id')}: {anomaly.get('defect_percentage', 0):.2f}% "
-                formatted += f"({anomaly.get('prediction', {}).get('Defect Class', 'Unknown')}) "
-                formatted += f"[Date: {sim_date}]\n"
-        
-        return formatted
+        return ContextBuilder(self).build(token_budget=token_budget)
 
 
 # ------------------------------------------------------------------------------------------
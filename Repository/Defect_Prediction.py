@@ -2,24 +2,46 @@
 # This file is used to predict the defect of the wafer image.
 
 import os
-# Fix OpenMP duplicate library warning and prevent kernel crashes
+# Fix OpenMP duplicate library warning and prevent kernel crashes (set before torch/cv2 are imported)
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
 os.environ['OMP_NUM_THREADS'] = '1'
 os.environ['OPENCV_IO_ENABLE_OPENEXR'] = '0'
 
-import torch
-import torch.nn as nn
-from torchvision import models, transforms
-from PIL import Image
 import json
-import numpy as np
-import cv2
-import os
+import time
 import logging
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# ------------------------------------------------------------------------------------------
+# Deferred Imports
+# ------------------------------------------------------------------------------------------
+# The image libraries are imported by the first object that needs them, so importing this
+# module (and the simulation) stays cheap: DefectCounter loads numpy and cv2 only, and
+# WaferDefectPredictor loads torch, torchvision and PIL
+torch = nn = models = transforms = Image = np = cv2 = None
+
+
+def _load_counter_dependencies():
+    """Import the defect counting dependencies (numpy, cv2) on first use."""
+    global np, cv2
+    if cv2 is not None:
+        return
+    import numpy as np
+    import cv2  # Assigned last: it marks the dependencies as loaded
+
+
+def _load_model_dependencies():
+    """Import the inference dependencies (torch, torchvision, PIL) on first use."""
+    global torch, nn, models, transforms, Image
+    if torch is not None:
+        return
+    from PIL import Image
+    import torch.nn as nn
+    from torchvision import models, transforms
+    import torch  # Assigned last: it marks the dependencies as loaded
+
 # ------------------------------------------------------------------------------------------
 # Helper Function: Get Repository Path
 # ------------------------------------------------------------------------------------------
@@ -30,15 +52,16 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 # ------------------------------------------------------------------------------------------
 class DefectCounter:
     def __init__(self):
-        pass
+        _load_counter_dependencies()
 
-    def count_defects(self, image_path):
+    def count_defects(self, image_path, timings=None):
         """
         Analyzes an image to count the percentage of defects on the wafer.
         Uses HSV color space to detect yellow defects and green wafer area.
 
         Args:
             image_path (str): Path to the wafer image.
+            timings (dict, optional): If given, the image decode time (seconds) is added under "decode".
 
         Returns:
             dict: A dictionary containing the defect percentage.
@@ -46,7 +69,10 @@ class DefectCounter:
         try:
             # Set OpenCV threads to prevent conflicts
             cv2.setNumThreads(1)
+            decode_start = time.perf_counter()
             image = cv2.imread(image_path)
+            if timings is not None:
+                timings["decode"] = timings.get("decode", 0.0) + time.perf_counter() - decode_start
             if image is None:
                 raise FileNotFoundError(f"Image not found at {image_path}")
 
@@ -86,6 +112,7 @@ class WaferDefectPredictor:
             model_path (str): Path to the trained model file (.pth)
             num_classes (int): Number of defect classes (default: 9)
         """
+        _load_model_dependencies()
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         logger.info(f"Using device: {self.device}")
         
@@ -204,19 +231,40 @@ class WaferDefectPredictor:
         self.class_names = ['Center', 'Donut', 'Edge-Loc', 'Edge-Ring', 'Local', 
                            'Near-Full', 'Normal', 'Random', 'Scratch']
 
-    def predict(self, image_path):
+    def warmup(self, runs=1):
+        """
+        Run dummy forward passes so the first real prediction doesn't pay one-time setup costs.
+
+        Args:
+            runs (int): Number of forward passes
+
+        Returns:
+            float: Time spent warming up (seconds)
+        """
+        start = time.perf_counter()
+        dummy = torch.zeros(1, 3, 224, 224, device=self.device)
+        with torch.no_grad():
+            for _ in range(runs):
+                self.model(dummy)
+        return time.perf_counter() - start
+
+    def predict(self, image_path, timings=None):
         """
         Predict the defect class of a wafer image.
 
         Args:
             image_path (str): Path to the wafer image.
+            timings (dict, optional): If given, the image decode time (seconds) is added under "decode".
 
         Returns:
             dict: A dictionary containing "Defect Class" and "Confidence Score"
         """
         try:
             # Load and preprocess image
+            decode_start = time.perf_counter()
             image = Image.open(image_path).convert('RGB')
+            if timings is not None:
+                timings["decode"] = timings.get("decode", 0.0) + time.perf_counter() - decode_start
             image_tensor = self.transform(image).unsqueeze(0).to(self.device)
 
             # Perform prediction
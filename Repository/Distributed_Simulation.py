@@ -0,0 +1,529 @@
+"""
+Distributed Manufacturing Simulation
+A coordinator assigns the simulated machines to worker nodes, the workers generate and
+analyze wafers, and every result streams back to the coordinator's central results sink.
+Nodes talk through a pluggable Transport; MultiprocessingTransport runs the nodes as
+local processes (for testing, or to use every core of one host).
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from Repository.Manufacturing_Simulation import (
+    ManufacturingProcessController, MechanicalMachine, ElectricalMachine, ThermalMachine,
+    OUTPUT_DIR, LOGS_DIR, STATUS_LOG_INTERVAL, log_timestamp, ensure_logging
+)
+from Repository.Performance_Monitor import StageLatencyRecorder, ThroughputCounter, ALL_MACHINES
+from Repository.Results_Sink import ShardedResultsSink, manifest_path
+from Repository.Result_Stream import ResultStream, ResultCursor
+from Repository.Simulation_Logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+# Extra seconds the coordinator waits beyond the duration (node startup + model loading)
+WORKER_STARTUP_TIMEOUT = 120
+
+# Seconds the coordinator keeps draining results after asking the nodes to stop
+SHUTDOWN_TIMEOUT = 30
+
+MACHINE_CLASSES = {
+    "Mechanical": MechanicalMachine,
+    "Electrical": ElectricalMachine,
+    "Thermal": ThermalMachine,
+}
+
+# Message types exchanged between the coordinator and the worker nodes
+MSG_ASSIGN = "assign"    # coordinator -> node: machines and run parameters
+MSG_STOP = "stop"        # coordinator -> node: stop early
+MSG_STARTED = "started"  # node -> coordinator: model loaded, machines running
+MSG_RESULT = "result"    # node -> coordinator: one analyzed wafer
+MSG_DONE = "done"        # node -> coordinator: node finished
+MSG_ERROR = "error"      # node -> coordinator: node failed
+
+
+def build_machine_specs(num_mechanical: int, num_electrical: int, num_thermal: int) -> List[Dict]:
+    """
+    Build the machine list of the line (same IDs as ManufacturingProcessController).
+
+    Returns:
+        List of {"machine_id", "machine_type"} dictionaries
+    """
+    specs = []
+    for prefix, machine_type, count in (("MECH", "Mechanical", num_mechanical),
+                                        ("ELEC", "Electrical", num_electrical),
+                                        ("THERM", "Thermal", num_thermal)):
+        specs.extend({"machine_id": f"{prefix}_{i+1:02d}", "machine_type": machine_type} for i in range(count))
+    return specs
+
+
+def assign_machines(machine_specs: List[Dict], worker_ids: List[str]) -> Dict[str, List[Dict]]:
+    """Distribute the machines round-robin over the worker nodes."""
+    assignments = {worker_id: [] for worker_id in worker_ids}
+    for i, spec in enumerate(machine_specs):
+        assignments[worker_ids[i % len(worker_ids)]].append(spec)
+    return assignments
+
+
+def split_quota(max_wafers: Optional[int], assignments: Dict[str, List[Dict]]) -> Dict[str, Optional[int]]:
+    """
+    Split the max_wafers limit over the nodes in proportion to their machine counts.
+
+    Each node enforces its own share, so the line as a whole can never exceed max_wafers.
+    """
+    if max_wafers is None:
+        return {worker_id: None for worker_id in assignments}
+    total_machines = sum(len(specs) for specs in assignments.values()) or 1
+    quotas = {worker_id: max_wafers * len(specs) // total_machines for worker_id, specs in assignments.items()}
+    leftover = max_wafers - sum(quotas.values())
+    for worker_id in sorted(assignments, key=lambda w: len(assignments[w]), reverse=True)[:leftover]:
+        quotas[worker_id] += 1
+    return quotas
+
+
+# ------------------------------------------------------------------------------------------
+# Transport
+# ------------------------------------------------------------------------------------------
+class Transport(ABC):
+    """
+    Coordinator side of the message transport.
+
+    Messages are plain dictionaries with a "type" key (see MSG_*). A transport for a real
+    cluster (message broker, sockets, ...) implements send/receive here and hands each node
+    an endpoint with send(message) and receive(timeout) methods for run_worker_node().
+    """
+
+    def __init__(self, worker_ids: List[str]):
+        """
+        Initialize the transport.
+
+        Args:
+            worker_ids: Identifiers of the worker nodes reachable through this transport
+        """
+        self.worker_ids = list(worker_ids)
+
+    def start_workers(self):
+        """Launch the worker nodes (no-op when the nodes are started externally)."""
+        pass
+
+    @abstractmethod
+    def send(self, worker_id: str, message: Dict):
+        """Send a message to one worker node."""
+
+    @abstractmethod
+    def receive(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Receive the next message from any worker node (None on timeout)."""
+
+    def close(self):
+        """Release transport resources."""
+        pass
+
+
+class QueueEndpoint:
+    """Worker side of a queue-based transport (picklable, so it can be passed to a process)."""
+
+    def __init__(self, inbox, outbox):
+        """
+        Initialize the endpoint.
+
+        Args:
+            inbox: Queue of messages from the coordinator
+            outbox: Queue of messages to the coordinator
+        """
+        self.inbox = inbox
+        self.outbox = outbox
+
+    def send(self, message: Dict):
+        """Send a message to the coordinator."""
+        self.outbox.put(message)
+
+    def receive(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Receive the next message from the coordinator (None on timeout)."""
+        try:
+            return self.inbox.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class MultiprocessingTransport(Transport):
+    """Runs every worker node as a local process connected through multiprocessing queues."""
+
+    def __init__(self, worker_ids: List[str]):
+        """
+        Initialize the transport.
+
+        Args:
+            worker_ids: Identifiers of the worker processes to launch
+        """
+        super().__init__(worker_ids)
+        # Spawn (not fork) so every node starts clean: fresh model, logging and torch threads
+        self._context = multiprocessing.get_context("spawn")
+        self._to_coordinator = self._context.Queue()
+        self._to_workers = {worker_id: self._context.Queue() for worker_id in self.worker_ids}
+        self.processes = []
+
+    def endpoint(self, worker_id: str) -> QueueEndpoint:
+        """Get the worker-side endpoint of a node."""
+        return QueueEndpoint(self._to_workers[worker_id], self._to_coordinator)
+
+    def start_workers(self):
+        """Launch one process per worker node."""
+        for worker_id in self.worker_ids:
+            process = self._context.Process(
+                target=run_worker_node,
+                args=(worker_id, self.endpoint(worker_id)),
+                name=f"wafer-node-{worker_id}",
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+    def send(self, worker_id: str, message: Dict):
+        """Send a message to one worker process."""
+        self._to_workers[worker_id].put(message)
+
+    def receive(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Receive the next message from any worker process (None on timeout)."""
+        try:
+            return self._to_coordinator.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Wait for the worker processes to exit (terminating stragglers)."""
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                logger.warning(f"Terminating worker process {process.name}")
+                process.terminate()
+        self.processes = []
+
+
+# ------------------------------------------------------------------------------------------
+# Worker Node
+# ------------------------------------------------------------------------------------------
+class WorkerNodeController(ManufacturingProcessController):
+    """Runs the machines assigned to one node and streams every result to the coordinator."""
+
+    def __init__(self, worker_id: str, endpoint, machine_specs: List[Dict], seed: Optional[int] = None,
+                 image_source: str = "dataset"):
+        """
+        Initialize the worker node.
+
+        Args:
+            worker_id: Identifier of this node
+            endpoint: Worker-side transport endpoint (send/receive)
+            machine_specs: Machines assigned to this node ({"machine_id", "machine_type"})
+            seed: Seed for the per-machine RNGs (None for a non-deterministic run)
+            image_source: "dataset" (copy test images) or "synthetic" (render wafer maps)
+        """
+        super().__init__(num_mechanical=0, num_electrical=0, num_thermal=0, seed=seed, image_source=image_source)
+        self.worker_id = worker_id
+        self.endpoint = endpoint
+        for spec in machine_specs:
+            machine = MACHINE_CLASSES[spec["machine_type"]](spec["machine_id"], self.image_generator)
+            machine.seed(seed)  # Seeded by machine ID, so wafers match a single-node run
+            self.machines.append(machine)
+        logger.info(f"Node {worker_id} assigned machines: {[m.machine_id for m in self.machines]}")
+
+    def save_result(self, result: Dict, timings: Optional[Dict] = None):
+        """Keep the result locally; persisting happens in the coordinator's central sink."""
+        lock_start = time.perf_counter()
+        with self.results_lock:
+            save_start = time.perf_counter()
+            if self._results_sealed:
+                self.dropped_wafers += 1
+                return
+            if self.simulation_date:
+                result["simulation_date"] = self.simulation_date
+            self.results.append(result)
+        if timings is not None:
+            timings["lock_wait"] = save_start - lock_start
+            timings["save_result"] = time.perf_counter() - save_start
+
+    def _on_wafer_processed(self, machine, result: Dict, timings: Dict[str, float]):
+        """Stream the result and its stage timings to the coordinator."""
+        self.endpoint.send({"type": MSG_RESULT, "worker_id": self.worker_id, "result": result, "timings": timings})
+
+    def _finish_run(self, record_workload: Optional[str]):
+        """Log the node summary (results, shards and latency files live on the coordinator)."""
+        total_processed = sum(m.processed_wafers for m in self.machines)
+        logger.info(f"Node {self.worker_id} completed. Total wafers processed: {total_processed}")
+
+
+def run_worker_node(worker_id: str, endpoint):
+    """
+    Entry point of a worker node: wait for an assignment, run it and report back.
+
+    Args:
+        worker_id: Identifier of this node
+        endpoint: Worker-side transport endpoint (send/receive)
+    """
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    configure_logging(LOGS_DIR / f"manufacturing_{log_timestamp}_{worker_id}.log")
+    message = endpoint.receive()
+    if not message or message.get("type") != MSG_ASSIGN:
+        return
+
+    node = None
+    try:
+        node = WorkerNodeController(worker_id, endpoint, message["machines"], seed=message.get("seed"),
+                                    image_source=message.get("image_source", "dataset"))
+        endpoint.send({"type": MSG_STARTED, "worker_id": worker_id})
+
+        # Listen for an early stop while the machines run
+        finished = threading.Event()
+
+        def listen_for_stop():
+            while not finished.is_set():
+                control = endpoint.receive(timeout=0.5)
+                if control and control.get("type") == MSG_STOP:
+                    node.stop()
+                    return
+
+        threading.Thread(target=listen_for_stop, daemon=True).start()
+        node.run_simulation(
+            duration_seconds=message["duration_seconds"],
+            max_wafers=message.get("max_wafers"),
+            simulation_date=message.get("simulation_date")
+        )
+        finished.set()
+    except Exception as e:
+        logger.error(f"Node {worker_id} failed: {e}", exc_info=True)
+        endpoint.send({"type": MSG_ERROR, "worker_id": worker_id, "error": str(e)})
+
+    processed = sum(m.processed_wafers for m in node.machines) if node else 0
+    endpoint.send({"type": MSG_DONE, "worker_id": worker_id, "processed": processed})
+
+
+# ------------------------------------------------------------------------------------------
+# Coordinator
+# ------------------------------------------------------------------------------------------
+class SimulationCoordinator:
+    """Assigns machines to worker nodes and collects their results into one results sink."""
+
+    def __init__(self, num_mechanical: int = 2, num_electrical: int = 2, num_thermal: int = 1,
+                 num_workers: int = 2, seed: Optional[int] = None, transport: Optional[Transport] = None,
+                 image_source: str = "dataset"):
+        """
+        Initialize the coordinator.
+
+        Args:
+            num_mechanical: Number of mechanical machines on the line
+            num_electrical: Number of electrical machines on the line
+            num_thermal: Number of thermal machines on the line
+            num_workers: Number of local worker processes (ignored when a transport is given)
+            seed: Seed for the per-machine RNGs (None for a non-deterministic run)
+            transport: Transport reaching the worker nodes (default: local MultiprocessingTransport)
+            image_source: "dataset" (copy test images) or "synthetic" (render wafer maps) on every node
+        """
+        ensure_logging()
+        self.seed = seed
+        self.image_source = image_source
+        self.transport = transport or MultiprocessingTransport([f"NODE_{i+1:02d}" for i in range(num_workers)])
+        self.machine_specs = build_machine_specs(num_mechanical, num_electrical, num_thermal)
+        self.assignments = assign_machines(self.machine_specs, self.transport.worker_ids)
+
+        self.results = []
+        self.results_lock = threading.Lock()
+        self.is_running = False
+        self.simulation_date = None
+        self.start_time = None
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if manifest_path(OUTPUT_DIR, self.run_id).exists():
+            self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        self.results_sink = ShardedResultsSink(OUTPUT_DIR, self.run_id)
+        self.latency_file = OUTPUT_DIR / f"latency_{self.run_id}.json"
+        self.result_stream = ResultStream()
+        self.latency = StageLatencyRecorder()
+        self.throughput = ThroughputCounter()
+        self.node_status = {worker_id: "assigned" for worker_id in self.transport.worker_ids}
+        self.node_errors = {}
+
+    @property
+    def manifest_file(self):
+        """Manifest describing all results shards of this run."""
+        return self.results_sink.manifest_file
+
+    def subscribe(self, from_offset: Optional[int] = 0) -> ResultCursor:
+        """
+        Subscribe to results as the coordinator saves them.
+
+        Args:
+            from_offset: Offset to start from (0 replays every retained result, None only new ones)
+
+        Returns:
+            ResultCursor; call poll() to get new results
+        """
+        return self.result_stream.subscribe(from_offset)
+
+    def _handle_message(self, message: Dict):
+        """Process one message from a worker node."""
+        worker_id = message.get("worker_id")
+        message_type = message.get("type")
+        if message_type == MSG_RESULT:
+            result = message["result"]
+            save_start = time.perf_counter()
+            with self.results_lock:
+                self.results.append(result)
+                try:
+                    self.results_sink.append(result)
+                except Exception as e:
+                    logger.error(f"Error saving result: {e}")
+                self.result_stream.publish(result)
+            timings = dict(message.get("timings", {}))
+            timings["save_result"] = timings.get("save_result", 0.0) + time.perf_counter() - save_start
+            machine_type = result.get("machine_type", "Unknown")
+            self.latency.record_many(machine_type, timings)
+            self.throughput.record(machine_type)
+        elif message_type == MSG_STARTED:
+            self.node_status[worker_id] = "running"
+            logger.info(f"Node {worker_id} started")
+        elif message_type == MSG_ERROR:
+            self.node_errors[worker_id] = message.get("error")
+            logger.error(f"Node {worker_id} reported an error: {message.get('error')}")
+        elif message_type == MSG_DONE:
+            self.node_status[worker_id] = "done"
+            logger.info(f"Node {worker_id} done ({message.get('processed', 0)} wafers)")
+
+    def _drain(self, deadline: float):
+        """Handle node messages until every node is done or the deadline passes."""
+        next_status_time = time.time() + STATUS_LOG_INTERVAL
+        while time.time() < deadline and any(s != "done" for s in self.node_status.values()):
+            message = self.transport.receive(timeout=0.5)
+            if message is not None:
+                self._handle_message(message)
+            if time.time() >= next_status_time:
+                next_status_time += STATUS_LOG_INTERVAL
+                rate = self.throughput.snapshot()[ALL_MACHINES]["recent_wafers_per_second"]
+                logger.info(f"Distributed simulation running... Wafers collected: {len(self.results)}, "
+                            f"Throughput: {rate:.2f} wafers/s, Nodes: {self.node_status}")
+
+    def stop(self):
+        """Ask every node to stop early."""
+        for worker_id in self.transport.worker_ids:
+            self.transport.send(worker_id, {"type": MSG_STOP})
+
+    def run_simulation(self, duration_seconds: int = 60, max_wafers: Optional[int] = None,
+                       simulation_date: Optional[str] = None):
+        """
+        Run the distributed simulation.
+
+        Args:
+            duration_seconds: How long each node runs its machines (in seconds)
+            max_wafers: Maximum number of wafers for the whole line (split over the nodes)
+            simulation_date: Date string (YYYY-MM-DD) for this simulation run, or None to use today's date
+        """
+        self.simulation_date = simulation_date or datetime.now().strftime("%Y-%m-%d")
+        quotas = split_quota(max_wafers, self.assignments)
+        logger.info(f"Starting distributed simulation: {len(self.machine_specs)} machines on "
+                    f"{len(self.transport.worker_ids)} nodes for {duration_seconds} seconds (Date: {self.simulation_date})")
+
+        self.transport.start_workers()
+        for worker_id, specs in self.assignments.items():
+            self.transport.send(worker_id, {
+                "type": MSG_ASSIGN,
+                "machines": specs,
+                "seed": self.seed,
+                "image_source": self.image_source,
+                "duration_seconds": duration_seconds,
+                "max_wafers": quotas[worker_id],
+                "simulation_date": self.simulation_date
+            })
+
+        self.is_running = True
+        self.start_time = time.time()
+        self.throughput.reset()
+        try:
+            self._drain(self.start_time + duration_seconds + WORKER_STARTUP_TIMEOUT)
+        except KeyboardInterrupt:
+            logger.info("Simulation interrupted by user")
+            self.stop()
+            self._drain(time.time() + SHUTDOWN_TIMEOUT)
+        self.is_running = False
+
+        unfinished = [w for w, s in self.node_status.items() if s != "done"]
+        if unfinished:
+            logger.warning(f"Nodes did not finish in time: {unfinished}")
+        self.transport.close()
+
+        with self.results_lock:
+            try:
+                self.results_sink.close()
+            except Exception as e:
+                logger.error(f"Error closing results shard: {e}")
+        logger.info(f"Distributed simulation completed. Total wafers collected: {len(self.results)}")
+        logger.info(f"Results saved to {len(self.results_sink.shards)} shard(s), manifest: {self.manifest_file}")
+
+        try:
+            self.latency.save_json(self.latency_file)
+        except Exception as e:
+            logger.error(f"Error saving stage latencies: {e}")
+        self.print_summary()
+
+    def get_metrics(self) -> Dict:
+        """
+        Get live metrics of the distributed run.
+
+        Returns:
+            Dictionary with node status, throughput and stage latencies
+        """
+        return {
+            "is_running": self.is_running,
+            "simulation_date": self.simulation_date,
+            "uptime_seconds": round(time.time() - self.start_time, 3) if self.start_time else 0.0,
+            "nodes": dict(self.node_status),
+            "throughput": self.throughput.snapshot(),
+            "latency": self.latency.snapshot()
+        }
+
+    def print_summary(self):
+        """Print summary statistics of the distributed simulation."""
+        if not self.results:
+            logger.info("No results to summarize")
+            return
+
+        total_wafers = len(self.results)
+        pass_count = sum(1 for r in self.results if r.get("quality_status") == "PASS")
+        wafers_by_node = {}
+        machine_to_node = {spec["machine_id"]: w for w, specs in self.assignments.items() for spec in specs}
+        for result in self.results:
+            node = machine_to_node.get(result.get("machine_id"), "Unknown")
+            wafers_by_node[node] = wafers_by_node.get(node, 0) + 1
+
+        print("\n" + "="*70)
+        print("DISTRIBUTED MANUFACTURING SIMULATION SUMMARY")
+        print("="*70)
+        print(f"Total Wafers Processed: {total_wafers}")
+        print(f"Pass: {pass_count} ({pass_count/total_wafers*100:.1f}%)")
+        print(f"Fail: {total_wafers - pass_count} ({(total_wafers - pass_count)/total_wafers*100:.1f}%)")
+        print("\nWafers by Node:")
+        for node, count in sorted(wafers_by_node.items()):
+            print(f"  {node}: {count}")
+        print("\nStage Latency by Machine Type:")
+        print(self.latency.format_table())
+        print("="*70)
+        print(f"\nResults manifest: {self.manifest_file}")
+        print(f"Stage latencies saved to: {self.latency_file}")
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    coordinator = SimulationCoordinator(
+        num_mechanical=4,
+        num_electrical=4,
+        num_thermal=2,
+        num_workers=2,
+        seed=42
+    )
+    coordinator.run_simulation(duration_seconds=60)
@@ -0,0 +1,277 @@
+"""
+LLM Context Builder
+Serializes the aggregated manufacturing statistics into compact tables for LLM prompts and
+fits them into a token budget: the most recent dates, the worst machines and the top
+anomalies are kept, and the rest of each table is folded into a one-line summary. Prompt
+size (and so LLM latency) stays bounded however long the results history grows.
+"""
+
+import logging
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from Repository.config_LLM import (
+    OPENAI_MODEL, DEFECT_PERCENTAGE_THRESHOLD,
+    LLM_CONTEXT_TOKEN_BUDGET, LLM_CONTEXT_MAX_ROWS
+)
+
+logger = logging.getLogger(__name__)
+
+# Sections in default priority order (when over budget, the last sections shrink first)
+SECTIONS = ("overview", "dates", "defects", "machines", "anomalies")
+
+# Rows a section keeps before it is dropped entirely
+MIN_ROWS = {"overview": 1, "dates": 3, "defects": 3, "machines": 3, "anomalies": 3}
+
+# Heuristic token size when tiktoken is not installed (numeric tables tokenize densely)
+CHARS_PER_TOKEN = 3.5
+
+
+# ------------------------------------------------------------------------------------------
+# Token Counting
+# ------------------------------------------------------------------------------------------
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Get the tiktoken encoding of the configured model (None if tiktoken is unavailable)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(OPENAI_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # The encoding files could not be loaded (e.g. offline)
+        logger.warning(f"tiktoken encoding unavailable, using the character heuristic: {e}")
+        return None
+
+
+def tokenizer_name() -> str:
+    """Name of the tokenizer used by count_tokens()."""
+    encoding = _get_encoding()
+    return f"tiktoken:{encoding.name}" if encoding is not None else "heuristic"
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text with tiktoken, or estimate them without it.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Number of tokens
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# ------------------------------------------------------------------------------------------
+# Context Builder Class
+# ------------------------------------------------------------------------------------------
+class ContextBuilder:
+    """Builds compact, token-budgeted data context from a DataAggregator."""
+
+    def __init__(self, aggregator, token_budget: int = LLM_CONTEXT_TOKEN_BUDGET,
+                 max_rows: int = LLM_CONTEXT_MAX_ROWS,
+                 anomaly_threshold: float = DEFECT_PERCENTAGE_THRESHOLD):
+        """
+        Initialize the context builder.
+
+        Args:
+            aggregator: DataAggregator with loaded results
+            token_budget: Default maximum tokens of a built context
+            max_rows: Maximum rows of each table, even when the budget allows more
+            anomaly_threshold: Defect percentage above which a wafer is an anomaly
+        """
+        self.aggregator = aggregator
+        self.token_budget = token_budget
+        self.max_rows = max_rows
+        self.anomaly_threshold = anomaly_threshold
+        self.last_build = {}  # Tokens, budget and rows shown per section of the last build()
+        self._memo = {}  # Aggregator statistics shared by the tables of one build()
+
+    def build(self, sections: Sequence[str] = SECTIONS, token_budget: Optional[int] = None) -> str:
+        """
+        Build the data context.
+
+        Args:
+            sections: Sections to include, most important first (the overview is always included)
+            token_budget: Maximum tokens (default: the builder's budget)
+
+        Returns:
+            Context text within the budget (unless even the overview alone exceeds it)
+        """
+        budget = token_budget or self.token_budget
+        if not self.aggregator.data:
+            self.last_build = {"tokens": 0, "budget": budget, "sections": {}}
+            return "No manufacturing data loaded."
+
+        order = ["overview"] + [s for s in sections if s != "overview"]
+        self._memo = {}
+        tables = {name: getattr(self, f"_{name}_table")() for name in order}
+        shown = {name: min(len(table["rows"]), self.max_rows) for name, table in tables.items()}
+
+        # Trim one row at a time from the table with the most spare rows, weighted so that
+        # lower-priority tables give up rows first; then drop whole tables, lowest priority first
+        lines = self._render(order, tables, shown)
+        tokens = self._count(lines)
+        shrinkable = [name for name in reversed(order) if name != "overview"]
+        weights = {name: len(shrinkable) - i for i, name in enumerate(shrinkable)}
+        while tokens > budget:
+            candidates = [n for n in shrinkable if shown[n] > min(MIN_ROWS[n], len(tables[n]["rows"]))]
+            if candidates:
+                shown[max(candidates, key=lambda n: (shown[n] - MIN_ROWS[n]) * weights[n])] -= 1
+            else:
+                dropped = [n for n in shrinkable if shown[n] > 0 or tables[n]["rows"]]
+                if not dropped:
+                    break
+                tables[dropped[0]]["rows"] = []
+                shown[dropped[0]] = 0
+            lines = self._render(order, tables, shown)
+            tokens = self._count(lines)
+
+        self.last_build = {
+            "tokens": tokens,
+            "budget": budget,
+            "tokenizer": tokenizer_name(),
+            "sections": {name: {"rows": shown[name], "total_rows": tables[name]["total"]} for name in order}
+        }
+        if tokens > budget:
+            logger.warning(f"LLM context exceeds its budget: {tokens} > {budget} tokens")
+        return "\n".join(lines)
+
+    def _stats(self, name: str, *args):
+        """Call an aggregator statistics method once per build()."""
+        key = (name,) + args
+        if key not in self._memo:
+            self._memo[key] = getattr(self.aggregator, name)(*args)
+        return self._memo[key]
+
+    @staticmethod
+    def _count(lines: List[str]) -> int:
+        return sum(count_tokens(line + "\n") for line in lines)
+
+    @staticmethod
+    def _render(order: List[str], tables: Dict[str, Dict], shown: Dict[str, int]) -> List[str]:
+        lines = []
+        for name in order:
+            table = tables[name]
+            if not table["rows"]:
+                continue
+            lines.append(table["title"])
+            if table.get("header"):
+                lines.append(table["header"])
+            lines.extend(table["rows"][:shown[name]])
+            omitted = table["rows"][shown[name]:]
+            if omitted and table.get("fold"):
+                lines.append(table["fold"](shown[name]))
+        return lines
+
+    # --------------------------------------------------------------------------------------
+    # Tables: title, optional header, rows in priority order, and a fold(shown) summary line
+    # --------------------------------------------------------------------------------------
+    def _overview_table(self) -> Dict:
+        summary = self._stats("get_summary_statistics")
+        date_stats = self._stats("get_date_statistics")
+        dates = sorted(date_stats)
+        row = (f"wafers={summary['total_wafers']} pass={summary['pass_rate']:.1f}% "
+               f"fail={summary['fail_rate']:.1f}% avg_defect={summary['average_defect_percentage']:.2f}% "
+               f"avg_confidence={summary['average_confidence']:.3f}")
+        if dates:
+            anomalies = sum(stats["anomalies"] for stats in date_stats.values())
+            row += (f" dates={len(dates)} ({dates[0]}..{dates[-1]})"
+                    f" anomalies(>{self.anomaly_threshold:g}%)={anomalies}")
+        return {"title": "OVERVIEW", "rows": [row], "total": 1}
+
+    def _dates_table(self) -> Dict:
+        date_stats = self._stats("get_date_statistics")
+        dates = sorted(date_stats, reverse=True)
+        rows = [
+            f"{d}|{s['total_wafers']}|{s['pass_rate']:.1f}|{s['avg_defect_percentage']:.2f}|{s['anomalies']}"
+            for d, s in ((d, date_stats[d]) for d in dates)
+        ]
+
+        def fold(shown: int) -> str:
+            older = [date_stats[d] for d in dates[shown:]]
+            wafers = sum(s["total_wafers"] for s in older)
+            passed = sum(s["pass_count"] for s in older)
+            worst = max(dates[shown:], key=lambda d: (date_stats[d]["anomalies"], -date_stats[d]["pass_rate"]))
+            return (f"older {len(older)} dates ({dates[-1]}..{dates[shown]}): {wafers} wafers, "
+                    f"{passed / wafers * 100 if wafers else 0:.1f}% pass, "
+                    f"{sum(s['anomalies'] for s in older)} anomalies; worst {worst}: "
+                    f"{date_stats[worst]['pass_rate']:.1f}% pass, {date_stats[worst]['anomalies']} anomalies")
+
+        return {"title": "BY DATE (newest first)", "header": "date|wafers|pass%|avg_defect%|anomalies",
+                "rows": rows, "total": len(rows), "fold": fold}
+
+    def _defects_table(self) -> Dict:
+        distribution = self._stats("get_defect_distribution")
+        counts = sorted(distribution.get("counts", {}).items(), key=lambda x: x[1], reverse=True)
+        percentages = distribution.get("percentages", {})
+        rows = [f"{name}|{count}|{percentages.get(name, 0):.1f}" for name, count in counts]
+
+        def fold(shown: int) -> str:
+            rest = counts[shown:]
+            return (f"other {len(rest)} classes: {sum(c for _, c in rest)} wafers "
+                    f"({sum(percentages.get(n, 0) for n, _ in rest):.1f}%)")
+
+        return {"title": "DEFECT CLASSES", "header": "class|wafers|%",
+                "rows": rows, "total": len(rows), "fold": fold}
+
+    def _machines_table(self) -> Dict:
+        machine_stats = self._stats("get_machine_statistics")
+        # Worst first: lowest pass rate, then highest average defect percentage
+        machines = sorted(machine_stats.values(),
+                          key=lambda s: (s["pass_rate"], -s["average_defect_percentage"]))
+        rows = []
+        for stats in machines:
+            classes = stats["defect_class_distribution"]
+            top_defect = max(classes, key=classes.get) if classes else "-"
+            rows.append(f"{stats['machine_id']}|{stats['total_wafers']}|{stats['pass_rate']:.1f}|"
+                        f"{stats['average_defect_percentage']:.2f}|{top_defect}")
+
+        def fold(shown: int) -> str:
+            rest = machines[shown:]
+            return (f"other {len(rest)} machines: {sum(s['total_wafers'] for s in rest)} wafers, "
+                    f"pass {rest[0]['pass_rate']:.1f}-{rest[-1]['pass_rate']:.1f}%")
+
+        return {"title": "MACHINES (worst first)", "header": "machine|wafers|pass%|avg_defect%|top_defect",
+                "rows": rows, "total": len(rows), "fold": fold}
+
+    def _anomalies_table(self) -> Dict:
+        anomalies = self._stats("get_anomalies", self.anomaly_threshold)
+        rows = [
+            f"{a.get('wafer_id')}|{a.get('simulation_date', '-')}|"
+            f"{a.get('machine_type', 'Unknown')}_{a.get('machine_id', 'Unknown')}|"
+            f"{a.get('defect_percentage', 0):.2f}|{a.get('prediction', {}).get('Defect Class', 'Unknown')}"
+            for a in anomalies
+        ]
+
+        def fold(shown: int) -> str:
+            rest = anomalies[shown:]
+            return (f"other {len(rest)} anomalies: defect {rest[-1].get('defect_percentage', 0):.1f}-"
+                    f"{rest[0].get('defect_percentage', 0):.1f}%")
+
+        return {"title": f"ANOMALIES (>{self.anomaly_threshold:g}% defect, {len(anomalies)} wafers, worst first)",
+                "header": "wafer|date|machine|defect%|class", "rows": rows, "total": len(rows), "fold": fold}
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point for Testing
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    from Repository.Data_Aggregator import DataAggregator
+
+    aggregator = DataAggregator()
+    aggregator.load_results()
+    builder = ContextBuilder(aggregator)
+    print(builder.build())
+    print(f"\n{builder.last_build}")
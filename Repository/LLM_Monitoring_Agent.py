@@ -5,20 +5,46 @@ Integrates with OpenAI API to provide intelligent analysis and reporting
 
 import os
 import json
-from typing import Dict, List, Optional, Any
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Any, Sequence, Tuple
 from datetime import datetime
 import logging
 
 from Repository.config_LLM import (
-    OPENAI_API_KEY, OPENAI_MODEL,
-    LLM_TEMPERATURE, MAX_TOKENS, SYSTEM_PROMPT
+    OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL,
+    LLM_TEMPERATURE, MAX_TOKENS, SYSTEM_PROMPT,
+    LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CONTEXT_TOKEN_BUDGET, MACHINE_PASS_RATE_ALERT
 )
+from Repository.Async_LLM_Client import get_llm_client
+from Repository.Conversation_Session import ConversationSession
 from Repository.Data_Aggregator import DataAggregator
+from Repository.LLM_Context_Builder import SECTIONS, ContextBuilder
+from Repository.LLM_Response_Cache import LLMResponseCache, get_response_cache, make_cache_key
 from Repository.MultiPhysics_Knowledge_Base import (
     explain_defect, get_defect_info, get_recommendations,
     get_machine_domain_info
 )
 
+# Report structure asked for by the daily summary and recommendations prompts (also the answer
+# instructions of these requests made as a conversation turn)
+DAILY_SUMMARY_INSTRUCTIONS = """1. **Executive Summary**: Overall performance metrics and key highlights, including date-specific insights if multiple dates are present
+2. **Defect Analysis**: Breakdown of defect types with multi-physics explanations (thermal, mechanical, electrical causes)
+3. **Machine Performance**: Analysis of each machine type's performance and any issues
+4. **Anomalies & Alerts**: Highlight any wafers exceeding thresholds and their potential root causes, including which dates have the most anomalies
+5. **Date-Based Trends**: If multiple dates are present, identify trends over time and which dates had the most defects
+6. **Recommendations**: Specific corrective actions based on the defect patterns observed
+
+Be technical, data-driven, and provide actionable insights. Reference the multi-physics domains (thermal, mechanical, electrical) when explaining defect causes. Always include specific dates when discussing temporal patterns."""
+
+RECOMMENDATIONS_INSTRUCTIONS = """Provide prioritized recommendations that:
+1. Address the most critical issues first
+2. Include specific process parameters to check
+3. Reference multi-physics root causes (thermal, mechanical, electrical)
+4. Suggest preventive measures
+5. Include equipment maintenance suggestions
+
+Format as a numbered list with clear action items."""
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,23 +53,33 @@ logger = logging.getLogger(__name__)
 class LLMMonitoringAgent:
     """LLM-powered monitoring agent for wafer defect analysis."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[LLMResponseCache] = None,
+                 use_cache: bool = LLM_CACHE_ENABLED, base_url: Optional[str] = None,
+                 aggregator: Optional[DataAggregator] = None):
         """
         Initialize the LLM monitoring agent.
         
         Args:
             api_key: Optional API key (if not set in config)
+            cache: Response cache (default: the process-wide cache at LLM_CACHE_PATH)
+            use_cache: Whether to answer repeated prompts from the response cache
+            base_url: Optional OpenAI-compatible API base URL (if not set in config)
+            aggregator: Data aggregator to share with other components (default: a new one)
         """
         self.api_key = api_key or OPENAI_API_KEY
-        self.aggregator = DataAggregator()
+        self.base_url = base_url or OPENAI_BASE_URL
+        self.aggregator = aggregator or DataAggregator()
         self.client = None
+        self.llm_client = None  # Shared AsyncLLMClient: pooled, rate-limited, retrying calls
         self.initialization_error = None  # Store initialization error for debugging
+        self.cache = (cache or get_response_cache(LLM_CACHE_PATH)) if use_cache else None
+        self.context_token_budget = LLM_CONTEXT_TOKEN_BUDGET  # Maximum tokens of the data in a prompt
         
         # Initialize LLM client
         self._initialize_client()
         
-        # Load data
-        self.aggregator.load_results()
+        # Load data (no-op if a shared aggregator is already current)
+        self.aggregator.refresh()
     
     def _initialize_client(self):
         """Initialize the OpenAI client."""
@@ -65,8 +101,10 @@ class LLMMonitoringAgent:
                 self.client = None
                 return
             
-            self.client = OpenAI(api_key=self.api_key)
-            logger.info(f"Initialized OpenAI client with model: {OPENAI_MODEL}")
+            self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+            self.llm_client = get_llm_client(self.api_key, self.base_url)
+            logger.info(f"Initialized OpenAI client with model: {OPENAI_MODEL}"
+                        + (f" at {self.base_url}" if self.base_url else ""))
             self.initialization_error = None  # Clear any previous errors
             
             # Just verify the client can be created
@@ -83,127 +121,229 @@ class LLMMonitoringAgent:
             self.initialization_error = error_msg
             self.client = None
     
-    def _call_llm(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+    def _client_error_message(self) -> str:
+        """Build (and log) the troubleshooting message returned when the client is not initialized."""
+        error_details = self.initialization_error or "Unknown error during initialization"
+        error_msg = f"Error: LLM client not initialized.\n"
+        error_msg += f"Details: {error_details}\n"
+        error_msg += f"Provider: openai\n"
+        error_msg += f"API Key Present: {'Yes' if self.api_key else 'No'}\n"
+        error_msg += "\nTroubleshooting:\n"
+        error_msg += "1. Check your API key in config_llm.py\n"
+        error_msg += "2. Verify the API key is valid and not expired\n"
+        error_msg += "3. Ensure the OpenAI package is installed (pip install openai)\n"
+        error_msg += "4. Check your internet connection\n"
+        error_msg += "5. Review the logs above for more details"
+        logger.error(error_msg)
+        return error_msg
+    
+    @staticmethod
+    def _format_llm_error(e: Exception) -> str:
+        """Turn an API exception into a helpful error message."""
+        error_str = str(e)
+        logger.error(f"Error calling LLM: {error_str}")
+        
+        # Provide more helpful error messages
+        if "429" in error_str or "quota" in error_str.lower() or "insufficient_quota" in error_str.lower():
+            return f"Error: API quota exceeded. Your OpenAI API key has exceeded its quota limit.\n" \
+                   f"Please check your OpenAI account billing and usage at https://platform.openai.com/usage\n" \
+                   f"Original error: {error_str}"
+        elif "401" in error_str or "unauthorized" in error_str.lower() or "invalid_api_key" in error_str.lower():
+            return f"Error: Invalid API key. Please verify your OpenAI API key is correct and not expired.\n" \
+                   f"Original error: {error_str}"
+        elif "rate_limit" in error_str.lower():
+            return f"Error: Rate limit exceeded. Please wait a moment and try again.\n" \
+                   f"Original error: {error_str}"
+        else:
+            return f"Error calling LLM API: {error_str}\n" \
+                   f"If this persists, check your API key, internet connection, and account status."
+    
+    def _lookup_cache(self, prompt: str, system_prompt: str, refresh: bool):
+        """
+        Look a prompt up in the response cache.
+        
+        Returns:
+            Tuple (cache_key, cached_response); cache_key is None when caching is off and
+            cached_response is None on a miss or a forced refresh
+        """
+        if self.cache is None:
+            return None, None
+        cache_key = make_cache_key(OPENAI_MODEL, system_prompt, prompt, LLM_TEMPERATURE, MAX_TOKENS)
+        if refresh:
+            self.cache.record_bypass()
+            return cache_key, None
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info("LLM response served from cache")
+        return cache_key, cached
+    
+    async def _complete(self, prompt: str, system_prompt: str, cache_key: Optional[str]) -> str:
+        """Get a completion on the client loop, caching it (or turning the error into a message)."""
+        try:
+            content = await self.llm_client.complete(prompt, system_prompt)
+        except Exception as e:
+            return self._format_llm_error(e)
+        if cache_key is not None and content:
+            self.cache.put(cache_key, content, OPENAI_MODEL)  # Error messages are never cached
+        return content
+    
+    def _submit_llm(self, prompt: str, system_prompt: Optional[str] = None, refresh: bool = False) -> Future:
         """
-        Call the LLM API with a prompt.
+        Start an LLM call without waiting for it, so independent calls run in parallel.
         
         Args:
             prompt: User prompt
             system_prompt: Optional system prompt
+            refresh: Skip the cache lookup and call the API (the new response is still cached)
             
         Returns:
-            LLM response text
+            concurrent.futures.Future of the response text (already done on a cache hit or
+            when the client is not initialized)
         """
-        if not self.client:
-            error_details = self.initialization_error or "Unknown error during initialization"
-            error_msg = f"Error: LLM client not initialized.\n"
-            error_msg += f"Details: {error_details}\n"
-            error_msg += f"Provider: {self.provider}\n"
-            error_msg += f"API Key Present: {'Yes' if self.api_key else 'No'}\n"
-            error_msg += "\nTroubleshooting:\n"
-            error_msg += "1. Check your API key in config_llm.py\n"
-            error_msg += "2. Verify the API key is valid and not expired\n"
-            error_msg += "3. Ensure the OpenAI package is installed (pip install openai)\n"
-            error_msg += "4. Check your internet connection\n"
-            error_msg += "5. Review the logs above for more details"
-            logger.error(error_msg)
-            return error_msg
+        if not self.client or not self.llm_client:
+            future = Future()
+            future.set_result(self._client_error_message())
+            return future
         
         system_prompt = system_prompt or SYSTEM_PROMPT
+        cache_key, cached = self._lookup_cache(prompt, system_prompt, refresh)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        return self.llm_client.submit(self._complete(prompt, system_prompt, cache_key))
+    
+    def _call_llm(self, prompt: str, system_prompt: Optional[str] = None, refresh: bool = False) -> str:
+        """
+        Call the LLM API with a prompt, answering repeated prompts from the response cache.
         
-        try:
-            response = self.client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=LLM_TEMPERATURE,
-                max_tokens=MAX_TOKENS
-            )
-            return response.choices[0].message.content
+        Rate-limited and overloaded requests are retried with backoff by the shared client.
         
-        except Exception as e:
-            error_str = str(e)
-            logger.error(f"Error calling LLM: {error_str}")
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            refresh: Skip the cache lookup and call the API (the new response is still cached)
             
-            # Provide more helpful error messages
-            if "429" in error_str or "quota" in error_str.lower() or "insufficient_quota" in error_str.lower():
-                return f"Error: API quota exceeded. Your OpenAI API key has exceeded its quota limit.\n" \
-                       f"Please check your OpenAI account billing and usage at https://platform.openai.com/usage\n" \
-                       f"Original error: {error_str}"
-            elif "401" in error_str or "unauthorized" in error_str.lower() or "invalid_api_key" in error_str.lower():
-                return f"Error: Invalid API key. Please verify your OpenAI API key is correct and not expired.\n" \
-                       f"Original error: {error_str}"
-            elif "rate_limit" in error_str.lower():
-                return f"Error: Rate limit exceeded. Please wait a moment and try again.\n" \
-                       f"Original error: {error_str}"
-            else:
-                return f"Error calling LLM API: {error_str}\n" \
-                       f"If this persists, check your API key, internet connection, and account status."
-    
-    def generate_daily_summary(self, date: Optional[str] = None) -> str:
+        Returns:
+            LLM response text
         """
-        Generate a daily summary report.
+        return self._submit_llm(prompt, system_prompt, refresh).result()
+    
+    def _call_llm_many(self, prompts: List[str], system_prompt: Optional[str] = None,
+                       refresh: bool = False) -> List[str]:
+        """
+        Call the LLM API with independent prompts concurrently.
         
         Args:
-            date: Specific date (YYYY-MM-DD) or None for latest data
+            prompts: User prompts
+            system_prompt: Optional system prompt shared by all calls
+            refresh: Skip the cache lookups
             
         Returns:
-            Formatted daily summary
+            Response texts, in prompt order
+        """
+        futures = [self._submit_llm(prompt, system_prompt, refresh) for prompt in prompts]
+        return [future.result() for future in futures]
+    
+    def _stream_llm(self, prompt: str, system_prompt: Optional[str] = None,
+                    refresh: bool = False) -> Iterator[str]:
         """
-        # Reload data to get latest
-        self.aggregator.load_results()
+        Streaming variant of _call_llm: yield the response text as it arrives.
         
-        summary_stats = self.aggregator.get_summary_statistics()
-        machine_stats = self.aggregator.get_machine_statistics()
-        defect_dist = self.aggregator.get_defect_distribution()
-        anomalies = self.aggregator.get_anomalies()
+        A cached response is yielded in one piece; a streamed response is cached once complete.
+        Errors are yielded as text, like _call_llm returns them (after any partial response).
         
-        # Format data for LLM
-        data_summary = self.aggregator.format_for_llm()
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            refresh: Skip the cache lookup and call the API (the new response is still cached)
+            
+        Yields:
+            Response text chunks
+        """
+        if not self.client or not self.llm_client:
+            yield self._client_error_message()
+            return
         
-        # Get date statistics for context
-        date_stats = self.aggregator.get_date_statistics()
-        date_context = ""
-        if date_stats:
-            date_context = "\n\nDATE-BASED ANALYSIS:\n"
-            date_context += "The data includes results from multiple simulation dates. Pay special attention to:\n"
-            for date in sorted(date_stats.keys(), reverse=True):
-                stats = date_stats[date]
-                date_context += f"- {date}: {stats['total_wafers']} wafers, {stats['pass_rate']:.2f}% pass rate, "
-                date_context += f"{stats['anomalies']} anomalies\n"
+        system_prompt = system_prompt or SYSTEM_PROMPT
+        cache_key, cached = self._lookup_cache(prompt, system_prompt, refresh)
+        if cached is not None:
+            yield cached
+            return
+        
+        chunks = []
+        try:
+            for text in self.llm_client.stream_sync(prompt, system_prompt):
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            yield ("\n\n" if chunks else "") + self._format_llm_error(e)
+            return
+        
+        content = "".join(chunks)
+        if cache_key is not None and content:
+            self.cache.put(cache_key, content, OPENAI_MODEL)
+    
+    def _build_daily_summary_prompt(self) -> str:
+        """Reload the data and build the daily summary prompt."""
+        # Reload data only if new results arrived
+        self.aggregator.refresh()
+        
+        # Compact, token-budgeted data tables (recent dates, worst machines, top anomalies first)
+        data_summary = self._build_context()
         
         prompt = f"""Analyze the following semiconductor manufacturing wafer defect data and generate a comprehensive daily summary report.
 
 {data_summary}
-{date_context}
 
 Please provide:
-1. **Executive Summary**: Overall performance metrics and key highlights, including date-specific insights if multiple dates are present
-2. **Defect Analysis**: Breakdown of defect types with multi-physics explanations (thermal, mechanical, electrical causes)
-3. **Machine Performance**: Analysis of each machine type's performance and any issues
-4. **Anomalies & Alerts**: Highlight any wafers exceeding thresholds and their potential root causes, including which dates have the most anomalies
-5. **Date-Based Trends**: If multiple dates are present, identify trends over time and which dates had the most defects
-6. **Recommendations**: Specific corrective actions based on the defect patterns observed
-
-Be technical, data-driven, and provide actionable insights. Reference the multi-physics domains (thermal, mechanical, electrical) when explaining defect causes. Always include specific dates when discussing temporal patterns."""
-
-        response = self._call_llm(prompt)
+{DAILY_SUMMARY_INSTRUCTIONS}"""
+        return prompt
+    
+    def generate_daily_summary(self, date: Optional[str] = None, refresh: bool = False) -> str:
+        """
+        Generate a daily summary report.
+        
+        Args:
+            date: Specific date (YYYY-MM-DD) or None for latest data
+            refresh: Bypass the response cache
+            
+        Returns:
+            Formatted daily summary
+        """
+        response = self._call_llm(self._build_daily_summary_prompt(), refresh=refresh)
         return response
     
-    def answer_query(self, query: str) -> str:
+    def submit_daily_summary(self, date: Optional[str] = None, refresh: bool = False) -> Future:
         """
-        Answer an operator's natural language query.
+        Start generating the daily summary report without waiting for it.
         
         Args:
-            query: Natural language question
+            date: Specific date (YYYY-MM-DD) or None for latest data
+            refresh: Bypass the response cache
             
         Returns:
-            Answer to the query
+            concurrent.futures.Future of the summary text
         """
-        # Reload data
-        self.aggregator.load_results()
+        return self._submit_llm(self._build_daily_summary_prompt(), refresh=refresh)
+    
+    def stream_daily_summary(self, date: Optional[str] = None, refresh: bool = False) -> Iterator[str]:
+        """
+        Generate a daily summary report, yielding the text as it arrives.
+        
+        Args:
+            date: Specific date (YYYY-MM-DD) or None for latest data
+            refresh: Bypass the response cache
+            
+        Yields:
+            Summary text chunks
+        """
+        yield from self._stream_llm(self._build_daily_summary_prompt(), refresh=refresh)
+    
+    def _build_query_prompt(self, query: str) -> str:
+        """Reload the data and build the prompt answering an operator's query."""
+        # Reload data only if new results arrived
+        self.aggregator.refresh()
         
         # Get relevant data based on query type
         data_context = self._get_query_context(query)
@@ -218,87 +358,129 @@ Available Manufacturing Data:
 IMPORTANT: The manufacturing data includes simulation_date information for each wafer. When answering questions about dates, trends over time, or which date has the most defects, use the date statistics provided above. Each wafer record includes a simulation_date field (format: YYYY-MM-DD) that indicates when the wafer was processed.
 
 Provide a clear, technical answer with specific numbers, statistics, dates, and actionable recommendations. If the question relates to defect causes, explain the multi-physics aspects (thermal, mechanical, electrical domains). Always reference specific dates when discussing temporal patterns or date-specific data."""
-
-        response = self._call_llm(prompt)
+        return prompt
+    
+    def _build_query_prompts(self, query: str, session: Optional[ConversationSession] = None,
+                             task: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """
+        Build the prompts answering a query, standalone or as the next turn of a conversation.
+        
+        Returns:
+            Tuple (user prompt, system prompt or None for the default one)
+        """
+        if session is None:
+            return self._build_query_prompt(query), None
+        # Reload data only if new results arrived; the session sends only its changes
+        self.aggregator.refresh()
+        return session.prepare(query, SYSTEM_PROMPT, task)
+    
+    def session_task(self, method: str, *args) -> Optional[str]:
+        """
+        Answer instructions of an agent request made as a conversation turn.
+        
+        In a conversation every request is answered through answer_query (the data is already
+        in the conversation); this keeps what the dedicated prompt of the request asks for.
+        
+        Args:
+            method: Agent method of the request (answer_query, generate_recommendations,
+                generate_daily_summary or explain_defect_with_llm)
+            *args: Its arguments, without refresh
+            
+        Returns:
+            Instructions, or None for a plain question
+        """
+        if method == "generate_recommendations":
+            return RECOMMENDATIONS_INSTRUCTIONS
+        if method == "generate_daily_summary":
+            return "Answer with a daily summary report. Please provide:\n" + DAILY_SUMMARY_INSTRUCTIONS
+        if method == "explain_defect_with_llm":
+            return self._build_defect_prompt(*args)
+        return None
+    
+    def answer_query(self, query: str, refresh: bool = False,
+                     session: Optional[ConversationSession] = None, task: Optional[str] = None) -> str:
+        """
+        Answer an operator's natural language query.
+        
+        Args:
+            query: Natural language question
+            refresh: Bypass the response cache
+            session: Conversation the query belongs to (the caller records the turn)
+            task: Answer instructions of the turn (see session_task; only used with a session)
+            
+        Returns:
+            Answer to the query
+        """
+        prompt, system_prompt = self._build_query_prompts(query, session, task)
+        response = self._call_llm(prompt, system_prompt, refresh=refresh)
         return response
     
+    def submit_answer_query(self, query: str, refresh: bool = False,
+                            session: Optional[ConversationSession] = None, task: Optional[str] = None) -> Future:
+        """
+        Start answering an operator's query without waiting for the answer.
+        
+        Args:
+            query: Natural language question
+            refresh: Bypass the response cache
+            session: Conversation the query belongs to (the caller records the turn)
+            task: Answer instructions of the turn (see session_task; only used with a session)
+            
+        Returns:
+            concurrent.futures.Future of the answer text
+        """
+        prompt, system_prompt = self._build_query_prompts(query, session, task)
+        return self._submit_llm(prompt, system_prompt, refresh=refresh)
+    
+    def stream_answer_query(self, query: str, refresh: bool = False,
+                            session: Optional[ConversationSession] = None, task: Optional[str] = None) -> Iterator[str]:
+        """
+        Answer an operator's natural language query, yielding the answer as it arrives.
+        
+        Args:
+            query: Natural language question
+            refresh: Bypass the response cache
+            session: Conversation the query belongs to (the caller records the turn)
+            task: Answer instructions of the turn (see session_task; only used with a session)
+            
+        Yields:
+            Answer text chunks
+        """
+        prompt, system_prompt = self._build_query_prompts(query, session, task)
+        yield from self._stream_llm(prompt, system_prompt, refresh=refresh)
+    
+    def _build_context(self, sections: Sequence[str] = SECTIONS) -> str:
+        """Build the compact data context of a prompt within the agent's token budget."""
+        builder = ContextBuilder(self.aggregator, token_budget=self.context_token_budget)
+        context = builder.build(sections)
+        logger.debug(f"LLM context: {builder.last_build}")
+        return context
+    
     def _get_query_context(self, query: str) -> str:
         """Get relevant data context based on query."""
         query_lower = query.lower()
-        context = ""
-        
-        from Repository.config_LLM import DEFECT_PERCENTAGE_THRESHOLD
+        sections = ["overview"]
         
         # Date-based statistics (always include for date-related queries)
-        if any(word in query_lower for word in ["date", "day", "when", "which date", "most defect"]):
-            date_stats = self.aggregator.get_date_statistics()
-            if date_stats:
-                context += "STATISTICS BY SIMULATION DATE:\n"
-                # Sort by total wafers or anomalies to show most relevant dates first
-                sorted_dates = sorted(
-                    date_stats.items(), 
-                    key=lambda x: (x[1]['anomalies'], x[1]['total_wafers']), 
-                    reverse=True
-                )
-                for date, stats in sorted_dates:
-                    context += f"  Date: {date}\n"
-                    context += f"    Total Wafers: {stats['total_wafers']}\n"
-                    context += f"    Pass Rate: {stats['pass_rate']:.2f}% ({stats['pass_count']} pass, {stats['fail_count']} fail)\n"
-                    context += f"    Avg Defect %: {stats['avg_defect_percentage']:.2f}%\n"
-                    context += f"    Anomalies (>{DEFECT_PERCENTAGE_THRESHOLD}%): {stats['anomalies']} wafers\n"
-                context += "\n"
+        if any(word in query_lower for word in ["date", "day", "when", "which date", "most defect", "trend", "over time"]):
+            sections.append("dates")
         
         # Machine performance queries
         if any(word in query_lower for word in ["machine", "tool", "equipment", "which"]):
-            ranking = self.aggregator.get_machine_performance_ranking()
-            context += "Machine Performance Ranking:\n"
-            for i, machine in enumerate(ranking, 1):
-                context += f"  {i}. {machine['machine']}: {machine['pass_rate']:.2f}% pass rate "
-                context += f"({machine['total_wafers']} wafers, avg defect: {machine['average_defect_percentage']:.2f}%)\n"
-            context += "\n"
+            sections.append("machines")
         
         # Defect distribution queries
         if any(word in query_lower for word in ["defect", "pattern", "type", "common"]):
-            defect_dist = self.aggregator.get_defect_distribution()
-            context += "Defect Class Distribution:\n"
-            for defect_class, count in sorted(defect_dist['counts'].items(), key=lambda x: x[1], reverse=True):
-                pct = defect_dist['percentages'].get(defect_class, 0)
-                context += f"  {defect_class}: {count} wafers ({pct}%)\n"
-            context += "\n"
-        
-        # Summary statistics
-        summary = self.aggregator.get_summary_statistics()
-        context += f"Overall Statistics:\n"
-        context += f"  Total Wafers: {summary['total_wafers']}\n"
-        context += f"  Pass Rate: {summary['pass_rate']:.2f}%\n"
-        context += f"  Average Defect Percentage: {summary['average_defect_percentage']:.2f}%\n"
-        context += "\n"
+            sections.append("defects")
         
         # Anomalies with dates
-        anomalies = self.aggregator.get_anomalies()
-        if anomalies:
-            context += f"Anomalies (>{DEFECT_PERCENTAGE_THRESHOLD}% defect): {len(anomalies)} wafers\n"
-            for i, anomaly in enumerate(anomalies[:5], 1):
-                sim_date = anomaly.get('simulation_date', 'Unknown')
-                context += f"  {i}. {anomaly.get('wafer_id')}: {anomaly.get('defect_percentage', 0):.2f}% "
-                context += f"({anomaly.get('prediction', {}).get('Defect Class', 'Unknown')}) "
-                context += f"[Date: {sim_date}]\n"
+        sections.append("anomalies")
         
-        return context
+        return self._build_context(sections)
     
-    def explain_defect_with_llm(self, defect_class: str, machine_type: str = None, 
-                                defect_percentage: float = None) -> str:
-        """
-        Get LLM-enhanced explanation for a defect.
-        
-        Args:
-            defect_class: Defect class name
-            machine_type: Optional machine type
-            defect_percentage: Optional defect percentage
-            
-        Returns:
-            Enhanced explanation
-        """
+    def _build_defect_prompt(self, defect_class: str, machine_type: str = None,
+                             defect_percentage: float = None) -> str:
+        """Build the prompt explaining a defect class."""
         # Get base knowledge
         base_explanation = explain_defect(defect_class, machine_type)
         defect_info = get_defect_info(defect_class)
@@ -319,18 +501,63 @@ Provide an enhanced explanation that:
 4. Suggests specific process parameters to check
 
 Be technical and specific to semiconductor manufacturing."""
-
-        response = self._call_llm(prompt)
+        return prompt
+    
+    def explain_defect_with_llm(self, defect_class: str, machine_type: str = None, 
+                                defect_percentage: float = None, refresh: bool = False) -> str:
+        """
+        Get LLM-enhanced explanation for a defect.
+        
+        Args:
+            defect_class: Defect class name
+            machine_type: Optional machine type
+            defect_percentage: Optional defect percentage
+            refresh: Bypass the response cache
+            
+        Returns:
+            Enhanced explanation
+        """
+        prompt = self._build_defect_prompt(defect_class, machine_type, defect_percentage)
+        response = self._call_llm(prompt, refresh=refresh)
         return response
     
-    def generate_recommendations(self) -> str:
+    def submit_defect_explanation(self, defect_class: str, machine_type: str = None,
+                                  defect_percentage: float = None, refresh: bool = False) -> Future:
         """
-        Generate actionable recommendations based on current data.
+        Start the LLM-enhanced explanation of a defect without waiting for it.
         
+        Args:
+            defect_class: Defect class name
+            machine_type: Optional machine type
+            defect_percentage: Optional defect percentage
+            refresh: Bypass the response cache
+            
         Returns:
-            Formatted recommendations
+            concurrent.futures.Future of the explanation text
         """
-        self.aggregator.load_results()
+        prompt = self._build_defect_prompt(defect_class, machine_type, defect_percentage)
+        return self._submit_llm(prompt, refresh=refresh)
+    
+    def stream_defect_explanation(self, defect_class: str, machine_type: str = None,
+                                  defect_percentage: float = None, refresh: bool = False) -> Iterator[str]:
+        """
+        Get LLM-enhanced explanation for a defect, yielding the text as it arrives.
+        
+        Args:
+            defect_class: Defect class name
+            machine_type: Optional machine type
+            defect_percentage: Optional defect percentage
+            refresh: Bypass the response cache
+            
+        Yields:
+            Explanation text chunks
+        """
+        prompt = self._build_defect_prompt(defect_class, machine_type, defect_percentage)
+        yield from self._stream_llm(prompt, refresh=refresh)
+    
+    def _build_recommendations_prompt(self) -> str:
+        """Refresh the data and build the recommendations prompt."""
+        self.aggregator.refresh()
         
         summary = self.aggregator.get_summary_statistics()
         machine_stats = self.aggregator.get_machine_statistics()
@@ -359,23 +586,51 @@ Machine Performance Issues:
 
 Anomalies: {len(anomalies)} wafers exceeding 40% defect threshold
 
-Provide prioritized recommendations that:
-1. Address the most critical issues first
-2. Include specific process parameters to check
-3. Reference multi-physics root causes (thermal, mechanical, electrical)
-4. Suggest preventive measures
-5. Include equipment maintenance suggestions
-
-Format as a numbered list with clear action items."""
-
-        response = self._call_llm(prompt)
+{RECOMMENDATIONS_INSTRUCTIONS}"""
+        return prompt
+    
+    def generate_recommendations(self, refresh: bool = False) -> str:
+        """
+        Generate actionable recommendations based on current data.
+        
+        Args:
+            refresh: Bypass the response cache
+        
+        Returns:
+            Formatted recommendations
+        """
+        response = self._call_llm(self._build_recommendations_prompt(), refresh=refresh)
         return response
     
+    def submit_recommendations(self, refresh: bool = False) -> Future:
+        """
+        Start generating recommendations without waiting for them.
+        
+        Args:
+            refresh: Bypass the response cache
+        
+        Returns:
+            concurrent.futures.Future of the recommendations text
+        """
+        return self._submit_llm(self._build_recommendations_prompt(), refresh=refresh)
+    
+    def stream_recommendations(self, refresh: bool = False) -> Iterator[str]:
+        """
+        Generate actionable recommendations, yielding the text as it arrives.
+        
+        Args:
+            refresh: Bypass the response cache
+        
+        Yields:
+            Recommendation text chunks
+        """
+        yield from self._stream_llm(self._build_recommendations_prompt(), refresh=refresh)
+    
     def _format_machine_issues(self, machine_stats: Dict) -> str:
         """Format machine statistics for prompt."""
         issues = []
         for machine, stats in machine_stats.items():
-            if stats['pass_rate'] < 80:  # Flag machines with <80% pass rate
+            if stats['pass_rate'] < MACHINE_PASS_RATE_ALERT:  # Flag machines below the alert pass rate
                 issues.append(f"- {machine}: {stats['pass_rate']:.2f}% pass rate "
                             f"(avg defect: {stats['average_defect_percentage']:.2f}%)")
         
@@ -388,6 +643,22 @@ Format as a numbered list with clear action items."""
         """Get defect distribution (wrapper for aggregator)."""
         return self.aggregator.get_defect_distribution()
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get the response cache statistics.
+        
+        Returns:
+            Dictionary of LLMResponseCache.stats() plus "enabled"
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def clear_cache(self):
+        """Delete every cached response."""
+        if self.cache is not None:
+            self.cache.clear()
+    
     def test_connection(self) -> Dict[str, Any]:
         """
         Test the OpenAI connection and API key.
@@ -397,6 +668,7 @@ Format as a numbered list with clear action items."""
         """
         result = {
             "provider": "openai",
+            "base_url": self.base_url,
             "client_initialized": self.client is not None,
             "api_key_present": bool(self.api_key),
             "api_key_format_valid": False,
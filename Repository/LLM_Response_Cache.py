@@ -0,0 +1,221 @@
+"""
+LLM Response Cache
+Persistent (SQLite) cache of LLM responses keyed by model, generation settings, system prompt
+and prompt hash. Prompts embed the aggregated manufacturing data (format_for_llm and friends),
+so a key changes by itself whenever the data changes: a hit is always an answer to the same
+question about the same data.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from Repository.config_LLM import LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at);
+"""
+
+
+def make_cache_key(model: str, system_prompt: str, prompt: str,
+                   temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+    """
+    Build the cache key of an LLM call.
+
+    Args:
+        model: Model name
+        system_prompt: System prompt
+        prompt: User prompt (including the embedded data)
+        temperature: Sampling temperature
+        max_tokens: Response token limit
+
+    Returns:
+        SHA-256 hex digest
+    """
+    payload = json.dumps([model, temperature, max_tokens, system_prompt, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------------------------------------------
+# Cache Class
+# ------------------------------------------------------------------------------------------
+class LLMResponseCache:
+    """
+    SQLite-backed response cache with a TTL and least-recently-used eviction.
+
+    The database is opened on first use, so creating a cache has no file-system side effect.
+    Entries older than ttl_seconds are never returned; once the cache holds more than
+    max_entries, the least recently used entries are evicted. Thread-safe.
+    """
+
+    def __init__(self, db_path: Path = LLM_CACHE_PATH, ttl_seconds: Optional[float] = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: SQLite database file
+            ttl_seconds: Entry lifetime (None: entries never expire)
+            max_entries: Maximum number of cached responses
+        """
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypasses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=10)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a response.
+
+        Args:
+            key: Key built by make_cache_key()
+
+        Returns:
+            Cached response, or None on a miss (or an expired entry)
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str, model: str = ""):
+        """
+        Store a response, evicting expired and least recently used entries as needed.
+
+        Args:
+            key: Key built by make_cache_key()
+            response: Response text
+            model: Model that produced the response (kept for inspection)
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, model, response, now, now)
+            )
+            if self.ttl_seconds is not None:
+                self.expired += conn.execute("DELETE FROM responses WHERE created_at < ?",
+                                             (now - self.ttl_seconds,)).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used_at LIMIT ?)", (excess,)
+                )
+                self.evictions += excess
+            conn.commit()
+            self.stores += 1
+
+    def record_bypass(self):
+        """Count a lookup skipped by a forced refresh."""
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self):
+        """Delete every cached response."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+        logger.info(f"LLM response cache cleared: {self.db_path}")
+
+    def stats(self) -> Dict:
+        """
+        Get the cache statistics of this process, plus the current size of the cache.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate, stores, bypasses, expired, evictions,
+            entries, max_entries, ttl_seconds, size_bytes and path
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            entries = 0
+            if self._conn is not None or self.db_path.exists():
+                entries = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "bypasses": self.bypasses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "size_bytes": os.path.getsize(self.db_path) if self.db_path.exists() else 0,
+                "path": str(self.db_path)
+            }
+
+    def close(self):
+        """Close the database connection (it is reopened on next use)."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Process-wide caches by database file, shared by every agent (and every Streamlit rerun)
+_CACHES: Dict[str, LLMResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_response_cache(db_path: Path = LLM_CACHE_PATH) -> LLMResponseCache:
+    """Get the process-wide cache of a database file (created on first use)."""
+    key = os.path.abspath(str(db_path))
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            _CACHES[key] = LLMResponseCache(db_path)
+        return _CACHES[key]
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    cache = get_response_cache()
+    print(json.dumps(cache.stats(), indent=2))
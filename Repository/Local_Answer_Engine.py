@@ -0,0 +1,281 @@
+"""
+Local Answer Engine
+Answers structured operator queries (machine performance, defect distribution, anomalies,
+trends) with complete narrative answers built from the aggregated statistics and the
+multi-physics knowledge base. No LLM call: answers take milliseconds instead of seconds and
+are the same for the same data.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from Repository.config_LLM import DEFECT_PERCENTAGE_THRESHOLD, MACHINE_PASS_RATE_ALERT
+from Repository.MultiPhysics_Knowledge_Base import (
+    get_defect_info, get_machine_domain_info, get_primary_domain,
+    get_recommendations, get_root_causes
+)
+
+# Recent dates compared against the earlier ones in trend answers
+TREND_WINDOW_DATES = 7
+
+# Change of pass rate (percentage points) below which a trend is reported as stable
+TREND_STABLE_POINTS = 1.0
+
+
+def split_machine_key(machine: str) -> Tuple[str, str]:
+    """Split a DataAggregator machine key ("<machine_type>_<machine_id>") into type and ID."""
+    machine_type, _, machine_id = machine.partition("_")
+    return machine_type, machine_id
+
+
+def top_defect(distribution: Dict[str, int], exclude_normal: bool = True) -> Optional[str]:
+    """Most frequent defect class of a class -> count mapping (None if there is none)."""
+    counts = {k: v for k, v in distribution.items() if not (exclude_normal and k in ("Normal", "none"))}
+    return max(counts, key=counts.get) if counts else None
+
+
+# ------------------------------------------------------------------------------------------
+# Local Answer Engine Class
+# ------------------------------------------------------------------------------------------
+class LocalAnswerEngine:
+    """Templated answers to structured queries from a DataAggregator."""
+
+    def __init__(self, aggregator, anomaly_threshold: float = DEFECT_PERCENTAGE_THRESHOLD,
+                 pass_rate_alert: float = MACHINE_PASS_RATE_ALERT):
+        """
+        Initialize the answer engine.
+
+        Args:
+            aggregator: DataAggregator with loaded results
+            anomaly_threshold: Defect percentage above which a wafer is an anomaly
+            pass_rate_alert: Pass rate (%) below which a machine is flagged
+        """
+        self.aggregator = aggregator
+        self.anomaly_threshold = anomaly_threshold
+        self.pass_rate_alert = pass_rate_alert
+
+    @staticmethod
+    def _actions(defect_class: Optional[str], limit: int = 3) -> str:
+        """Numbered recommended actions of a defect class."""
+        actions = get_recommendations(defect_class) if defect_class else []
+        return "".join(f"{i}. {action}\n" for i, action in enumerate(actions[:limit], 1))
+
+    @staticmethod
+    def _causes(defect_class: Optional[str], limit: int = 2) -> str:
+        """Likely root causes of a defect class, as one sentence fragment."""
+        causes = get_root_causes(defect_class) if defect_class else []
+        return "; ".join(cause[0].lower() + cause[1:] for cause in causes[:limit])
+
+    # --------------------------------------------------------------------------------------
+    # Answers
+    # --------------------------------------------------------------------------------------
+    def machine_performance(self) -> str:
+        """
+        Answer machine performance queries.
+
+        Returns:
+            Ranking table followed by a narrative analysis
+        """
+        ranking = self.aggregator.get_machine_performance_ranking()
+        if not ranking:
+            return "No machine performance data available."
+        machine_stats = self.aggregator.get_machine_statistics()
+
+        answer = "Machine Performance Ranking:\n\n"
+        for i, machine in enumerate(ranking, 1):
+            answer += f"{i}. {machine['machine']}: {machine['pass_rate']:.2f}% pass rate "
+            answer += f"({machine['total_wafers']} wafers, "
+            answer += f"avg defect: {machine['average_defect_percentage']:.2f}%)\n"
+
+        best, worst = ranking[0], ranking[-1]
+        answer += "\nAnalysis:\n"
+        answer += (f"- Best performer: {best['machine']} at {best['pass_rate']:.2f}% pass rate "
+                   f"(avg defect {best['average_defect_percentage']:.2f}%).\n")
+        if len(ranking) > 1:
+            answer += (f"- Worst performer: {worst['machine']} at {worst['pass_rate']:.2f}% pass rate "
+                       f"(avg defect {worst['average_defect_percentage']:.2f}%), "
+                       f"{best['pass_rate'] - worst['pass_rate']:.2f} points below the best.\n")
+
+        flagged = [m for m in ranking if m["pass_rate"] < self.pass_rate_alert]
+        if flagged:
+            answer += (f"- {len(flagged)} machine(s) below the {self.pass_rate_alert:g}% pass-rate alert level: "
+                       f"{', '.join(m['machine'] for m in flagged)}.\n")
+        else:
+            answer += f"- All machines are above the {self.pass_rate_alert:g}% pass-rate alert level.\n"
+
+        # Link the worst machine's dominant defect to its physics domain
+        machine_type, _ = split_machine_key(worst["machine"])
+        defect = top_defect(machine_stats.get(worst["machine"], {}).get("defect_class_distribution", {}))
+        if defect:
+            domain_info = get_machine_domain_info(machine_type)
+            typical = defect in domain_info.get("typical_defects", [])
+            answer += (f"- {worst['machine']}'s most frequent defect is {defect} "
+                       f"({get_primary_domain(defect)} domain), "
+                       f"{'a typical' if typical else 'an unusual'} pattern for {machine_type} processes"
+                       f"{' (' + ', '.join(domain_info['processes'][:3]) + ')' if domain_info else ''}.\n")
+            causes = self._causes(defect)
+            if causes:
+                answer += f"- Likely causes: {causes}.\n"
+            answer += f"\nRecommended actions for {worst['machine']}:\n{self._actions(defect)}"
+        return answer
+
+    def defect_distribution(self) -> str:
+        """
+        Answer defect distribution queries.
+
+        Returns:
+            Distribution table followed by a narrative analysis
+        """
+        defect_dist = self.aggregator.get_defect_distribution()
+        counts = defect_dist.get("counts", {})
+        if not counts:
+            return "No defect data available."
+        percentages = defect_dist["percentages"]
+
+        answer = "Defect Class Distribution:\n\n"
+        for defect_class, count in sorted(counts.items(), key=lambda x: x[1], reverse=True):
+            pct = percentages.get(defect_class, 0)
+            answer += f"{defect_class:20s}: {count:4d} wafers ({pct:5.2f}%)\n"
+
+        answer += "\nAnalysis:\n"
+        normal_pct = percentages.get("Normal", 0)
+        answer += f"- {normal_pct:.2f}% of wafers are Normal; {100 - normal_pct:.2f}% show a defect pattern.\n"
+        defect = top_defect(counts)
+        if defect is None:
+            return answer + "- No defect pattern has been observed.\n"
+
+        info = get_defect_info(defect) or {}
+        answer += (f"- Most common defect: {defect} ({counts[defect]} wafers, {percentages.get(defect, 0):.2f}%)"
+                   f"{' - ' + info['description'].lower() if info else ''}.\n")
+        others = sorted((k for k in counts if k not in ("Normal", "none", defect)), key=counts.get, reverse=True)
+        if others:
+            answer += f"- Next: {', '.join(f'{k} ({percentages.get(k, 0):.2f}%)' for k in others[:2])}.\n"
+
+        domains = Counter()
+        for defect_class, count in counts.items():
+            if defect_class not in ("Normal", "none"):
+                domains[get_primary_domain(defect_class)] += count
+        if domains:
+            domain, count = domains.most_common(1)[0]
+            answer += (f"- By physics domain, {domain} patterns dominate "
+                       f"({count / sum(domains.values()) * 100:.1f}% of defective wafers).\n")
+
+        # Machine where the most common defect is concentrated
+        machine_stats = self.aggregator.get_machine_statistics()
+        if machine_stats:
+            machine, stats = max(machine_stats.items(),
+                                 key=lambda x: x[1]["defect_class_distribution"].get(defect, 0) / max(x[1]["total_wafers"], 1))
+            share = stats["defect_class_distribution"].get(defect, 0) / max(stats["total_wafers"], 1) * 100
+            answer += f"- {defect} is most concentrated on {machine} ({share:.2f}% of its wafers).\n"
+        causes = self._causes(defect)
+        if causes:
+            answer += f"- Likely causes: {causes}.\n"
+        answer += f"\nRecommended actions for {defect}:\n{self._actions(defect)}"
+        return answer
+
+    def anomaly_analysis(self) -> str:
+        """
+        Answer anomaly analysis queries.
+
+        Returns:
+            Top anomalies followed by a breakdown by date, machine and defect class
+        """
+        anomalies = self.aggregator.get_anomalies(self.anomaly_threshold)
+        total = len(self.aggregator.data)
+
+        answer = "Anomaly Analysis:\n\n"
+        answer += f"Total Anomalies (>{self.anomaly_threshold:g}% defect): {len(anomalies)}\n\n"
+        if not anomalies:
+            return answer + "No wafer exceeds the defect threshold.\n"
+
+        answer += "Top Anomalies:\n"
+        for i, anomaly in enumerate(anomalies[:10], 1):
+            sim_date = anomaly.get('simulation_date', 'Unknown')
+            answer += f"{i}. {anomaly.get('wafer_id')}: "
+            answer += f"{anomaly.get('defect_percentage', 0):.2f}% defect, "
+            answer += f"Class: {anomaly.get('prediction', {}).get('Defect Class', 'Unknown')}, "
+            answer += f"Machine: {anomaly.get('machine_type')} {anomaly.get('machine_id')}, "
+            answer += f"Date: {sim_date}\n"
+
+        by_machine = Counter(f"{a.get('machine_type', 'Unknown')}_{a.get('machine_id', 'Unknown')}" for a in anomalies)
+        by_class = Counter(a.get("prediction", {}).get("Defect Class", "Unknown") for a in anomalies)
+        by_date = Counter(a.get("simulation_date") for a in anomalies if a.get("simulation_date"))
+
+        answer += "\nAnalysis:\n"
+        answer += f"- {len(anomalies)} of {total} wafers ({len(anomalies) / max(total, 1) * 100:.2f}%) are anomalies.\n"
+        machine, count = by_machine.most_common(1)[0]
+        answer += f"- Most affected machine: {machine} ({count} anomalies, {count / len(anomalies) * 100:.1f}%).\n"
+        if by_date:
+            date, count = by_date.most_common(1)[0]
+            answer += f"- Date with the most anomalies: {date} ({count}).\n"
+        defect, count = by_class.most_common(1)[0]
+        answer += (f"- Dominant anomaly pattern: {defect} ({count} wafers, "
+                   f"{get_primary_domain(defect)} domain).\n")
+        causes = self._causes(defect)
+        if causes:
+            answer += f"- Likely causes: {causes}.\n"
+        answer += f"\nRecommended actions:\n{self._actions(defect)}"
+        return answer
+
+    def trend_analysis(self) -> str:
+        """
+        Answer trend queries from the per-simulation-date statistics.
+
+        Returns:
+            Recent per-date table followed by a recent vs. earlier comparison
+        """
+        date_stats = self.aggregator.get_date_statistics()
+        if not date_stats:
+            return "No simulation-date data available for trend analysis."
+        dates = sorted(date_stats)
+
+        answer = "Trend by Simulation Date (most recent last):\n\n"
+        for date in dates[-TREND_WINDOW_DATES:]:
+            stats = date_stats[date]
+            answer += (f"{date}: {stats['total_wafers']} wafers, {stats['pass_rate']:.2f}% pass rate, "
+                       f"avg defect {stats['avg_defect_percentage']:.2f}%, {stats['anomalies']} anomalies\n")
+
+        answer += "\nAnalysis:\n"
+        if len(dates) < 2:
+            return answer + f"- Only one simulation date ({dates[0]}): no trend can be computed yet.\n"
+
+        window = min(TREND_WINDOW_DATES, len(dates) // 2)
+        recent, earlier = dates[-window:], dates[:-window]
+        recent_rate = self._pass_rate(date_stats, recent)
+        earlier_rate = self._pass_rate(date_stats, earlier)
+        change = recent_rate - earlier_rate
+        direction = ("stable" if abs(change) < TREND_STABLE_POINTS
+                     else "improving" if change > 0 else "worsening")
+        answer += (f"- Pass rate is {direction}: {recent_rate:.2f}% over the last {len(recent)} date(s) "
+                   f"vs {earlier_rate:.2f}% over the previous {len(earlier)} ({change:+.2f} points).\n")
+
+        best = max(dates, key=lambda d: date_stats[d]["pass_rate"])
+        worst = min(dates, key=lambda d: date_stats[d]["pass_rate"])
+        answer += f"- Best date: {best} ({date_stats[best]['pass_rate']:.2f}% pass rate).\n"
+        answer += (f"- Worst date: {worst} ({date_stats[worst]['pass_rate']:.2f}% pass rate, "
+                   f"{date_stats[worst]['anomalies']} anomalies).\n")
+        if direction == "worsening":
+            answer += "- Review the machines and defect classes of the recent dates for the source of the drop.\n"
+        return answer
+
+    @staticmethod
+    def _pass_rate(date_stats: Dict, dates: List[str]) -> float:
+        """Wafer-weighted pass rate (%) over a set of dates."""
+        wafers = sum(date_stats[d]["total_wafers"] for d in dates)
+        passed = sum(date_stats[d]["pass_count"] for d in dates)
+        return passed / wafers * 100 if wafers else 0.0
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point for Testing
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    from Repository.Data_Aggregator import DataAggregator
+
+    aggregator = DataAggregator()
+    aggregator.load_results()
+    engine = LocalAnswerEngine(aggregator)
+    for answer in (engine.machine_performance, engine.defect_distribution,
+                   engine.anomaly_analysis, engine.trend_analysis):
+        print(answer())
+        print("-" * 70)
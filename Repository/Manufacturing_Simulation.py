@@ -17,7 +17,16 @@ from queue import Queue
 import logging
 
 # Import the defect prediction module
-from Repository.Defect_Prediction import WaferDefectPredictor, DefectCounter, main as predict_defect
+from Repository.Defect_Prediction import DefectCounter, main as predict_defect
+from Repository.Model_Registry import get_predictor
+from Repository.Performance_Monitor import StageLatencyRecorder, ThroughputCounter, CacheStats, ALL_MACHINES
+from Repository.Metrics_Server import MetricsServer, DEFAULT_METRICS_PORT
+from Repository.Results_Sink import ShardedResultsSink, manifest_path
+from Repository.Result_Stream import ResultStream, ResultCursor
+from Repository.Simulation_Logging import (
+    configure_logging, is_logging_configured, CONSOLE_WAFER_SAMPLE_RATE, WAFER_EVENT_ATTR
+)
+from Repository.Synthetic_Wafer_Generator import SyntheticWaferGenerator, is_synthetic_source
 
 # ------------------------------------------------------------------------------------------
 # Configuration
@@ -35,42 +44,83 @@ OUTPUT_DIR = BASE_DIR / "Manufacturing_Output"
 PROCESSED_IMAGES_DIR = OUTPUT_DIR / "processed_images"
 LOGS_DIR = OUTPUT_DIR / "logs"
 
-# Create output directories
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-PROCESSED_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-LOGS_DIR.mkdir(parents=True, exist_ok=True)
+# Interval between "Simulation running..." status log lines (seconds)
+STATUS_LOG_INTERVAL = 10
+
+# Maximum time to wait for in-flight wafers when the simulation stops (seconds)
+SHUTDOWN_DRAIN_TIMEOUT = 10
+
+# Wafer image sources: copies from the test dataset, or procedurally rendered wafer maps
+IMAGE_SOURCES = ("dataset", "synthetic")
+
+# Log files of this process (created by setup_logging(), not at import time)
+log_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+log_file = LOGS_DIR / f"manufacturing_{log_timestamp}.log"
+wafer_events_file = LOGS_DIR / f"wafer_events_{log_timestamp}.jsonl"
+
+
+def ensure_output_dirs(output_dir: Path = OUTPUT_DIR):
+    """Create the output directories (called when a controller is created, not on import)."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / PROCESSED_IMAGES_DIR.name).mkdir(parents=True, exist_ok=True)
+    (output_dir / LOGS_DIR.name).mkdir(parents=True, exist_ok=True)
+
+
+def setup_logging(console_sample_rate: int = CONSOLE_WAFER_SAMPLE_RATE, output_dir: Path = OUTPUT_DIR):
+    """
+    Configure asynchronous logging for the simulation.
+    
+    Machine threads only enqueue log records; a background listener writes the text log and
+    the structured per-wafer events file in batches and prints to the console.
+    
+    Args:
+        console_sample_rate: Show 1 out of every N per-wafer events on the console
+        output_dir: Output directory whose logs/ subdirectory receives the log files
+    """
+    ensure_output_dirs(output_dir)
+    logs_dir = output_dir / LOGS_DIR.name
+    configure_logging(logs_dir / log_file.name, logs_dir / wafer_events_file.name,
+                      console_sample_rate=console_sample_rate)
+
+
+def ensure_logging(output_dir: Path = OUTPUT_DIR):
+    """Configure simulation logging unless it already is (e.g. by setup_logging() or a worker node)."""
+    if not is_logging_configured():
+        setup_logging(output_dir=output_dir)
+
 
-# Setup logging
-log_file = LOGS_DIR / f"manufacturing_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(str(log_file)),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 # ------------------------------------------------------------------------------------------
 # Image Generator Class
 # ------------------------------------------------------------------------------------------
 class WaferImageGenerator:
-    """Generates wafer images by randomly copying from test dataset."""
+    """Generates wafer images by randomly copying from test dataset, or by rendering synthetic wafer maps."""
     
-    def __init__(self, test_dataset_path: str, output_dir: str):
+    def __init__(self, test_dataset_path: str, output_dir: str, image_source: str = "dataset"):
         """
         Initialize the image generator.
         
         Args:
             test_dataset_path: Path to test dataset directory
             output_dir: Directory to save generated images
+            image_source: "dataset" (copy test images) or "synthetic" (render wafer maps, for load tests)
         """
+        if image_source not in IMAGE_SOURCES:
+            raise ValueError(f"Unknown image source: {image_source} (expected one of {IMAGE_SOURCES})")
         self.test_dataset_path = test_dataset_path
         self.output_dir = output_dir
+        self.image_source = image_source
         os.makedirs(output_dir, exist_ok=True)
         
+        if image_source == "synthetic":
+            self.synthetic = SyntheticWaferGenerator()
+            self.normal_images, self.defect_images = [], []
+            logger.info("Rendering synthetic wafer maps (test dataset not used)")
+            return
+        
         # Get all available images from test dataset, organized by class
+        self.synthetic = None
         self.normal_images, self.defect_images = self._scan_test_dataset()
         logger.info(f"Found {len(self.normal_images)} Normal images and {len(self.defect_images)} defect images in test dataset")
     
@@ -92,42 +142,61 @@ class WaferImageGenerator:
                                 defect_images.append(image_path)
         return normal_images, defect_images
     
-    def generate_image(self, wafer_id: str, machine_type: str, normal_probability: float = 0.7) -> Optional[str]:
+    def select_source_image(self, normal_probability: float = 0.7,
+                            rng: Optional[random.Random] = None) -> Optional[str]:
         """
-        Generate a wafer image by copying a random image from test dataset.
+        Pick a random source image from the test dataset (or a synthetic wafer).
         Biased towards Normal class to increase PASS rate.
         
         Args:
-            wafer_id: Unique identifier for the wafer
-            machine_type: Type of machine generating the image (Mechanical, Electrical, Thermal)
             normal_probability: Probability of selecting a Normal image (default: 0.7 = 70%)
+            rng: Random generator to draw from (default: the global ``random`` module)
             
         Returns:
-            Path to the generated image, or None if generation failed
+            Path to the selected source image (or synthetic source identifier), or None if no images are available
         """
+        rng = rng or random
+        
+        if self.synthetic is not None:
+            return self.synthetic.select_source(normal_probability, rng)
+        
         # Check if we have images available
         if not self.normal_images and not self.defect_images:
             logger.error("No images available in test dataset")
             return None
         
         # Select image with bias towards Normal class
-        if random.random() < normal_probability:
+        if rng.random() < normal_probability:
             # Select from Normal images (70% chance)
             if self.normal_images:
-                source_image = random.choice(self.normal_images)
-            elif self.defect_images:
-                # Fallback to defect images if no Normal available
-                source_image = random.choice(self.defect_images)
-            else:
-                return None
-        else:
-            # Select from defect images (30% chance)
-            if self.defect_images:
-                source_image = random.choice(self.defect_images)
-            elif self.normal_images:
-                # Fallback to Normal images if no defect images available
-                source_image = random.choice(self.normal_images)
-            else:
+                return rng.choice(self.normal_images)
+            # Fallback to defect images if no Normal available
+            return rng.choice(self.defect_images)
+        
+        # Select from defect images (30% chance)
+        if self.defect_images:
+            return rng.choice(self.defect_images)
+        # Fallback to Normal images if no defect images available
+        return rng.choice(self.normal_images)
+    
+    def generate_image(self, wafer_id: str, machine_type: str, normal_probability: float = 0.7,
+                       rng: Optional[random.Random] = None, source_image: Optional[str] = None) -> Optional[str]:
+        """
+        Generate a wafer image by copying an image from test dataset.
+        
+        Args:
+            wafer_id: Unique identifier for the wafer
+            machine_type: Type of machine generating the image (Mechanical, Electrical, Thermal)
+            normal_probability: Probability of selecting a Normal image (default: 0.7 = 70%)
+            rng: Random generator used when the source image has to be selected
+            source_image: Explicit source image to copy or synthetic source to render (e.g. when replaying a workload)
+            
+        Returns:
+            Path to the generated image, or None if generation failed
+        """
+        if source_image is None:
+            source_image = self.select_source_image(normal_probability, rng)
+            if source_image is None:
                 return None
         
         # Create output filename
@@ -136,9 +205,24 @@ class WaferImageGenerator:
         output_path = os.path.join(self.output_dir, filename)
         
         try:
-            # Copy the image
-            shutil.copy2(source_image, output_path)
-            logger.info(f"Generated image: {output_path} (from {os.path.basename(source_image)})")
+            if is_synthetic_source(source_image):
+                if self.synthetic is None:
+                    self.synthetic = SyntheticWaferGenerator()  # Replaying a synthetic workload
+                if not self.synthetic.write(source_image, output_path):
+                    raise IOError(f"Could not write {output_path}")
+            else:
+                # Copy the image
+                shutil.copy2(source_image, output_path)
+            logger.info(
+                f"Generated image: {output_path} (from {os.path.basename(source_image)})",
+                extra={WAFER_EVENT_ATTR: {
+                    "event": "generated",
+                    "wafer_id": wafer_id,
+                    "machine_type": machine_type,
+                    "image_path": output_path,
+                    "source_image": os.path.basename(source_image)
+                }}
+            )
             return output_path
         except Exception as e:
             logger.error(f"Error generating image: {e}")
@@ -167,6 +251,23 @@ class ManufacturingMachine:
         self.wafer_counter = 0
         self.min_interval = 2  # Minimum seconds between wafer generation
         self.max_interval = 10  # Maximum seconds between wafer generation
+        self.rng = random.Random()  # Per-machine RNG (see seed())
+        
+    def seed(self, seed: Optional[int]):
+        """
+        Seed this machine's RNG.
+        
+        The seed is combined with the machine ID so that every machine draws an
+        independent, reproducible stream of wafer selections and intervals.
+        
+        Args:
+            seed: Base seed for the run, or None for a non-deterministic stream
+        """
+        self.rng = random.Random(None if seed is None else f"{seed}:{self.machine_id}")
+    
+    def next_interval(self) -> float:
+        """Draw the wait time (seconds) before this machine's next wafer."""
+        return self.rng.uniform(self.min_interval, self.max_interval)
         
     def start(self):
         """Start the machine."""
@@ -178,10 +279,13 @@ class ManufacturingMachine:
         self.is_running = False
         logger.info(f"{self.machine_type} Machine {self.machine_id} stopped")
     
-    def process_wafer(self) -> Optional[Dict]:
+    def process_wafer(self, source_image: Optional[str] = None) -> Optional[Dict]:
         """
         Process a wafer: generate image and return wafer information.
         
+        Args:
+            source_image: Explicit source image to use, or None to draw one with this machine's RNG
+        
         Returns:
             Dictionary with wafer information, or None if processing failed
         """
@@ -192,7 +296,9 @@ class ManufacturingMachine:
         wafer_id = f"{self.machine_type}_{self.machine_id}_W{self.wafer_counter:04d}"
         
         # Generate wafer image
-        image_path = self.image_generator.generate_image(wafer_id, self.machine_type)
+        image_path = self.image_generator.generate_image(
+            wafer_id, self.machine_type, rng=self.rng, source_image=source_image
+        )
         
         if image_path is None:
             return None
@@ -254,13 +360,201 @@ class ThermalMachine(ManufacturingMachine):
         self.min_interval = 5
         self.max_interval = 12
 
+# ------------------------------------------------------------------------------------------
+# Workload Recording and Replay
+# ------------------------------------------------------------------------------------------
+class WorkloadRecorder:
+    """Records the (machine, source image, virtual time) sequence of a simulation run."""
+    
+    def __init__(self, dataset_path: str, seed: Optional[int] = None):
+        """
+        Initialize the workload recorder.
+        
+        Args:
+            dataset_path: Test dataset directory (source images are stored relative to it)
+            seed: Seed of the recorded run, stored for reference
+        """
+        self.dataset_path = dataset_path
+        self.seed = seed
+        self.events = []
+        self._lock = threading.Lock()
+    
+    def record(self, machine_id: str, source_image: str, virtual_time: float):
+        """
+        Record one wafer admission.
+        
+        Args:
+            machine_id: Machine that processed the wafer
+            source_image: Source image the wafer was generated from
+            virtual_time: Seconds since simulation start at which the wafer was started
+        """
+        if not is_synthetic_source(source_image):
+            source_image = Path(os.path.relpath(source_image, self.dataset_path)).as_posix()
+        event = {
+            "machine_id": machine_id,
+            "source_image": source_image,
+            "virtual_time": round(virtual_time, 6)
+        }
+        with self._lock:
+            self.events.append(event)
+    
+    def save(self, file_path: str) -> Path:
+        """
+        Save the recorded workload to a JSON file.
+        
+        Args:
+            file_path: Destination file
+            
+        Returns:
+            Path to the saved workload file
+        """
+        with self._lock:
+            events = sorted(self.events, key=lambda e: (e["virtual_time"], e["machine_id"]))
+        
+        workload = {
+            "version": 1,
+            "seed": self.seed,
+            "recorded_at": datetime.now().isoformat(),
+            "events": events
+        }
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_path, 'w') as f:
+            json.dump(workload, f, indent=2)
+        logger.info(f"Recorded workload of {len(events)} wafers saved to: {file_path}")
+        return file_path
+
+
+class WorkloadTrace:
+    """A recorded workload that can be replayed wafer-for-wafer."""
+    
+    def __init__(self, events: List[Dict], dataset_path: str, seed: Optional[int] = None):
+        """
+        Initialize the workload trace.
+        
+        Args:
+            events: Recorded events (machine_id, source_image, virtual_time)
+            dataset_path: Test dataset directory the source images are relative to
+            seed: Seed of the recorded run
+        """
+        self.dataset_path = dataset_path
+        self.seed = seed
+        self.events = sorted(events, key=lambda e: (e["virtual_time"], e["machine_id"]))
+    
+    @classmethod
+    def load(cls, file_path: str, dataset_path: str) -> "WorkloadTrace":
+        """
+        Load a workload file written by WorkloadRecorder.save().
+        
+        Args:
+            file_path: Workload file to load
+            dataset_path: Test dataset directory the source images are relative to
+            
+        Returns:
+            WorkloadTrace instance
+        """
+        with open(file_path, 'r') as f:
+            workload = json.load(f)
+        return cls(workload.get("events", []), dataset_path, workload.get("seed"))
+    
+    @property
+    def machine_ids(self) -> List[str]:
+        """Machine IDs that appear in the trace."""
+        return sorted({e["machine_id"] for e in self.events})
+    
+    @property
+    def duration(self) -> float:
+        """Virtual time of the last recorded wafer (seconds)."""
+        return self.events[-1]["virtual_time"] if self.events else 0.0
+    
+    def events_for(self, machine_id: str) -> List[Dict]:
+        """
+        Get the events of one machine with absolute source image paths.
+        
+        Args:
+            machine_id: Machine to get events for
+            
+        Returns:
+            List of events ordered by virtual time
+        """
+        return [
+            {
+                **e,
+                "source_image": (e["source_image"] if is_synthetic_source(e["source_image"])
+                                 else os.path.join(self.dataset_path, *e["source_image"].split("/")))
+            }
+            for e in self.events if e["machine_id"] == machine_id
+        ]
+
+# ------------------------------------------------------------------------------------------
+# Admission Control
+# ------------------------------------------------------------------------------------------
+class WaferAdmission:
+    """
+    Admission control for the max_wafers limit.
+    
+    Machines reserve a wafer slot before generating a wafer, so in-flight wafers count
+    against the limit. The check and the increment happen under a small dedicated lock
+    (separate from the results lock), so concurrent machines cannot overshoot the limit.
+    """
+    
+    def __init__(self, max_wafers: Optional[int] = None):
+        """
+        Initialize admission control.
+        
+        Args:
+            max_wafers: Maximum number of wafers to admit (None for unlimited)
+        """
+        self.max_wafers = max_wafers
+        self.closed = False
+        self._admitted = 0  # Wafer slots currently held (in flight or completed)
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> bool:
+        """
+        Atomically reserve one wafer slot.
+        
+        Returns:
+            True if the wafer may be processed, False if the limit is reached or admission is closed
+        """
+        with self._lock:
+            if self.closed:
+                return False
+            if self.max_wafers is not None and self._admitted >= self.max_wafers:
+                return False
+            self._admitted += 1
+            return True
+    
+    def release(self):
+        """Give back a reserved slot (e.g. when wafer generation failed)."""
+        with self._lock:
+            self._admitted = max(self._admitted - 1, 0)
+    
+    def close(self):
+        """Stop admitting new wafers."""
+        self.closed = True
+    
+    @property
+    def admitted(self) -> int:
+        """Number of wafer slots currently held (in flight or completed)."""
+        return self._admitted
+    
+    @property
+    def remaining(self) -> Optional[int]:
+        """Remaining wafer capacity (None if unlimited)."""
+        if self.max_wafers is None:
+            return None
+        return 0 if self.closed else max(self.max_wafers - self.admitted, 0)
+
 # ------------------------------------------------------------------------------------------
 # Manufacturing Process Controller
 # ------------------------------------------------------------------------------------------
 class ManufacturingProcessController:
     """Controls the entire manufacturing process simulation."""
     
-    def __init__(self, num_mechanical: int = 2, num_electrical: int = 2, num_thermal: int = 1):
+    def __init__(self, num_mechanical: int = 2, num_electrical: int = 2, num_thermal: int = 1,
+                 seed: Optional[int] = None, image_source: str = "dataset",
+                 output_dir: Optional[Path] = None, predictor=None):
         """
         Initialize the manufacturing process controller.
         
@@ -268,15 +562,31 @@ class ManufacturingProcessController:
             num_mechanical: Number of mechanical machines
             num_electrical: Number of electrical machines
             num_thermal: Number of thermal machines
+            seed: Seed for the per-machine RNGs (None for a non-deterministic run)
+            image_source: "dataset" (copy test images) or "synthetic" (render wafer maps)
+            output_dir: Directory for results, images and logs (None for Manufacturing_Output)
+            predictor: Defect predictor to use (None for the shared instance of MODEL_PATH)
         """
+        self.output_dir = Path(output_dir) if output_dir is not None else OUTPUT_DIR
+        ensure_output_dirs(self.output_dir)
+        ensure_logging(self.output_dir)
+        
         # Initialize image generator
-        self.image_generator = WaferImageGenerator(str(TEST_DATASET_PATH), str(PROCESSED_IMAGES_DIR))
+        self.image_generator = WaferImageGenerator(str(TEST_DATASET_PATH),
+                                                   str(self.output_dir / PROCESSED_IMAGES_DIR.name), image_source)
+        
+        # Live metrics: throughput, in-flight wafers and cache hit rates
+        self.throughput = ThroughputCounter()
+        self.cache_stats = CacheStats()
         
-        # Initialize defect predictor and counter
+        # Initialize defect predictor (shared, warm instance from the model registry) and counter
         try:
-            logger.info(f"Initializing defect predictor with model: {MODEL_PATH}")
-            logger.info(f"Model file exists: {MODEL_PATH.exists()}")
-            self.predictor = WaferDefectPredictor(str(MODEL_PATH))
+            if predictor is not None:
+                self.predictor = predictor
+            else:
+                logger.info(f"Initializing defect predictor with model: {MODEL_PATH}")
+                logger.info(f"Model file exists: {MODEL_PATH.exists()}")
+                self.predictor = get_predictor(str(MODEL_PATH), cache_stats=self.cache_stats)
             self.defect_counter = DefectCounter()
             logger.info("Defect prediction system initialized successfully")
         except Exception as e:
@@ -305,13 +615,64 @@ class ManufacturingProcessController:
         logger.info(f"Initialized {len(self.machines)} machines: "
                    f"{num_mechanical} Mechanical, {num_electrical} Electrical, {num_thermal} Thermal")
         
+        # Seed per-machine RNGs for reproducible workloads
+        self.seed = seed
+        for machine in self.machines:
+            machine.seed(seed)
+        self.workload_recorder = None
+        self.workload_trace = None
+        
         # Process queue and results
         self.process_queue = Queue()
         self.results = []
         self.results_lock = threading.Lock()
         self.is_running = False
         self.simulation_date = None  # Will be set when simulation starts
-        self.results_file = OUTPUT_DIR / f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if manifest_path(self.output_dir, self.run_id).exists():
+            self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')  # Don't append to another run's shards
+        self.results_sink = ShardedResultsSink(self.output_dir, self.run_id)  # Rotating results shards + manifest
+        self.latency_file = self.output_dir / f"latency_{self.run_id}.json"
+        self.result_stream = ResultStream()  # In-process subscription to saved results (see subscribe())
+        
+        # Per-stage latency histograms (per machine type)
+        self.latency = StageLatencyRecorder()
+        
+        self.in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self.start_time = None
+        self.metrics_server = None
+        
+        # Admission control for max_wafers (replaced at the start of each run)
+        self.admission = WaferAdmission()
+        
+        # Graceful shutdown state: once sealed, late results are dropped instead of saved
+        self._results_sealed = False
+        self.dropped_wafers = 0
+        self.shutdown_report = None
+    
+    @property
+    def results_file(self) -> Path:
+        """Results shard currently being written."""
+        return self.results_sink.current_path
+    
+    @property
+    def manifest_file(self) -> Path:
+        """Manifest describing all results shards of this run."""
+        return self.results_sink.manifest_file
+    
+    def subscribe(self, from_offset: Optional[int] = 0) -> ResultCursor:
+        """
+        Subscribe to results as they are saved.
+        
+        Args:
+            from_offset: Offset to start from (0 replays every retained result of this controller,
+                         None delivers only results saved from now on)
+            
+        Returns:
+            ResultCursor; call poll() to get new results
+        """
+        return self.result_stream.subscribe(from_offset)
     
     def start_all_machines(self):
         """Start all manufacturing machines."""
@@ -327,16 +688,20 @@ class ManufacturingProcessController:
         self.is_running = False
         logger.info("All machines stopped")
     
-    def process_wafer_with_analysis(self, wafer_info: Dict) -> Dict:
+    def process_wafer_with_analysis(self, wafer_info: Dict, timings: Optional[Dict] = None) -> Dict:
         """
         Process a wafer and perform defect analysis.
         
         Args:
             wafer_info: Dictionary containing wafer information
+            timings: Optional dictionary that receives the decode/predict/count_defects/assemble
+                     stage durations in seconds
             
         Returns:
             Dictionary with complete analysis results
         """
+        timings = {} if timings is None else timings
+        timings.setdefault("decode", 0.0)
         image_path = wafer_info.get("image_path")
         if not image_path or not os.path.exists(image_path):
             logger.error(f"Image not found: {image_path}")
@@ -349,7 +714,12 @@ class ManufacturingProcessController:
         if self.predictor:
             try:
                 logger.debug(f"Running prediction on: {image_path}")
-                prediction_result = self.predictor.predict(image_path)
+                stage_timings = {}
+                stage_start = time.perf_counter()
+                prediction_result = self.predictor.predict(image_path, timings=stage_timings)
+                decode_time = stage_timings.get("decode", 0.0)
+                timings["predict"] = time.perf_counter() - stage_start - decode_time
+                timings["decode"] += decode_time
                 logger.debug(f"Prediction result: {prediction_result}")
                 if not prediction_result or "Defect Class" not in prediction_result:
                     logger.warning(f"Prediction returned invalid result: {prediction_result}")
@@ -364,7 +734,12 @@ class ManufacturingProcessController:
         if self.defect_counter:
             try:
                 logger.debug(f"Running defect counting on: {image_path}")
-                defect_count_result = self.defect_counter.count_defects(image_path)
+                stage_timings = {}
+                stage_start = time.perf_counter()
+                defect_count_result = self.defect_counter.count_defects(image_path, timings=stage_timings)
+                decode_time = stage_timings.get("decode", 0.0)
+                timings["count_defects"] = time.perf_counter() - stage_start - decode_time
+                timings["decode"] += decode_time
                 logger.debug(f"Defect count result: {defect_count_result}")
                 if not defect_count_result or "defect_percentage" not in defect_count_result:
                     logger.warning(f"Defect counting returned invalid result: {defect_count_result}")
@@ -377,6 +752,7 @@ class ManufacturingProcessController:
             defect_count_result = {"defect_percentage": 0.0, "error": "Defect counter not initialized"}
         
         # Combine results
+        assemble_start = time.perf_counter()
         analysis_result = {
             **wafer_info,
             "prediction": prediction_result,
@@ -404,32 +780,175 @@ class ManufacturingProcessController:
         analysis_result["defect_threshold"] = defect_threshold
         analysis_result["defect_percentage"] = defect_percentage
         analysis_result["threshold_exceeded"] = defect_percentage > defect_threshold
+        timings["assemble"] = time.perf_counter() - assemble_start
         
         return analysis_result
     
-    def save_result(self, result: Dict):
-        """Save analysis result to file."""
+    def save_result(self, result: Dict, timings: Optional[Dict] = None):
+        """
+        Save analysis result to file.
+        
+        Args:
+            result: Analysis result to save
+            timings: Optional dictionary that receives the lock_wait/save_result durations in seconds
+        """
+        lock_start = time.perf_counter()
         with self.results_lock:
+            save_start = time.perf_counter()
+            if self._results_sealed:
+                # The run was shut down and the sink closed while this wafer was in flight
+                self.dropped_wafers += 1
+                logger.warning(f"Dropped {result.get('wafer_id')}: finished after the shutdown drain deadline")
+                return
+            
             # Add simulation date to result if available
             if self.simulation_date:
                 result["simulation_date"] = self.simulation_date
             self.results.append(result)
             
-            # Save to JSON file (append mode)
+            # Append to the current results shard (rotates by records/bytes/time)
             try:
-                with open(str(self.results_file), 'w') as f:
-                    json.dump(self.results, f, indent=2)
+                self.results_sink.append(result)
             except Exception as e:
                 logger.error(f"Error saving result: {e}")
+            
+            # Deliver to subscribers (offsets follow the shard write order)
+            self.result_stream.publish(result)
+        
+        if timings is not None:
+            timings["lock_wait"] = save_start - lock_start
+            timings["save_result"] = time.perf_counter() - save_start
     
-    def run_simulation(self, duration_seconds: int = 60, max_wafers: Optional[int] = None, simulation_date: Optional[str] = None):
+    def _run_wafer(self, machine: ManufacturingMachine, virtual_time: float,
+                   source_image: Optional[str] = None) -> Optional[Dict]:
         """
-        Run the manufacturing simulation.
+        Generate, analyze and save a single wafer on a machine.
         
         Args:
-            duration_seconds: How long to run the simulation (in seconds)
-            max_wafers: Maximum number of wafers to process (None for unlimited)
-            simulation_date: Date string (YYYY-MM-DD) for this simulation run, or None to use today's date
+            machine: Machine processing the wafer
+            virtual_time: Seconds since simulation start at which the wafer was started
+            source_image: Source image to use, or None to draw one with the machine's RNG
+            
+        Returns:
+            Analysis result, or None if the wafer could not be generated
+        """
+        if source_image is None:
+            source_image = machine.image_generator.select_source_image(rng=machine.rng)
+            if source_image is None:
+                return None
+        
+        with self._in_flight_lock:
+            self.in_flight += 1
+        try:
+            # Process a wafer
+            wafer_start = time.perf_counter()
+            wafer_info = machine.process_wafer(source_image=source_image)
+            if not wafer_info:
+                return None
+            timings = {"generate": time.perf_counter() - wafer_start}
+            
+            if self.workload_recorder:
+                self.workload_recorder.record(machine.machine_id, source_image, virtual_time)
+            
+            # Analyze the wafer
+            analysis_result = self.process_wafer_with_analysis(wafer_info, timings)
+            self.save_result(analysis_result, timings)
+            timings["total"] = time.perf_counter() - wafer_start
+            self.latency.record_many(machine.machine_type, timings)
+            self.throughput.record(machine.machine_type)
+            self._on_wafer_processed(machine, analysis_result, timings)
+        finally:
+            with self._in_flight_lock:
+                self.in_flight -= 1
+        
+        # Log the result
+        defect_class = analysis_result['prediction'].get('Defect Class', 'N/A')
+        defect_percentage = analysis_result['defect_count'].get('defect_percentage', 0)
+        logger.info(
+            f"Processed {wafer_info['wafer_id']}: "
+            f"Class={defect_class}, "
+            f"Defect%={defect_percentage:.2f}%, "
+            f"Status={analysis_result['quality_status']}",
+            extra={WAFER_EVENT_ATTR: {
+                "event": "processed",
+                "wafer_id": wafer_info['wafer_id'],
+                "machine_id": machine.machine_id,
+                "machine_type": machine.machine_type,
+                "defect_class": defect_class,
+                "defect_percentage": defect_percentage,
+                "quality_status": analysis_result['quality_status'],
+                "stage_ms": {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+            }}
+        )
+        return analysis_result
+    
+    def _on_wafer_processed(self, machine: ManufacturingMachine, result: Dict, timings: Dict[str, float]):
+        """
+        Hook called after a wafer was analyzed, saved and timed (no-op by default).
+        
+        Args:
+            machine: Machine that processed the wafer
+            result: Saved analysis result
+            timings: Stage durations in seconds, including the total
+        """
+        pass
+    
+    def _admit_and_run(self, machine: ManufacturingMachine, virtual_time: float,
+                       source_image: Optional[str] = None) -> bool:
+        """
+        Reserve a wafer slot and process the wafer.
+        
+        Returns:
+            False if admission was refused (max_wafers reached or admission closed)
+        """
+        if not self.admission.reserve():
+            return False
+        result = None
+        try:
+            result = self._run_wafer(machine, virtual_time, source_image)
+        finally:
+            if result is None:
+                self.admission.release()  # Nothing was saved, give the slot back
+        return True
+    
+    def _sleep_until(self, deadline: float):
+        """Sleep until the given time.time() deadline, waking early if the simulation stops."""
+        while self.is_running:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.5))
+    
+    def _machine_worker(self, machine: ManufacturingMachine, start_time: float, end_time: float):
+        """Worker function for each machine thread."""
+        if self.workload_trace is not None:
+            self._replay_worker(machine, start_time, end_time)
+            return
+        
+        while self.is_running and time.time() < end_time:
+            # Reserve a slot under the max_wafers limit
+            if not self._admit_and_run(machine, time.time() - start_time):
+                break
+            
+            # Wait random interval before next wafer (wakes early on stop)
+            self._sleep_until(time.time() + machine.next_interval())
+    
+    def _replay_worker(self, machine: ManufacturingMachine, start_time: float, end_time: float):
+        """Worker function replaying the recorded workload of one machine."""
+        for event in self.workload_trace.events_for(machine.machine_id):
+            self._sleep_until(start_time + event["virtual_time"])
+            if not self.is_running or time.time() >= end_time:
+                break
+            if not self._admit_and_run(machine, event["virtual_time"], source_image=event["source_image"]):
+                break
+    
+    def _begin_run(self, duration_seconds: int, max_wafers: Optional[int], simulation_date: Optional[str],
+                   record_workload: Optional[str], replay_workload: Optional[str]) -> float:
+        """
+        Prepare a simulation run and start the machines (shared by all simulation engines).
+        
+        Returns:
+            Start time of the run (time.time())
         """
         # Set simulation date
         if simulation_date is None:
@@ -437,70 +956,213 @@ class ManufacturingProcessController:
         else:
             self.simulation_date = simulation_date
         
+        # Workload recording / replay
+        self.workload_recorder = WorkloadRecorder(str(TEST_DATASET_PATH), self.seed) if record_workload else None
+        self.workload_trace = None
+        if replay_workload:
+            self.workload_trace = WorkloadTrace.load(replay_workload, str(TEST_DATASET_PATH))
+            known_ids = {m.machine_id for m in self.machines}
+            missing_ids = [m for m in self.workload_trace.machine_ids if m not in known_ids]
+            if missing_ids:
+                logger.warning(f"Workload references machines not configured in this run: {missing_ids}")
+            if self.workload_trace.duration > duration_seconds:
+                logger.warning(f"Workload spans {self.workload_trace.duration:.1f}s but simulation duration is "
+                               f"{duration_seconds}s; the replay will be truncated")
+            logger.info(f"Replaying workload of {len(self.workload_trace.events)} wafers from: {replay_workload}")
+        
         logger.info(f"Starting manufacturing simulation for {duration_seconds} seconds (Date: {self.simulation_date})")
+        self.admission = WaferAdmission(max_wafers)
+        self._results_sealed = False
+        self.dropped_wafers = 0
+        self.shutdown_report = None
         self.start_all_machines()
         
-        start_time = time.time()
+        self.start_time = time.time()
+        self.throughput.reset()
+        return self.start_time
+    
+    def _log_status(self, start_time: float):
+        """Log a "Simulation running..." status line."""
+        elapsed = time.time() - start_time
+        total_processed = sum(m.processed_wafers for m in self.machines)
+        rate = self.throughput.snapshot()[ALL_MACHINES]["recent_wafers_per_second"]
+        logger.info(f"Simulation running... Elapsed: {elapsed:.0f}s, Total wafers processed: {total_processed}, "
+                    f"Throughput: {rate:.2f} wafers/s, In flight: {self.in_flight}")
+    
+    def stop(self):
+        """
+        Begin a graceful stop without blocking: refuse new wafers and stop the machines.
+        
+        Wafers already in flight keep being analyzed; run_simulation() (or shutdown())
+        drains them and seals the results.
+        """
+        self.admission.close()
+        if self.is_running:
+            self.stop_all_machines()
+    
+    def shutdown(self, drain_timeout: float = SHUTDOWN_DRAIN_TIMEOUT) -> Dict:
+        """
+        Stop the simulation gracefully.
+        
+        Stops admission and the machines, waits up to drain_timeout seconds for in-flight
+        wafers to be analyzed and saved, then closes the results sink (durably). Wafers still
+        in flight after the deadline are dropped and reported.
+        
+        Args:
+            drain_timeout: Maximum seconds to wait for in-flight wafers
+            
+        Returns:
+            Shutdown report with in_flight_at_stop, drained, dropped and drain_seconds
+        """
+        if self.shutdown_report is not None:
+            return self.shutdown_report
+        
+        self.stop()
+        drain_start = time.monotonic()
+        in_flight_at_stop = self.in_flight
+        while self.in_flight > 0 and time.monotonic() - drain_start < drain_timeout:
+            time.sleep(0.05)
+        
+        # Seal the results and close the open shard (finalizes the manifest)
+        with self.results_lock:
+            dropped = self.in_flight
+            self._results_sealed = True
+            try:
+                self.results_sink.close()
+            except Exception as e:
+                logger.error(f"Error closing results shard: {e}")
+        
+        self.shutdown_report = {
+            "in_flight_at_stop": in_flight_at_stop,
+            "drained": in_flight_at_stop - dropped,
+            "dropped": dropped,
+            "drain_seconds": round(time.monotonic() - drain_start, 3)
+        }
+        if dropped:
+            logger.warning(f"Shutdown drain deadline ({drain_timeout}s) reached: {dropped} in-flight wafer(s) dropped")
+        logger.info(f"Shutdown complete: drained {self.shutdown_report['drained']} in-flight wafer(s) "
+                    f"in {self.shutdown_report['drain_seconds']}s")
+        return self.shutdown_report
+    
+    def _finish_run(self, record_workload: Optional[str]):
+        """Finalize the results shards, workload and latency files and print the summary."""
+        # Drain in-flight wafers and close the open results shard (no-op if already shut down)
+        self.shutdown()
+        
+        total_processed = sum(m.processed_wafers for m in self.machines)
+        logger.info(f"Simulation completed. Total wafers processed: {total_processed}")
+        logger.info(f"Results saved to {len(self.results_sink.shards)} shard(s), manifest: {self.manifest_file}")
+        
+        if self.workload_recorder:
+            self.workload_recorder.save(record_workload)
+        
+        # Dump per-stage latency histograms
+        try:
+            self.latency.save_json(self.latency_file)
+            logger.info(f"Stage latencies saved to: {self.latency_file}")
+        except Exception as e:
+            logger.error(f"Error saving stage latencies: {e}")
+        
+        # Print summary
+        self.print_summary()
+    
+    def run_simulation(self, duration_seconds: int = 60, max_wafers: Optional[int] = None, simulation_date: Optional[str] = None,
+                       record_workload: Optional[str] = None, replay_workload: Optional[str] = None):
+        """
+        Run the manufacturing simulation.
+        
+        Args:
+            duration_seconds: How long to run the simulation (in seconds)
+            max_wafers: Maximum number of wafers to process (None for unlimited)
+            simulation_date: Date string (YYYY-MM-DD) for this simulation run, or None to use today's date
+            record_workload: File to record the (machine, source image, virtual time) sequence to
+            replay_workload: Workload file to replay instead of drawing random wafers
+        """
+        start_time = self._begin_run(duration_seconds, max_wafers, simulation_date, record_workload, replay_workload)
         end_time = start_time + duration_seconds
         
         # Machine threads for parallel processing
         machine_threads = []
         
-        def machine_worker(machine: ManufacturingMachine):
-            """Worker function for each machine thread."""
-            while self.is_running and time.time() < end_time:
-                # Check max_wafers limit
-                with self.results_lock:
-                    if max_wafers and len(self.results) >= max_wafers:
-                        break
-                
-                # Process a wafer
-                wafer_info = machine.process_wafer()
-                if wafer_info:
-                    # Analyze the wafer
-                    analysis_result = self.process_wafer_with_analysis(wafer_info)
-                    self.save_result(analysis_result)
-                    
-                    # Log the result
-                    logger.info(f"Processed {wafer_info['wafer_id']}: "
-                              f"Class={analysis_result['prediction'].get('Defect Class', 'N/A')}, "
-                              f"Defect%={analysis_result['defect_count'].get('defect_percentage', 0):.2f}%, "
-                              f"Status={analysis_result['quality_status']}")
-                
-                # Wait random interval before next wafer
-                wait_time = random.uniform(machine.min_interval, machine.max_interval)
-                time.sleep(wait_time)
-        
         # Start machine threads
         for machine in self.machines:
-            thread = threading.Thread(target=machine_worker, args=(machine,), daemon=True)
+            thread = threading.Thread(
+                target=self._machine_worker,
+                args=(machine, start_time, end_time),
+                daemon=True
+            )
             thread.start()
             machine_threads.append(thread)
         
         # Wait for simulation to complete
+        next_status_time = start_time + STATUS_LOG_INTERVAL
         try:
             while time.time() < end_time:
-                time.sleep(1)
-                elapsed = time.time() - start_time
-                if elapsed % 10 == 0:  # Log status every 10 seconds
-                    total_processed = sum(m.processed_wafers for m in self.machines)
-                    logger.info(f"Simulation running... Elapsed: {elapsed:.0f}s, Total wafers processed: {total_processed}")
+                time.sleep(0.5)
+                if self.admission.closed:
+                    break  # stop() was called; shutdown() drains the in-flight wafers
+                if not any(thread.is_alive() for thread in machine_threads):
+                    break  # All machines finished early (max_wafers reached or replay done)
+                if time.time() >= next_status_time:  # Log status every STATUS_LOG_INTERVAL seconds
+                    next_status_time += STATUS_LOG_INTERVAL
+                    self._log_status(start_time)
         except KeyboardInterrupt:
             logger.info("Simulation interrupted by user")
         
-        # Stop all machines
-        self.stop_all_machines()
+        # Stop admission and the machines, drain in-flight wafers and seal the results
+        self.shutdown()
         
-        # Wait for threads to finish
+        # Machine threads exit as soon as their current wafer is done
         for thread in machine_threads:
-            thread.join(timeout=5)
+            thread.join(timeout=1)
         
-        total_processed = sum(m.processed_wafers for m in self.machines)
-        logger.info(f"Simulation completed. Total wafers processed: {total_processed}")
-        logger.info(f"Results saved to: {self.results_file}")
+        self._finish_run(record_workload)
+    
+    def get_metrics(self, include_histograms: bool = False) -> Dict:
+        """
+        Get live simulation metrics without reading any result files.
         
-        # Print summary
-        self.print_summary()
+        Args:
+            include_histograms: Also return the raw LatencyHistogram objects (used by the metrics endpoint)
+            
+        Returns:
+            Dictionary with throughput, queue depth, stage latencies and cache hit rates
+        """
+        metrics = {
+            "is_running": self.is_running,
+            "simulation_date": self.simulation_date,
+            "uptime_seconds": round(time.time() - self.start_time, 3) if self.start_time else 0.0,
+            "machines_running": sum(1 for m in self.machines if m.is_running),
+            "queue_depth": self.in_flight,
+            "remaining_capacity": self.admission.remaining,
+            "dropped_wafers": self.dropped_wafers,
+            "throughput": self.throughput.snapshot(),
+            "latency": self.latency.snapshot(),
+            "caches": self.cache_stats.snapshot()
+        }
+        if include_histograms:
+            metrics["histograms"] = self.latency.histograms()
+        return metrics
+    
+    def start_metrics_server(self, port: int = DEFAULT_METRICS_PORT) -> MetricsServer:
+        """
+        Serve get_metrics() as a Prometheus text endpoint on localhost.
+        
+        Args:
+            port: Port to listen on (0 picks a free port)
+            
+        Returns:
+            The running MetricsServer (its url attribute gives the endpoint)
+        """
+        if self.metrics_server is None:
+            self.metrics_server = MetricsServer(self.get_metrics, port=port).start()
+        return self.metrics_server
+    
+    def stop_metrics_server(self):
+        """Stop the metrics endpoint if it is running."""
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
     
     def print_summary(self):
         """Print summary statistics of the simulation."""
@@ -535,8 +1197,17 @@ class ManufacturingProcessController:
         print("\nDefect Class Distribution:")
         for defect_class, count in sorted(defect_class_counts.items(), key=lambda x: x[1], reverse=True):
             print(f"  {defect_class}: {count}")
+        print("\nStage Latency by Machine Type:")
+        print(self.latency.format_table())
         print("="*70)
-        print(f"\nDetailed results saved to: {self.results_file}")
+        print(f"\nDetailed results saved to {len(self.results_sink.shards)} shard(s):")
+        for shard_file in self.results_sink.list_files():
+            print(f"  {shard_file}")
+        print(f"Results manifest: {self.manifest_file}")
+        print(f"Stage latencies saved to: {self.latency_file}")
+        if self.shutdown_report:
+            print(f"Shutdown: drained {self.shutdown_report['drained']} in-flight wafer(s), "
+                  f"dropped {self.shutdown_report['dropped']}")
 
 # ------------------------------------------------------------------------------------------
 # Main Entry Point
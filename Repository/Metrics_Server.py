@@ -0,0 +1,200 @@
+"""
+Metrics Server for the Manufacturing Simulation
+Serves live controller metrics as Prometheus text (and JSON) over HTTP on localhost
+"""
+
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+from Repository.Performance_Monitor import LatencyHistogram, HISTOGRAM_BUCKETS_PER_DOUBLING
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9108
+METRICS_PREFIX = "wafer_sim"
+
+
+# ------------------------------------------------------------------------------------------
+# Prometheus Text Rendering
+# ------------------------------------------------------------------------------------------
+def _labels(**labels) -> str:
+    """Format a Prometheus label set."""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _render_histogram(lines: List[str], name: str, histogram: LatencyHistogram, **labels):
+    """Append a histogram in Prometheus exposition format (one bucket per doubling)."""
+    cumulative = 0
+    for i, bound in enumerate(histogram.bucket_bounds):
+        cumulative += histogram.buckets[i]
+        if (i + 1) % HISTOGRAM_BUCKETS_PER_DOUBLING == 0:
+            lines.append(f"{name}_bucket{_labels(**labels, le=f'{bound:.6g}')} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+def render_prometheus(metrics: Dict) -> str:
+    """
+    Render controller metrics in Prometheus text exposition format.
+
+    Args:
+        metrics: Metrics dictionary from ManufacturingProcessController.get_metrics(include_histograms=True)
+
+    Returns:
+        Prometheus text format string
+    """
+    p = METRICS_PREFIX
+    lines = []
+
+    lines.append(f"# HELP {p}_running Whether the simulation is running (1) or stopped (0).")
+    lines.append(f"# TYPE {p}_running gauge")
+    lines.append(f"{p}_running {1 if metrics.get('is_running') else 0}")
+
+    lines.append(f"# HELP {p}_uptime_seconds Seconds since the simulation started.")
+    lines.append(f"# TYPE {p}_uptime_seconds gauge")
+    lines.append(f"{p}_uptime_seconds {metrics.get('uptime_seconds', 0):.3f}")
+
+    throughput = metrics.get("throughput", {})
+    lines.append(f"# HELP {p}_wafers_total Wafers analyzed and saved.")
+    lines.append(f"# TYPE {p}_wafers_total counter")
+    for machine_type, stats in throughput.items():
+        lines.append(f"{p}_wafers_total{_labels(machine_type=machine_type)} {stats['total']}")
+    lines.append(f"# HELP {p}_wafers_per_second Average throughput since the simulation started.")
+    lines.append(f"# TYPE {p}_wafers_per_second gauge")
+    for machine_type, stats in throughput.items():
+        lines.append(f"{p}_wafers_per_second{_labels(machine_type=machine_type)} {stats['wafers_per_second']}")
+    lines.append(f"# HELP {p}_recent_wafers_per_second Throughput over the recent sliding window.")
+    lines.append(f"# TYPE {p}_recent_wafers_per_second gauge")
+    for machine_type, stats in throughput.items():
+        lines.append(f"{p}_recent_wafers_per_second{_labels(machine_type=machine_type)} {stats['recent_wafers_per_second']}")
+
+    lines.append(f"# HELP {p}_queue_depth Wafers generated but not yet saved (in flight).")
+    lines.append(f"# TYPE {p}_queue_depth gauge")
+    lines.append(f"{p}_queue_depth {metrics.get('queue_depth', 0)}")
+
+    if metrics.get("remaining_capacity") is not None:
+        lines.append(f"# HELP {p}_remaining_capacity Wafer slots left under max_wafers.")
+        lines.append(f"# TYPE {p}_remaining_capacity gauge")
+        lines.append(f"{p}_remaining_capacity {metrics['remaining_capacity']}")
+
+    lines.append(f"# HELP {p}_machines_running Machines currently running.")
+    lines.append(f"# TYPE {p}_machines_running gauge")
+    lines.append(f"{p}_machines_running {metrics.get('machines_running', 0)}")
+
+    histograms = metrics.get("histograms", {})
+    lines.append(f"# HELP {p}_stage_latency_seconds Per-wafer pipeline stage latency.")
+    lines.append(f"# TYPE {p}_stage_latency_seconds histogram")
+    for machine_type, stages in histograms.items():
+        for stage, histogram in stages.items():
+            _render_histogram(lines, f"{p}_stage_latency_seconds", histogram,
+                              machine_type=machine_type, stage=stage)
+
+    caches = metrics.get("caches", {})
+    lines.append(f"# HELP {p}_cache_requests_total Cache lookups by result.")
+    lines.append(f"# TYPE {p}_cache_requests_total counter")
+    for cache, stats in caches.items():
+        lines.append(f"{p}_cache_requests_total{_labels(cache=cache, result='hit')} {stats['hits']}")
+        lines.append(f"{p}_cache_requests_total{_labels(cache=cache, result='miss')} {stats['misses']}")
+    lines.append(f"# HELP {p}_cache_hit_ratio Cache hit ratio.")
+    lines.append(f"# TYPE {p}_cache_hit_ratio gauge")
+    for cache, stats in caches.items():
+        lines.append(f"{p}_cache_hit_ratio{_labels(cache=cache)} {stats['hit_rate']}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------------------------------------------
+# HTTP Server
+# ------------------------------------------------------------------------------------------
+class MetricsServer:
+    """Background HTTP server exposing /metrics (Prometheus text) and /metrics.json."""
+
+    def __init__(self, metrics_provider: Callable[..., Dict],
+                 host: str = DEFAULT_METRICS_HOST, port: int = DEFAULT_METRICS_PORT):
+        """
+        Initialize the metrics server.
+
+        Args:
+            metrics_provider: Callable returning the metrics dictionary; called with include_histograms=True
+            host: Interface to bind (localhost by default)
+            port: Port to bind (0 picks a free port)
+        """
+        self.metrics_provider = metrics_provider
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def _make_handler(self):
+        """Create the request handler class bound to this server."""
+        provider = self.metrics_provider
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                try:
+                    if path == "/metrics":
+                        body = render_prometheus(provider(include_histograms=True)).encode("utf-8")
+                        content_type = "text/plain; version=0.0.4; charset=utf-8"
+                    elif path == "/metrics.json":
+                        body = json.dumps(provider(), indent=2).encode("utf-8")
+                        content_type = "application/json"
+                    else:
+                        self.send_error(404)
+                        return
+                except Exception as e:
+                    logger.error(f"Error rendering metrics: {e}", exc_info=True)
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics request: " + format % args)
+
+        return MetricsHandler
+
+    @property
+    def url(self) -> str:
+        """URL of the Prometheus endpoint."""
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        """Start serving in a daemon thread."""
+        if self._server is not None:
+            return self
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics endpoint serving at {self.url}")
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+        self._server = None
+        self._thread = None
+        logger.info("Metrics endpoint stopped")
@@ -0,0 +1,341 @@
+"""
+Mock LLM Server
+Local OpenAI-compatible stand-in (POST /v1/chat/completions, GET /v1/models) with configurable
+latency, token rate, streaming and error injection, so the agent, query processor and report
+generator can be load-tested offline and deterministically.
+
+Usage:
+    python -m Repository.Mock_LLM_Server --port 8808 --latency 0.5 --tokens-per-second 50
+    OPENAI_BASE_URL=http://127.0.0.1:8808/v1 streamlit run WELCOME.py
+The mock accepts any API key (the agent still requires the 'sk-' prefix).
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+DEFAULT_MOCK_HOST = "127.0.0.1"
+DEFAULT_MOCK_PORT = 8808
+DEFAULT_LATENCY_SECONDS = 0.3  # Time to first token
+DEFAULT_TOKENS_PER_SECOND = 50.0  # Generation speed after the first token (None: instant)
+DEFAULT_RESPONSE_TOKENS = 200  # Response length (capped by the request's max_tokens)
+DEFAULT_ERROR_STATUS = 429
+DEFAULT_RETRY_AFTER_SECONDS = 1
+
+MOCK_MODEL = "mock-llm"
+
+# Vocabulary the filler text is drawn from
+FILLER_WORDS = ["wafer", "defect", "yield", "thermal", "mechanical", "electrical", "stress", "edge",
+                "center", "scratch", "machine", "process", "anneal", "probe", "pattern", "rate"]
+
+ERROR_TYPES = {
+    429: ("rate_limit_error", "rate_limit_exceeded", "Rate limit reached for requests (mock)"),
+    500: ("server_error", None, "The server had an error while processing your request (mock)"),
+    503: ("server_error", None, "The engine is currently overloaded, please try again later (mock)"),
+}
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (about 4 characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def mock_response_tokens(messages: List[Dict], length: int) -> List[str]:
+    """
+    Build a deterministic mock response: the same messages always give the same text.
+
+    Args:
+        messages: Chat messages of the request
+        length: Number of tokens (words) to return
+
+    Returns:
+        List of tokens, each ending with its separator
+    """
+    prompt = messages[-1].get("content", "") if messages else ""
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+    rng = random.Random(digest)
+    head = f"Mock analysis {digest[:8]} of: {' '.join(prompt.split()[:12])}".split()
+    words = (head + [rng.choice(FILLER_WORDS) for _ in range(length)])[:length]
+    return [word + " " for word in words[:-1]] + words[-1:]
+
+
+# ------------------------------------------------------------------------------------------
+# HTTP Server
+# ------------------------------------------------------------------------------------------
+class MockLLMServer:
+    """
+    Background HTTP server emulating the OpenAI chat-completions API.
+
+    Settings can be changed while it runs (configure()). Responses are deterministic for a
+    given request; injected errors are drawn from a seeded RNG, so a load test replays the same
+    error sequence for the same request order. Connections are kept alive (HTTP/1.1), like the
+    real API, so client-side connection reuse is measured too.
+    """
+
+    def __init__(self, host: str = DEFAULT_MOCK_HOST, port: int = DEFAULT_MOCK_PORT,
+                 latency_seconds: float = DEFAULT_LATENCY_SECONDS,
+                 tokens_per_second: Optional[float] = DEFAULT_TOKENS_PER_SECOND,
+                 response_tokens: int = DEFAULT_RESPONSE_TOKENS, error_rate: float = 0.0,
+                 error_status: int = DEFAULT_ERROR_STATUS, retry_after: Optional[float] = DEFAULT_RETRY_AFTER_SECONDS,
+                 seed: int = 0):
+        """
+        Initialize the mock server.
+
+        Args:
+            host: Interface to bind (localhost by default)
+            port: Port to bind (0 picks a free port)
+            latency_seconds: Delay before the first token (whole response delay adds generation)
+            tokens_per_second: Generation speed (None: all tokens at once)
+            response_tokens: Tokens per response (capped by the request's max_tokens)
+            error_rate: Fraction of requests answered with error_status
+            error_status: HTTP status of injected errors (429, 500 or 503)
+            retry_after: Retry-After header of injected errors (None: no header)
+            seed: Seed of the error injection
+        """
+        self.host = host
+        self.port = port
+        self.latency_seconds = latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "streamed": 0, "errors_injected": 0,
+                       "prompt_tokens": 0, "completion_tokens": 0, "in_flight": 0, "max_in_flight": 0}
+        self._server = None
+        self._thread = None
+
+    def configure(self, **settings) -> "MockLLMServer":
+        """
+        Change settings while running (e.g. configure(error_rate=0.2, latency_seconds=1.0)).
+
+        Args:
+            **settings: Any of the constructor settings except host, port and seed
+        """
+        with self._lock:
+            for name, value in settings.items():
+                if name not in ("latency_seconds", "tokens_per_second", "response_tokens",
+                                "error_rate", "error_status", "retry_after"):
+                    raise ValueError(f"Unknown mock server setting: {name}")
+                setattr(self, name, value)
+        return self
+
+    def stats(self) -> Dict:
+        """
+        Get request statistics.
+
+        Returns:
+            Dictionary with requests, streamed, errors_injected, prompt_tokens,
+            completion_tokens, in_flight and max_in_flight
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        """Zero the request statistics."""
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+            self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+    def _make_handler(self):
+        """Create the request handler class bound to this server."""
+        mock = self
+
+        class MockLLMHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, chunked streaming
+
+            def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_error_json(self, status: int, message: Optional[str] = None):
+                error_type, code, default_message = ERROR_TYPES.get(
+                    status, ("invalid_request_error", None, "Invalid request (mock)"))
+                headers = {}
+                if status == 429 and mock.retry_after is not None:
+                    headers["Retry-After"] = str(mock.retry_after)
+                self._send_json(status, {"error": {"message": message or default_message, "type": error_type,
+                                                   "param": None, "code": code}}, headers)
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0].rstrip("/")
+                if path.endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [
+                        {"id": MOCK_MODEL, "object": "model", "created": 0, "owned_by": "mock"}]})
+                elif path.endswith("/stats"):
+                    self._send_json(200, mock.stats())
+                else:
+                    self._send_error_json(404, f"Unknown path: {self.path}")
+
+            def do_POST(self):
+                path = self.path.split("?", 1)[0].rstrip("/")
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_error_json(400, "Request body is not valid JSON")
+                    return
+                if not path.endswith("/chat/completions"):
+                    self._send_error_json(404, f"Unknown path: {self.path}")
+                    return
+
+                messages = request.get("messages") or []
+                prompt_tokens = sum(count_tokens(m.get("content", "")) for m in messages)
+                mock._count(requests=1, prompt_tokens=prompt_tokens, in_flight=1)
+                try:
+                    if mock._should_fail():
+                        mock._count(errors_injected=1)
+                        self._send_error_json(mock.error_status)
+                        return
+                    length = min(mock.response_tokens, request.get("max_tokens") or mock.response_tokens)
+                    tokens = mock_response_tokens(messages, max(length, 1))
+                    model = request.get("model") or MOCK_MODEL
+                    if request.get("stream"):
+                        self._stream(tokens, model)
+                    else:
+                        self._complete(tokens, model, prompt_tokens)
+                    mock._count(completion_tokens=len(tokens))
+                finally:
+                    mock._count(in_flight=-1)
+
+            def _complete(self, tokens: List[str], model: str, prompt_tokens: int):
+                time.sleep(mock.latency_seconds + (len(tokens) / mock.tokens_per_second
+                                                   if mock.tokens_per_second else 0))
+                self._send_json(200, {
+                    "id": f"chatcmpl-mock-{int(time.time() * 1000)}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                              "total_tokens": prompt_tokens + len(tokens)}
+                })
+
+            def _stream(self, tokens: List[str], model: str):
+                mock._count(streamed=1)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                chunk_id = f"chatcmpl-mock-{int(time.time() * 1000)}"
+                created = int(time.time())
+
+                def event(delta: Dict, finish_reason: Optional[str] = None) -> bytes:
+                    payload = {"id": chunk_id, "object": "chat.completion.chunk", "created": created,
+                               "model": model, "choices": [{"index": 0, "delta": delta,
+                                                            "finish_reason": finish_reason}]}
+                    return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+                time.sleep(mock.latency_seconds)
+                self._write_chunk(event({"role": "assistant", "content": ""}))
+                interval = 1.0 / mock.tokens_per_second if mock.tokens_per_second else 0
+                next_time = time.monotonic()
+                for token in tokens:
+                    next_time += interval
+                    delay = next_time - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self._write_chunk(event({"content": token}))
+                self._write_chunk(event({}, "stop"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                logger.debug("Mock LLM request: " + format % args)
+
+        return MockLLMHandler
+
+    @property
+    def base_url(self) -> str:
+        """OpenAI base URL of the server (set as OPENAI_BASE_URL)."""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        """Start serving in a daemon thread."""
+        if self._server is not None:
+            return self
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Mock LLM server serving at {self.base_url}")
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+        self._server = None
+        self._thread = None
+        logger.info("Mock LLM server stopped")
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default=DEFAULT_MOCK_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_MOCK_PORT)
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY_SECONDS, help="Seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND,
+                        help="Generation speed (0: instant)")
+    parser.add_argument("--response-tokens", type=int, default=DEFAULT_RESPONSE_TOKENS)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing")
+    parser.add_argument("--error-status", type=int, default=DEFAULT_ERROR_STATUS, choices=sorted(ERROR_TYPES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = MockLLMServer(args.host, args.port, latency_seconds=args.latency,
+                           tokens_per_second=args.tokens_per_second or None,
+                           response_tokens=args.response_tokens, error_rate=args.error_rate,
+                           error_status=args.error_status, seed=args.seed).start()
+    print(f"Mock LLM server at {server.base_url}")
+    print(f"Point the agent at it: export OPENAI_BASE_URL={server.base_url} (any 'sk-' API key works)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,237 @@
+"""
+Model Registry for the Defect Predictor
+Process-wide cache of loaded WaferDefectPredictor instances, keyed by checkpoint path and
+content hash, so controllers (and Streamlit reruns) share one warm model instead of loading
+the checkpoint again
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from Repository.Defect_Prediction import WaferDefectPredictor
+
+logger = logging.getLogger(__name__)
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+# Name under which registry lookups are reported in CacheStats
+MODEL_CACHE_NAME = "model_registry"
+
+# Dummy forward passes run right after loading a model
+WARMUP_RUNS = 1
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """Compute the SHA-256 of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ------------------------------------------------------------------------------------------
+# Registry
+# ------------------------------------------------------------------------------------------
+class ModelRegistry:
+    """
+    Loads each checkpoint once and hands out the shared, warmed-up predictor.
+
+    Lookups by path only stat() the file; the checkpoint is re-hashed when its mtime or size
+    changed, and reloaded only when the hash changed, so replacing the .pth on disk is picked
+    up on the next get(). Models are put in eval mode with gradients disabled: callers must
+    treat them as read-only (predict() is safe to call from several threads). Thread-safe.
+    """
+
+    def __init__(self, warmup_runs: int = WARMUP_RUNS):
+        """
+        Initialize an empty registry.
+
+        Args:
+            warmup_runs: Dummy forward passes after each load (0 to skip warm-up)
+        """
+        self.warmup_runs = warmup_runs
+        self._models = {}  # (sha256, num_classes) -> predictor
+        self._paths = {}   # (path, num_classes) -> {"sha256", "stat", "loaded_at", ...}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model_path: str, num_classes: int):
+        return os.path.abspath(str(model_path)), num_classes
+
+    def get(self, model_path: str, num_classes: int = 9, cache_stats=None) -> WaferDefectPredictor:
+        """
+        Get the predictor for a checkpoint, loading and warming it up on first use.
+
+        Args:
+            model_path: Path to the checkpoint (.pth)
+            num_classes: Number of output classes
+            cache_stats: Optional CacheStats to record the lookup in (as "model_registry")
+
+        Returns:
+            Shared WaferDefectPredictor
+
+        Raises:
+            FileNotFoundError: If the checkpoint does not exist
+        """
+        key = self._key(model_path, num_classes)
+        if not os.path.exists(key[0]):
+            raise FileNotFoundError(f"Model file not found at {model_path}")
+
+        with self._lock:
+            stat = os.stat(key[0])
+            file_state = (stat.st_mtime_ns, stat.st_size)
+            entry = self._paths.get(key)
+            if entry is not None and entry["stat"] != file_state:
+                sha256 = file_sha256(key[0])
+                if sha256 == entry["sha256"]:
+                    entry["stat"] = file_state  # Touched but unchanged
+                else:
+                    logger.info(f"Checkpoint changed on disk, reloading: {key[0]}")
+                    self._forget(key)
+                    entry = None
+            if entry is not None:
+                predictor = self._models.get((entry["sha256"], num_classes))
+                if predictor is not None:
+                    self._record(True, cache_stats)
+                    return predictor
+
+            sha256 = file_sha256(key[0])
+            predictor = self._models.get((sha256, num_classes))
+            hit = predictor is not None  # Same checkpoint content loaded from another path
+            if not hit:
+                predictor = self._load(key[0], num_classes)
+                self._models[(sha256, num_classes)] = predictor
+            self._paths[key] = {
+                "sha256": sha256,
+                "stat": file_state,
+                "loaded_at": datetime.now().isoformat(),
+                "load_seconds": getattr(predictor, "registry_load_seconds", None),
+                "warmup_seconds": getattr(predictor, "registry_warmup_seconds", None)
+            }
+            self._record(hit, cache_stats)
+            return predictor
+
+    def _load(self, model_path: str, num_classes: int) -> WaferDefectPredictor:
+        """Load, freeze and warm up a predictor."""
+        start = time.perf_counter()
+        predictor = WaferDefectPredictor(model_path, num_classes=num_classes)
+        predictor.model.eval()
+        predictor.model.requires_grad_(False)
+        predictor.registry_load_seconds = round(time.perf_counter() - start, 3)
+        predictor.registry_warmup_seconds = (
+            round(predictor.warmup(self.warmup_runs), 3) if self.warmup_runs else 0.0
+        )
+        logger.info(f"Model registry loaded {model_path} in {predictor.registry_load_seconds}s "
+                    f"(warm-up {predictor.registry_warmup_seconds}s)")
+        return predictor
+
+    def _record(self, hit: bool, cache_stats):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if cache_stats is not None:
+            cache_stats.record(MODEL_CACHE_NAME, hit)
+
+    def _forget(self, key):
+        """Drop a path entry, and its model if no other path shares it."""
+        entry = self._paths.pop(key, None)
+        if entry is None:
+            return
+        model_key = (entry["sha256"], key[1])
+        if not any((e["sha256"], k[1]) == model_key for k, e in self._paths.items()):
+            self._models.pop(model_key, None)
+
+    def invalidate(self, model_path: Optional[str] = None):
+        """
+        Drop cached models so the next get() loads from disk.
+
+        Controllers that already hold a predictor keep using it until they are recreated.
+
+        Args:
+            model_path: Checkpoint to drop (None drops every model)
+        """
+        with self._lock:
+            if model_path is None:
+                self._paths.clear()
+                self._models.clear()
+                logger.info("Model registry cleared")
+                return
+            for key in [k for k in self._paths if k[0] == os.path.abspath(str(model_path))]:
+                self._forget(key)
+            logger.info(f"Model registry invalidated: {model_path}")
+
+    def reload(self, model_path: str, num_classes: int = 9, cache_stats=None) -> WaferDefectPredictor:
+        """
+        Force a reload of a checkpoint (e.g. after it was replaced in place).
+
+        Args:
+            model_path: Path to the checkpoint (.pth)
+            num_classes: Number of output classes
+            cache_stats: Optional CacheStats to record the lookup in
+
+        Returns:
+            Freshly loaded WaferDefectPredictor
+        """
+        with self._lock:
+            key = self._key(model_path, num_classes)
+            entry = self._paths.pop(key, None)
+            if entry is not None:
+                self._models.pop((entry["sha256"], num_classes), None)
+            return self.get(model_path, num_classes, cache_stats)
+
+    def info(self) -> Dict[str, Dict]:
+        """
+        Describe the loaded checkpoints.
+
+        Returns:
+            Dictionary {path: {num_classes, sha256, loaded_at, load_seconds, warmup_seconds}}
+        """
+        with self._lock:
+            return {
+                path: {
+                    "num_classes": num_classes,
+                    "sha256": entry["sha256"],
+                    "loaded_at": entry["loaded_at"],
+                    "load_seconds": entry["load_seconds"],
+                    "warmup_seconds": entry["warmup_seconds"]
+                }
+                for (path, num_classes), entry in self._paths.items()
+            }
+
+
+# Process-wide registry shared by every controller (and every Streamlit rerun)
+MODEL_REGISTRY = ModelRegistry()
+
+
+def get_predictor(model_path: str, num_classes: int = 9, cache_stats=None) -> WaferDefectPredictor:
+    """Get a shared predictor from the process-wide registry (see ModelRegistry.get)."""
+    return MODEL_REGISTRY.get(model_path, num_classes, cache_stats)
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    # Compare a cold load with a registry hit
+    model_path = Path(__file__).parent / "MLModelv4.pth"
+    start = time.perf_counter()
+    get_predictor(str(model_path))
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    get_predictor(str(model_path))
+    warm = time.perf_counter() - start
+    print(f"Cold load: {cold:.3f}s, registry hit: {warm * 1000:.3f} ms")
+    print(MODEL_REGISTRY.info())
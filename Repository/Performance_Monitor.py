@@ -0,0 +1,362 @@
+"""
+Performance Monitor for the Wafer Pipeline
+Records per-stage latencies of the manufacturing simulation and aggregates them into histograms
+"""
+
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+# Pipeline stages timed for every wafer (in pipeline order)
+PIPELINE_STAGES = [
+    "generate",       # Copying the source image into processed_images
+    "decode",         # Image decoding inside predict() and count_defects()
+    "predict",        # Model preprocessing + forward pass (excluding decode)
+    "count_defects",  # HSV defect counting (excluding decode)
+    "assemble",       # Building the analysis result dictionary
+    "lock_wait",      # Time spent waiting for results_lock in save_result()
+    "save_result",    # Appending and persisting the result (excluding lock wait)
+    "total",          # End-to-end time for the wafer
+]
+
+# Histogram buckets: 4 log-spaced buckets per doubling from 10 microseconds up to ~168 seconds
+HISTOGRAM_MIN_SECONDS = 1e-5
+HISTOGRAM_BUCKETS_PER_DOUBLING = 4
+HISTOGRAM_NUM_BUCKETS = 96
+
+# Key used for the aggregate over all machine types
+ALL_MACHINES = "All"
+
+# Sliding window used for the "recent" throughput rate (seconds)
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+
+# ------------------------------------------------------------------------------------------
+# Latency Histogram
+# ------------------------------------------------------------------------------------------
+class LatencyHistogram:
+    """Fixed-memory latency histogram with log-spaced buckets."""
+
+    bucket_bounds = [
+        HISTOGRAM_MIN_SECONDS * 2 ** (i / HISTOGRAM_BUCKETS_PER_DOUBLING)
+        for i in range(HISTOGRAM_NUM_BUCKETS)
+    ]
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.buckets = [0] * (len(self.bucket_bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket_index(self, seconds: float) -> int:
+        """Get the index of the bucket a value falls into."""
+        if seconds <= HISTOGRAM_MIN_SECONDS:
+            return 0
+        index = math.ceil(math.log2(seconds / HISTOGRAM_MIN_SECONDS) * HISTOGRAM_BUCKETS_PER_DOUBLING)
+        return min(index, len(self.bucket_bounds))
+
+    def record(self, seconds: float):
+        """
+        Record one observation.
+
+        Args:
+            seconds: Observed duration in seconds
+        """
+        seconds = max(seconds, 0.0)
+        self.buckets[self._bucket_index(seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add the observations of another histogram to this one."""
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile from the buckets.
+
+        Args:
+            q: Percentile in the range 0-100
+
+        Returns:
+            Estimated duration in seconds (bucket upper bound, clamped to observed min/max)
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        cumulative = 0
+        for i, n in enumerate(self.buckets):
+            cumulative += n
+            if cumulative >= rank:
+                upper = self.bucket_bounds[i] if i < len(self.bucket_bounds) else self.max
+                return min(max(upper, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        """
+        Summarize the histogram.
+
+        Returns:
+            Dictionary with count, mean, min, max and p50/p95/p99 in milliseconds
+        """
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3),
+            "min_ms": round(self.min * 1000, 3),
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3)
+        }
+
+
+# ------------------------------------------------------------------------------------------
+# Stage Latency Recorder
+# ------------------------------------------------------------------------------------------
+class StageLatencyRecorder:
+    """Thread-safe collection of latency histograms per machine type and pipeline stage."""
+
+    def __init__(self):
+        """Initialize the recorder."""
+        self._histograms = {}  # (machine_type, stage) -> LatencyHistogram
+        self._lock = threading.Lock()
+
+    def record(self, machine_type: str, stage: str, seconds: float):
+        """
+        Record the duration of one stage for one wafer.
+
+        Args:
+            machine_type: Machine type that processed the wafer
+            stage: Pipeline stage name (see PIPELINE_STAGES)
+            seconds: Duration in seconds
+        """
+        with self._lock:
+            key = (machine_type, stage)
+            if key not in self._histograms:
+                self._histograms[key] = LatencyHistogram()
+            self._histograms[key].record(seconds)
+
+    def record_many(self, machine_type: str, timings: Dict[str, float]):
+        """
+        Record several stage durations for one wafer.
+
+        Args:
+            machine_type: Machine type that processed the wafer
+            timings: Mapping of stage name to duration in seconds
+        """
+        for stage, seconds in timings.items():
+            self.record(machine_type, stage, seconds)
+
+    @contextmanager
+    def time(self, machine_type: str, stage: str):
+        """Context manager that records the duration of the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(machine_type, stage, time.perf_counter() - start)
+
+    def histograms(self) -> Dict[str, Dict[str, LatencyHistogram]]:
+        """
+        Get copies of the histograms, including the aggregate over all machine types.
+
+        Returns:
+            Nested dictionary {machine_type: {stage: LatencyHistogram}}
+        """
+        result = {}
+        with self._lock:
+            for (machine_type, stage), histogram in self._histograms.items():
+                for key in (machine_type, ALL_MACHINES):
+                    merged = result.setdefault(key, {}).setdefault(stage, LatencyHistogram())
+                    merged.merge(histogram)
+        return result
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict]]:
+        """
+        Summarize all histograms.
+
+        Returns:
+            Nested dictionary {machine_type: {stage: summary}} with stages in pipeline order
+        """
+        snapshot = {}
+        for machine_type, stages in sorted(self.histograms().items()):
+            ordered = sorted(stages, key=lambda s: PIPELINE_STAGES.index(s) if s in PIPELINE_STAGES else len(PIPELINE_STAGES))
+            snapshot[machine_type] = {stage: stages[stage].to_dict() for stage in ordered}
+        return snapshot
+
+    def save_json(self, file_path: Path) -> Path:
+        """
+        Dump the latency summary to a JSON file.
+
+        Args:
+            file_path: Destination file
+
+        Returns:
+            Path to the saved file
+        """
+        file_path = Path(file_path)
+        with open(file_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return file_path
+
+    def format_table(self, machine_types: Optional[List[str]] = None) -> str:
+        """
+        Format the latency summary as a text table.
+
+        Args:
+            machine_types: Machine types to include, or None for all
+
+        Returns:
+            Formatted table string
+        """
+        snapshot = self.snapshot()
+        lines = [f"{'Machine':12s} {'Stage':14s} {'Count':>7s} {'p50 ms':>10s} {'p95 ms':>10s} {'p99 ms':>10s}"]
+        for machine_type, stages in snapshot.items():
+            if machine_types and machine_type not in machine_types:
+                continue
+            for stage, stats in stages.items():
+                if not stats.get("count"):
+                    continue
+                lines.append(
+                    f"{machine_type:12s} {stage:14s} {stats['count']:7d} "
+                    f"{stats['p50_ms']:10.2f} {stats['p95_ms']:10.2f} {stats['p99_ms']:10.2f}"
+                )
+        return "\n".join(lines)
+
+
+# ------------------------------------------------------------------------------------------
+# Throughput Counter
+# ------------------------------------------------------------------------------------------
+class ThroughputCounter:
+    """Thread-safe wafer counter with lifetime and sliding-window rates per machine type."""
+
+    def __init__(self, window_seconds: float = THROUGHPUT_WINDOW_SECONDS):
+        """
+        Initialize the counter.
+
+        Args:
+            window_seconds: Length of the sliding window for the recent rate
+        """
+        self.window_seconds = window_seconds
+        self.start_time = time.time()
+        self._totals = {}
+        self._recent = {}  # machine_type -> deque of completion times within the window
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Reset all counts and restart the clock."""
+        with self._lock:
+            self.start_time = time.time()
+            self._totals = {}
+            self._recent = {}
+
+    def record(self, machine_type: str):
+        """
+        Record one completed wafer.
+
+        Args:
+            machine_type: Machine type that processed the wafer
+        """
+        now = time.time()
+        with self._lock:
+            self._totals[machine_type] = self._totals.get(machine_type, 0) + 1
+            self._recent.setdefault(machine_type, deque()).append(now)
+            self._expire(now)
+
+    def _expire(self, now: float):
+        """Drop completion times that fell out of the window (lock must be held)."""
+        cutoff = now - self.window_seconds
+        for times in self._recent.values():
+            while times and times[0] < cutoff:
+                times.popleft()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Get totals and rates.
+
+        Returns:
+            Dictionary {machine_type: {total, wafers_per_second, recent_wafers_per_second}},
+            including the aggregate under ALL_MACHINES
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            elapsed = max(now - self.start_time, 1e-9)
+            window = min(self.window_seconds, elapsed)
+            snapshot = {}
+            for machine_type, total in self._totals.items():
+                snapshot[machine_type] = {
+                    "total": total,
+                    "wafers_per_second": round(total / elapsed, 4),
+                    "recent_wafers_per_second": round(len(self._recent.get(machine_type, ())) / window, 4)
+                }
+            overall_total = sum(self._totals.values())
+            overall_recent = sum(len(t) for t in self._recent.values())
+            snapshot[ALL_MACHINES] = {
+                "total": overall_total,
+                "wafers_per_second": round(overall_total / elapsed, 4),
+                "recent_wafers_per_second": round(overall_recent / window, 4)
+            }
+        return snapshot
+
+
+# ------------------------------------------------------------------------------------------
+# Cache Statistics
+# ------------------------------------------------------------------------------------------
+class CacheStats:
+    """Thread-safe hit/miss counters for named caches."""
+
+    def __init__(self):
+        """Initialize empty counters."""
+        self._counts = {}  # name -> [hits, misses]
+        self._lock = threading.Lock()
+
+    def record(self, name: str, hit: bool):
+        """
+        Record one cache lookup.
+
+        Args:
+            name: Cache name
+            hit: Whether the lookup was a hit
+        """
+        with self._lock:
+            counts = self._counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Get hit/miss counts and hit rates.
+
+        Returns:
+            Dictionary {cache_name: {hits, misses, hit_rate}}
+        """
+        with self._lock:
+            return {
+                name: {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+                }
+                for name, (hits, misses) in self._counts.items()
+            }
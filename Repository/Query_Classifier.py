@@ -0,0 +1,284 @@
+"""
+Query Classifier for Natural Language Queries
+Classifies operator queries and extracts their entities (defect classes, machines, dates) in
+a single pass: every keyword, phrase and entity pattern is compiled into one regex with named
+groups, each match adds its weight to a query type, and the highest-scoring type wins.
+Classification is linear in the query length and does not depend on rule order.
+"""
+
+import re
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+
+class QueryType(Enum):
+    """Types of queries that can be processed."""
+    MACHINE_PERFORMANCE = "machine_performance"
+    DEFECT_DISTRIBUTION = "defect_distribution"
+    TREND_ANALYSIS = "trend_analysis"
+    ROOT_CAUSE = "root_cause"
+    RECOMMENDATIONS = "recommendations"
+    SUMMARY = "summary"
+    COMPARISON = "comparison"
+    SPECIFIC_DEFECT = "specific_defect"
+    ANOMALY_ANALYSIS = "anomaly_analysis"
+    GENERAL = "general"
+
+
+# ------------------------------------------------------------------------------------------
+# Rules
+# ------------------------------------------------------------------------------------------
+# Keyword / phrase patterns (lowercase, matched on whole words of the lowercased query) and
+# their weight per type
+KEYWORD_RULES = {
+    QueryType.MACHINE_PERFORMANCE: [
+        (r"machines?", 2.0), (r"tools?", 2.0), (r"equipment", 2.0), (r"performance", 1.5),
+        (r"perform(?:s|ing)?", 1.0), (r"best", 1.0), (r"worst", 1.0), (r"highest|lowest", 0.5),
+        (r"pass rates?", 1.0), (r"yield", 1.0), (r"rank(?:ing|ed)?", 1.5)
+    ],
+    QueryType.DEFECT_DISTRIBUTION: [
+        (r"distribution", 3.0), (r"most common", 2.5), (r"common", 1.5), (r"types?", 1.5),
+        (r"patterns?", 1.0), (r"breakdown", 2.5), (r"frequen(?:t|cy|cies)", 1.5),
+        (r"how many", 1.0), (r"defects?", 0.5), (r"classes", 1.0)
+    ],
+    QueryType.TREND_ANALYSIS: [
+        (r"trends?|trending", 3.0), (r"over time", 3.0), (r"improv(?:ing|ed)|worsening|deteriorat\w*", 3.0),
+        (r"getting (?:better|worse)", 3.0), (r"which (?:date|day)", 3.0), (r"by (?:date|day)", 2.5),
+        (r"per (?:date|day)", 2.5), (r"dates?|days?", 1.0), (r"daily", 1.0), (r"history|historical", 1.5),
+        (r"changed?|changes", 1.0), (r"recent(?:ly)?", 0.5)
+    ],
+    QueryType.ROOT_CAUSE: [
+        (r"root causes?", 3.5), (r"why", 2.5), (r"caus(?:e|es|ed|ing)", 2.5), (r"reasons?", 2.5),
+        (r"origin", 1.5), (r"source of", 1.5), (r"explain", 1.0)
+    ],
+    QueryType.RECOMMENDATIONS: [
+        (r"recommend\w*", 3.0), (r"suggest\w*", 3.0), (r"what should", 2.5), (r"should (?:we|i)", 2.5),
+        (r"actions?", 2.0), (r"fix(?:es)?", 2.0), (r"improve(?:ment|ments)?", 2.0), (r"prevent\w*", 2.0),
+        (r"mitigat\w*", 2.0), (r"next steps?", 2.5), (r"how (?:can|do|should) we", 1.5)
+    ],
+    QueryType.SUMMARY: [
+        (r"summary|summari[sz]e", 3.0), (r"overview", 3.0), (r"overall", 2.0), (r"status", 2.0),
+        (r"report", 2.5), (r"how are we doing", 3.0), (r"results", 0.5)
+    ],
+    QueryType.COMPARISON: [
+        (r"compar(?:e|ed|ing|ison)", 3.0), (r"versus|vs\.?", 3.0), (r"difference between", 3.0),
+        (r"better than|worse than", 2.5)
+    ],
+    QueryType.ANOMALY_ANALYSIS: [
+        (r"anomal\w*", 3.0), (r"outliers?", 3.0), (r"exceed\w*", 2.0), (r"threshold", 2.0),
+        (r"problem(?:atic)? wafers?", 2.5), (r"bad wafers?", 2.5), (r"worst wafers?", 2.5),
+        (r"alerts?", 1.5)
+    ]
+}
+
+# Defect classes as written by operators -> canonical class name
+DEFECT_CLASS_PATTERNS = {
+    "Center": r"cent(?:er|re)",
+    "Donut": r"donuts?|doughnuts?",
+    "Edge-Loc": r"edge[- ]?loc(?:al)?",
+    "Edge-Ring": r"edge[- ]?rings?",
+    "Local": r"local(?:ized)?",
+    "Near-Full": r"near[- ]?full",
+    "Random": r"random",
+    "Scratch": r"scratch(?:es)?"
+}
+
+MACHINE_TYPES = ["Mechanical", "Electrical", "Thermal"]
+
+# Entity patterns (named groups of the combined regex)
+MACHINE_ID_PATTERN = r"(?P<machine_id>(?:mech|therm|elec)[_ -]?\d{1,3})"
+DATE_PATTERN = r"(?P<date>\d{4}-\d{2}-\d{2})"
+LAST_PERIOD_PATTERN = (r"(?P<last_period>(?:last|past|previous)\s+(?:(?P<last_n>\d+)\s+)?"
+                       r"(?P<last_unit>day|week|month)s?)")
+RELATIVE_DAY_PATTERN = r"(?P<relative_day>today|yesterday|this week|this month)"
+
+# Entity weights per query type
+ENTITY_WEIGHTS = {
+    "defect_class": {QueryType.SPECIFIC_DEFECT: 2.0},
+    "machine_id": {QueryType.MACHINE_PERFORMANCE: 1.5},
+    "machine_type": {QueryType.MACHINE_PERFORMANCE: 0.5},
+    "date": {QueryType.TREND_ANALYSIS: 1.0},
+    "last_days": {QueryType.TREND_ANALYSIS: 2.0}
+}
+
+# Bonus of COMPARISON when a query names several machines, machine types or dates
+COMPARISON_ENTITY_BONUS = 1.5
+
+# Days covered by relative periods
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30}
+RELATIVE_DAYS = {"today": 1, "yesterday": 2, "this week": 7, "this month": 30}
+
+# Winner among equal scores (more specific types first)
+TIE_BREAK = [
+    QueryType.ROOT_CAUSE, QueryType.RECOMMENDATIONS, QueryType.SPECIFIC_DEFECT,
+    QueryType.ANOMALY_ANALYSIS, QueryType.COMPARISON, QueryType.TREND_ANALYSIS,
+    QueryType.MACHINE_PERFORMANCE, QueryType.DEFECT_DISTRIBUTION, QueryType.SUMMARY,
+    QueryType.GENERAL
+]
+
+
+def split_alternatives(pattern: str) -> List[str]:
+    """Split a regex on its top-level "|" (alternations inside groups are kept)."""
+    parts, depth, start, escaped = [], 0, 0, False
+    for i, char in enumerate(pattern):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            parts.append(pattern[start:i])
+            start = i + 1
+    parts.append(pattern[start:])
+    return parts
+
+
+# ------------------------------------------------------------------------------------------
+# Classifier Class
+# ------------------------------------------------------------------------------------------
+class QueryClassifier:
+    """Single-pass keyword-scoring classifier with entity extraction."""
+
+    def __init__(self, keyword_rules: Optional[Dict[QueryType, List[Tuple[str, float]]]] = None):
+        """
+        Initialize the classifier and compile its combined regex.
+
+        Args:
+            keyword_rules: Patterns and weights per query type (default: KEYWORD_RULES)
+        """
+        self.keyword_rules = keyword_rules or KEYWORD_RULES
+        self._groups = {}  # Group name -> ("keyword", QueryType, weight) or (entity kind, value)
+        rules = []
+        for defect_class, pattern in DEFECT_CLASS_PATTERNS.items():
+            rules.append((("defect_class", defect_class), pattern))
+        for machine_type in MACHINE_TYPES:
+            rules.append((("machine_type", machine_type), machine_type.lower()))
+        for query_type, patterns in self.keyword_rules.items():
+            rules += [(("keyword", query_type, weight), pattern) for pattern, weight in patterns]
+
+        # Entities first: they take precedence over keywords at the same position
+        entities = [LAST_PERIOD_PATTERN, RELATIVE_DAY_PATTERN, DATE_PATTERN, MACHINE_ID_PATTERN]
+        self.pattern = re.compile(r"\b(?:" + "|".join(entities + self._dispatch(rules)) + r")\b")
+
+    def _dispatch(self, rules: List[Tuple[tuple, str]]) -> List[str]:
+        """
+        Build the rule alternatives of the combined regex, factored by first letter.
+
+        Each alternative of each rule pattern becomes a named group; alternatives are grouped
+        under their (literal) first letter, so at each position the regex engine only tries
+        the rules starting with the current character. Longest patterns come first in a
+        group so that phrases win over their own words.
+        """
+        buckets, others = {}, []
+        for rule, pattern in rules:
+            for alternative in split_alternatives(pattern):
+                name = f"r{len(self._groups)}"
+                self._groups[name] = rule
+                first = alternative[0]
+                if first.isalpha() and alternative[1:2] not in ("?", "*", "+", "{"):
+                    buckets.setdefault(first, []).append((name, alternative[1:]))
+                else:
+                    others.append(f"(?P<{name}>{alternative})")
+        dispatched = []
+        for first, alternatives in sorted(buckets.items()):
+            alternatives.sort(key=lambda a: -len(a[1]))
+            dispatched.append(first + "(?:" + "|".join(f"(?P<{name}>{rest})" for name, rest in alternatives) + ")")
+        return dispatched + others
+
+    def analyze(self, query: str) -> Dict:
+        """
+        Classify a query and extract its entities in one pass.
+
+        Args:
+            query: Natural language query
+
+        Returns:
+            Dictionary with query_type (QueryType), scores (type value -> score), matches
+            (matched keywords) and entities (defect_classes, machine_ids, machine_types,
+            dates, last_days)
+        """
+        scores = {}
+        matches = []
+        entities = {"defect_classes": [], "machine_ids": [], "machine_types": [], "dates": [], "last_days": None}
+
+        def add(query_type: QueryType, weight: float):
+            scores[query_type] = scores.get(query_type, 0.0) + weight
+
+        def add_entity(kind: str, key: str, value):
+            if value not in entities[key]:
+                entities[key].append(value)
+                for query_type, weight in ENTITY_WEIGHTS[kind].items():
+                    add(query_type, weight)
+
+        for match in self.pattern.finditer(query.lower()):
+            group = match.lastgroup
+            text = match.group(0)
+            if group == "last_period":
+                days = int(match.group("last_n") or 1) * PERIOD_DAYS[match.group("last_unit")]
+                self._set_last_days(entities, days, add)
+            elif group == "relative_day":
+                self._set_last_days(entities, RELATIVE_DAYS[text], add)
+            elif group == "date":
+                add_entity("date", "dates", text)
+            elif group == "machine_id":
+                prefix, number = re.match(r"([a-z]+)[_ -]?(\d+)", text).groups()
+                add_entity("machine_id", "machine_ids", f"{prefix.upper()}_{int(number):02d}")
+            else:
+                rule = self._groups[group]
+                if rule[0] == "keyword":
+                    add(rule[1], rule[2])
+                    matches.append(text)
+                elif rule[0] == "defect_class":
+                    add_entity("defect_class", "defect_classes", rule[1])
+                else:
+                    add_entity("machine_type", "machine_types", rule[1])
+
+        entities["dates"].sort()
+        if any(len(entities[k]) > 1 for k in ("machine_ids", "machine_types", "dates")):
+            add(QueryType.COMPARISON, COMPARISON_ENTITY_BONUS)
+        if scores:
+            best = max(scores.values())
+            query_type = next(t for t in TIE_BREAK if scores.get(t) == best)
+        else:
+            query_type = QueryType.GENERAL
+        return {
+            "query_type": query_type,
+            "scores": {t.value: round(s, 2) for t, s in sorted(scores.items(), key=lambda x: -x[1])},
+            "matches": matches,
+            "entities": entities
+        }
+
+    @staticmethod
+    def _set_last_days(entities: Dict, days: int, add):
+        if entities["last_days"] is None:
+            for query_type, weight in ENTITY_WEIGHTS["last_days"].items():
+                add(query_type, weight)
+        entities["last_days"] = max(days, entities["last_days"] or 0)
+
+    def classify(self, query: str) -> QueryType:
+        """
+        Classify the type of query.
+
+        Args:
+            query: Natural language query
+
+        Returns:
+            QueryType enum
+        """
+        return self.analyze(query)["query_type"]
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point for Testing
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    classifier = QueryClassifier()
+    for query in ["Which machine has the highest defect rate?",
+                  "Why do we see Center defects on THERM_02?",
+                  "Anomalies over the last 2 weeks",
+                  "Compare 2026-10-01 and 2026-10-15"]:
+        result = classifier.analyze(query)
+        print(f"{query}\n  -> {result['query_type'].value} {result['scores']} {result['entities']}")
@@ -4,102 +4,65 @@ Processes operator queries and routes to appropriate handlers
 """
 
 import re
-from typing import Dict, List, Optional, Tuple
-from enum import Enum
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from Repository.config_LLM import (
+    DEFECT_PERCENTAGE_THRESHOLD, MACHINE_PASS_RATE_ALERT, LOCAL_ANSWER_QUERY_TYPES, LLM_ESCALATION_KEYWORDS
+)
+from Repository.Conversation_Session import ConversationSession
 from Repository.Data_Aggregator import DataAggregator
 from Repository.LLM_Monitoring_Agent import LLMMonitoringAgent
+from Repository.Local_Answer_Engine import LocalAnswerEngine
+from Repository.Query_Classifier import QueryClassifier, QueryType
 from Repository.MultiPhysics_Knowledge_Base import explain_defect, get_defect_info
 
 
-class QueryType(Enum):
-    """Types of queries that can be processed."""
-    MACHINE_PERFORMANCE = "machine_performance"
-    DEFECT_DISTRIBUTION = "defect_distribution"
-    TREND_ANALYSIS = "trend_analysis"
-    ROOT_CAUSE = "root_cause"
-    RECOMMENDATIONS = "recommendations"
-    SUMMARY = "summary"
-    COMPARISON = "comparison"
-    SPECIFIC_DEFECT = "specific_defect"
-    ANOMALY_ANALYSIS = "anomaly_analysis"
-    GENERAL = "general"
+# Streaming variant of each agent method used by the handlers
+STREAM_METHODS = {
+    "answer_query": "stream_answer_query",
+    "explain_defect_with_llm": "stream_defect_explanation",
+    "generate_recommendations": "stream_recommendations",
+    "generate_daily_summary": "stream_daily_summary",
+}
+
+# Non-blocking variant of each agent method, used by batches (handlers get stream=SUBMIT)
+SUBMIT = "submit"
+SUBMIT_METHODS = {
+    "answer_query": "submit_answer_query",
+    "explain_defect_with_llm": "submit_defect_explanation",
+    "generate_recommendations": "submit_recommendations",
+    "generate_daily_summary": "submit_daily_summary",
+}
+
+
+# Deep queries are escalated to the LLM whatever their type
+ESCALATION_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in LLM_ESCALATION_KEYWORDS) + r")\b")
 
 
 class QueryProcessor:
     """Processes natural language queries about manufacturing data."""
     
-    def __init__(self):
-        """Initialize the query processor."""
-        self.aggregator = DataAggregator()
-        self.llm_agent = None  # Initialize on demand
-        self.aggregator.load_results()
-        
-        # Query patterns for classification
-        self.query_patterns = {
-            QueryType.MACHINE_PERFORMANCE: [
-                r"which.*machine.*(?:best|worst|highest|lowest|most|least)",
-                r"machine.*performance",
-                r"which.*tool.*defect",
-                r"machine.*rate",
-                r"equipment.*performance"
-            ],
-            QueryType.DEFECT_DISTRIBUTION: [
-                r"defect.*distribution",
-                r"most.*common.*defect",
-                r"defect.*type",
-                r"what.*defect",
-                r"defect.*pattern"
-            ],
-            QueryType.TREND_ANALYSIS: [
-                r"trend",
-                r"over.*time",
-                r"last.*(?:day|week|month)",
-                r"improving|worsening",
-                r"change.*time"
-            ],
-            QueryType.ROOT_CAUSE: [
-                r"why.*defect",
-                r"cause.*defect",
-                r"root.*cause",
-                r"reason.*defect",
-                r"what.*cause"
-            ],
-            QueryType.RECOMMENDATIONS: [
-                r"recommend",
-                r"what.*should.*do",
-                r"action",
-                r"suggest",
-                r"how.*fix"
-            ],
-            QueryType.SUMMARY: [
-                r"summary",
-                r"overview",
-                r"overall",
-                r"status",
-                r"report"
-            ],
-            QueryType.SPECIFIC_DEFECT: [
-                r"center.*defect",
-                r"scratch.*defect",
-                r"edge.*defect",
-                r"donut.*defect",
-                r"local.*defect"
-            ],
-            QueryType.ANOMALY_ANALYSIS: [
-                r"anomal",
-                r"outlier",
-                r"exceed",
-                r"threshold",
-                r"problem.*wafer"
-            ]
-        }
+    def __init__(self, aggregator: Optional[DataAggregator] = None):
+        """
+        Initialize the query processor.
+        
+        Args:
+            aggregator: Data aggregator to share with other components (default: a new one)
+        """
+        self.aggregator = aggregator or DataAggregator()
+        self.llm_agent = None  # Initialize on demand, sharing the aggregator
+        self.aggregator.refresh()
+        
+        # Compiled single-pass classifier (query type + entities)
+        self.classifier = QueryClassifier()
     
     def _get_llm_agent(self) -> Optional[LLMMonitoringAgent]:
         """Get or create LLM agent."""
         if self.llm_agent is None:
             try:
-                self.llm_agent = LLMMonitoringAgent()
+                self.llm_agent = LLMMonitoringAgent(aggregator=self.aggregator)
             except Exception as e:
                 print(f"Warning: Could not initialize LLM agent: {e}")
         return self.llm_agent
@@ -114,64 +77,231 @@ class QueryProcessor:
         Returns:
             QueryType enum
         """
-        query_lower = query.lower()
+        return self.classifier.classify(query)
+    
+    def analyze_query(self, query: str) -> Dict:
+        """
+        Classify a query and extract its entities (defect classes, machine IDs and types, dates).
+        
+        Args:
+            query: Natural language query
+            
+        Returns:
+            Dictionary with query_type, scores, matches and entities (see QueryClassifier.analyze)
+        """
+        return self.classifier.analyze(query)
+    
+    def should_escalate(self, query: str, query_type: QueryType, deep: bool = False) -> bool:
+        """
+        Decide whether a query needs the LLM.
         
-        # Check each pattern
-        for query_type, patterns in self.query_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, query_lower):
-                    return query_type
+        Structured queries (LOCAL_ANSWER_QUERY_TYPES) are answered by the local answer engine;
+        every other type, and any query that is deep (asked for, or worded with one of
+        LLM_ESCALATION_KEYWORDS), goes to the LLM.
         
-        return QueryType.GENERAL
+        Args:
+            query: Natural language query
+            query_type: Classified query type
+            deep: Whether the operator explicitly asked for an in-depth answer
+            
+        Returns:
+            True if the LLM should answer
+        """
+        if deep or query_type.value not in LOCAL_ANSWER_QUERY_TYPES:
+            return True
+        return ESCALATION_PATTERN.search(query.lower()) is not None
     
-    def process_query(self, query: str, use_llm: bool = True) -> Dict:
+    def process_query(self, query: str, use_llm: bool = True, refresh: bool = False,
+                      deep: bool = False, session: Optional[ConversationSession] = None) -> Dict:
         """
         Process a natural language query.
         
         Args:
             query: Natural language query
-            use_llm: Whether to use LLM for response
+            use_llm: Whether the LLM may be used for the response
+            refresh: Bypass the LLM response cache (force a fresh answer)
+            deep: Always ask the LLM, even for structured queries
+            session: Conversation the query is a turn of (the turn is recorded in it)
             
         Returns:
-            Dictionary with query result
+            Dictionary with query result ("answered_by" is "llm" or "local")
+        """
+        self.aggregator.refresh()
+        query_type, use_llm, parts = self._route_query(query, use_llm, refresh, stream=False, deep=deep,
+                                                       session=session)
+        result = {
+            "query": query,
+            "query_type": query_type.value,
+            "answer": "".join(parts),
+            "answered_by": "llm" if use_llm else "local"
+        }
+        if session is not None:
+            session.add_turn(query, result["answer"], result["query_type"], result["answered_by"])
+        return result
+    
+    def stream_query(self, query: str, use_llm: bool = True, refresh: bool = False,
+                     deep: bool = False, session: Optional[ConversationSession] = None) -> Iterator[str]:
         """
-        # Reload data
-        self.aggregator.load_results()
+        Process a natural language query, yielding the answer as it is produced.
         
-        # Classify query
-        query_type = self.classify_query(query)
+        The locally computed part of the answer is yielded at once, then the LLM part token
+        by token, so the first text shows up long before the completion is done.
+        
+        Args:
+            query: Natural language query
+            use_llm: Whether the LLM may be used for the response
+            refresh: Bypass the LLM response cache (force a fresh answer)
+            deep: Always ask the LLM, even for structured queries
+            session: Conversation the query is a turn of (the turn is recorded once the answer
+                is complete)
+            
+        Yields:
+            Answer text chunks (joined, they equal process_query's answer)
+        """
+        self.aggregator.refresh()
+        query_type, use_llm, parts = self._route_query(query, use_llm, refresh, stream=True, deep=deep,
+                                                       session=session)
+        chunks = []
+        for chunk in parts:
+            chunks.append(chunk)
+            yield chunk
+        if session is not None:
+            session.add_turn(query, "".join(chunks), query_type.value, "llm" if use_llm else "local")
+    
+    def process_queries(self, queries: List[str], use_llm: bool = True, refresh: bool = False,
+                        deep: bool = False) -> List[Dict]:
+        """
+        Process a batch of natural language queries.
+        
+        The data is refreshed once and every statistic is computed once for the whole batch;
+        all LLM calls are dispatched before waiting for any, so they run concurrently (within
+        the client's concurrency and rate limits). A query repeated in the batch is answered once.
+        
+        Args:
+            queries: Natural language queries
+            use_llm: Whether the LLM may be used for the responses
+            refresh: Bypass the LLM response cache (force fresh answers)
+            deep: Always ask the LLM, even for structured queries
+            
+        Returns:
+            One process_query result per query, in order, each with its timing: "local_seconds"
+            (classification, statistics and prompt building) and "seconds" (until the answer was
+            complete, LLM included)
+        """
+        self.aggregator.refresh()
+        batch = {}  # query -> (QueryType, use_llm, answer parts, start, local end, LLM completion times)
+        with self.aggregator.cached_statistics():
+            for query in queries:
+                if query in batch:
+                    continue
+                start = time.perf_counter()
+                query_type, query_llm, parts = self._route_query(query, use_llm, refresh, stream=SUBMIT, deep=deep)
+                parts = list(parts)  # Local text, and futures of the dispatched LLM calls
+                done = []
+                for part in parts:
+                    if isinstance(part, Future):
+                        part.add_done_callback(lambda _, done=done: done.append(time.perf_counter()))
+                batch[query] = (query_type, query_llm, parts, start, time.perf_counter(), done)
+        
+        results = []
+        for query in queries:
+            query_type, query_llm, parts, start, local_end, done = batch[query]
+            answer = "".join(part.result() if isinstance(part, Future) else part for part in parts)
+            if len(done) < sum(isinstance(part, Future) for part in parts):
+                done.append(time.perf_counter())  # A done-callback has not run yet: it is just finishing
+            results.append({
+                "query": query,
+                "query_type": query_type.value,
+                "answer": answer,
+                "answered_by": "llm" if query_llm else "local",
+                "local_seconds": round(local_end - start, 4),
+                "seconds": round(max([local_end] + done) - start, 4)
+            })
+        return results
+    
+    def _route_query(self, query: str, use_llm: bool, refresh: bool, stream: bool, deep: bool = False,
+                     session: Optional[ConversationSession] = None):
+        """
+        Classify a query, apply the escalation policy and start its handler.
+        
+        Returns:
+            Tuple (QueryType, whether the LLM is used, iterator over the answer text chunks)
+        """
+        # Classify query (and extract its entities); structured queries are answered locally unless escalated
+        analysis = self.analyze_query(query)
+        query_type = analysis["query_type"]
+        use_llm = use_llm and self.should_escalate(query, query_type, deep)
         
         # Process based on type
         if query_type == QueryType.MACHINE_PERFORMANCE:
-            answer = self._answer_machine_performance(query, use_llm)
+            handler = self._answer_machine_performance
         elif query_type == QueryType.DEFECT_DISTRIBUTION:
-            answer = self._answer_defect_distribution(query, use_llm)
+            handler = self._answer_defect_distribution
         elif query_type == QueryType.ROOT_CAUSE:
-            answer = self._answer_root_cause(query, use_llm)
+            handler = self._answer_root_cause
         elif query_type == QueryType.RECOMMENDATIONS:
-            answer = self._answer_recommendations(query, use_llm)
+            handler = self._answer_recommendations
         elif query_type == QueryType.SUMMARY:
-            answer = self._answer_summary(query, use_llm)
+            handler = self._answer_summary
         elif query_type == QueryType.SPECIFIC_DEFECT:
-            answer = self._answer_specific_defect(query, use_llm)
+            handler = self._answer_specific_defect
         elif query_type == QueryType.ANOMALY_ANALYSIS:
-            answer = self._answer_anomaly_analysis(query, use_llm)
+            handler = self._answer_anomaly_analysis
+        elif query_type == QueryType.TREND_ANALYSIS:
+            handler = self._answer_trend_analysis
         else:
             # General query - use LLM
-            answer = self._answer_general(query, use_llm)
+            handler = self._answer_general
         
-        return {
-            "query": query,
-            "query_type": query_type.value,
-            "answer": answer
-        }
+        return query_type, use_llm, handler(query, use_llm, refresh, stream, analysis["entities"], session)
     
-    def _answer_machine_performance(self, query: str, use_llm: bool) -> str:
+    def _llm_text(self, method: str, query: str, *args, stream: bool = False, refresh: bool = False,
+                  session: Optional[ConversationSession] = None) -> Iterator[str]:
+        """
+        Call an agent method, as a whole response or streamed.
+        
+        In a conversation every request is made through answer_query, as the next turn of the
+        session, with the method's own answer instructions (see LLMMonitoringAgent.session_task).
+        
+        Args:
+            method: Non-streaming agent method name; its streaming variant is STREAM_METHODS[method]
+            query: Operator's query
+            *args: Method arguments other than the query (answer_query takes only the query)
+            stream: Use the streaming variant, or SUBMIT to yield a Future of the response instead
+                (the non-blocking variant SUBMIT_METHODS[method])
+            refresh: Bypass the LLM response cache
+            session: Conversation the query is a turn of
+            
+        Yields:
+            Response text (one chunk when not streaming), or its Future
+        """
+        agent = self._get_llm_agent()
+        kwargs = {"refresh": refresh}
+        if session is not None:
+            kwargs.update(session=session, task=agent.session_task(method, *args))
+            method, args = "answer_query", (query,)
+        elif method == "answer_query":
+            args = (query,)
+        if stream == SUBMIT:
+            yield getattr(agent, SUBMIT_METHODS[method])(*args, **kwargs)
+        elif stream:
+            yield from getattr(agent, STREAM_METHODS[method])(*args, **kwargs)
+        else:
+            yield getattr(agent, method)(*args, **kwargs)
+    
+    def _answer_machine_performance(self, query: str, use_llm: bool, refresh: bool = False,
+                                    stream: bool = False, entities: Optional[Dict] = None,
+                                    session: Optional[ConversationSession] = None) -> Iterator[str]:
         """Answer machine performance queries."""
+        if not (use_llm and self._get_llm_agent()):
+            yield LocalAnswerEngine(self.aggregator).machine_performance()
+            return
+        
         ranking = self.aggregator.get_machine_performance_ranking()
         
         if not ranking:
-            return "No machine performance data available."
+            yield "No machine performance data available."
+            return
         
         # Simple answer
         answer = "Machine Performance Ranking:\n\n"
@@ -181,18 +311,20 @@ class QueryProcessor:
             answer += f"avg defect: {machine['average_defect_percentage']:.2f}%)\n"
         
         # LLM enhancement
-        if use_llm:
-            agent = self._get_llm_agent()
-            if agent:
-                llm_answer = agent.answer_query(query)
-                # answer += "\n" + "="*50 + "\n"
-                answer += "Detailed Analysis:\n"
-                answer += "="*50 + "\n" + llm_answer
-        
-        return answer
+        # answer += "\n" + "="*50 + "\n"
+        answer += "Detailed Analysis:\n"
+        answer += "="*50 + "\n"
+        yield answer
+        yield from self._llm_text("answer_query", query, stream=stream, refresh=refresh, session=session)
     
-    def _answer_defect_distribution(self, query: str, use_llm: bool) -> str:
+    def _answer_defect_distribution(self, query: str, use_llm: bool, refresh: bool = False,
+                                    stream: bool = False, entities: Optional[Dict] = None,
+                                    session: Optional[ConversationSession] = None) -> Iterator[str]:
         """Answer defect distribution queries."""
+        if not (use_llm and self._get_llm_agent()):
+            yield LocalAnswerEngine(self.aggregator).defect_distribution()
+            return
+        
         defect_dist = self.aggregator.get_defect_distribution()
         
         answer = "Defect Class Distribution:\n\n"
@@ -200,104 +332,107 @@ class QueryProcessor:
             pct = defect_dist['percentages'].get(defect_class, 0)
             answer += f"{defect_class:20s}: {count:4d} wafers ({pct:5.2f}%)\n"
         
-        if use_llm:
-            agent = self._get_llm_agent()
-            if agent:
-                llm_answer = agent.answer_query(query)
-                # answer += "\n" + "="*50 + "\n"
-                answer += "Analysis:\n"
-                answer += "="*50 + "\n" + llm_answer
-        
-        return answer
+        # answer += "\n" + "="*50 + "\n"
+        answer += "Analysis:\n"
+        answer += "="*50 + "\n"
+        yield answer
+        yield from self._llm_text("answer_query", query, stream=stream, refresh=refresh, session=session)
     
-    def _answer_root_cause(self, query: str, use_llm: bool) -> str:
+    def _answer_root_cause(self, query: str, use_llm: bool, refresh: bool = False,
+                           stream: bool = False, entities: Optional[Dict] = None,
+                           session: Optional[ConversationSession] = None) -> Iterator[str]:
         """Answer root cause queries."""
-        # Extract defect class from query if possible
-        defect_classes = ["Center", "Donut", "Edge-Loc", "Edge-Ring", "Local", 
-                         "Near-Full", "Normal", "Random", "Scratch"]
-        mentioned_defect = None
-        for defect in defect_classes:
-            if defect.lower() in query.lower():
-                mentioned_defect = defect
-                break
+        # Defect class (and machine type) mentioned in the query, if any
+        entities = entities or self.analyze_query(query)["entities"]
+        mentioned_defect = next(iter(entities["defect_classes"]), None)
+        machine_type = next(iter(entities["machine_types"]), None)
         
         if mentioned_defect:
-            answer = explain_defect(mentioned_defect)
-            if use_llm:
-                agent = self._get_llm_agent()
-                if agent:
-                    llm_answer = agent.explain_defect_with_llm(mentioned_defect)
-                    # answer += "\n" + "="*50 + "\n"
-                    answer += "Enhanced Analysis:\n"
-                    answer += "="*50 + "\n" + llm_answer
+            answer = explain_defect(mentioned_defect, machine_type)
+            if use_llm and self._get_llm_agent():
+                # answer += "\n" + "="*50 + "\n"
+                answer += "Enhanced Analysis:\n"
+                answer += "="*50 + "\n"
+                yield answer
+                yield from self._llm_text("explain_defect_with_llm", query, mentioned_defect, machine_type,
+                                          stream=stream, refresh=refresh, session=session)
+            else:
+                yield answer
         else:
             # General root cause analysis
-            if use_llm:
-                agent = self._get_llm_agent()
-                if agent:
-                    answer = agent.answer_query(query)
-                else:
-                    answer = "Please specify a defect type for root cause analysis."
+            if use_llm and self._get_llm_agent():
+                yield from self._llm_text("answer_query", query, stream=stream, refresh=refresh, session=session)
             else:
-                answer = "Please specify a defect type for root cause analysis."
-        
-        return answer
+                yield "Please specify a defect type for root cause analysis."
     
-    def _answer_recommendations(self, query: str, use_llm: bool) -> str:
+    def _answer_recommendations(self, query: str, use_llm: bool, refresh: bool = False,
+                                stream: bool = False, entities: Optional[Dict] = None,
+                                session: Optional[ConversationSession] = None) -> Iterator[str]:
         """Answer recommendation queries."""
-        if use_llm:
-            agent = self._get_llm_agent()
-            if agent:
-                return agent.generate_recommendations()
+        if use_llm and self._get_llm_agent():
+            yield from self._llm_text("generate_recommendations", query, stream=stream, refresh=refresh,
+                                      session=session)
+            return
         
         # Fallback without LLM
         answer = "Recommendations based on current data:\n\n"
-        anomalies = self.aggregator.get_anomalies()
+        anomalies = self.aggregator.get_anomalies(DEFECT_PERCENTAGE_THRESHOLD)
         if anomalies:
-            answer += f"1. Address {len(anomalies)} wafers exceeding 40% defect threshold\n"
+            answer += f"1. Address {len(anomalies)} wafers exceeding {DEFECT_PERCENTAGE_THRESHOLD:g}% defect threshold\n"
         
         machine_stats = self.aggregator.get_machine_statistics()
         for machine, stats in machine_stats.items():
-            if stats['pass_rate'] < 80:
+            if stats['pass_rate'] < MACHINE_PASS_RATE_ALERT:
                 answer += f"2. Investigate {machine} with {stats['pass_rate']:.2f}% pass rate\n"
         
-        return answer
+        yield answer
     
-    def _answer_summary(self, query: str, use_llm: bool) -> str:
+    def _answer_summary(self, query: str, use_llm: bool, refresh: bool = False,
+                        stream: bool = False, entities: Optional[Dict] = None,
+                        session: Optional[ConversationSession] = None) -> Iterator[str]:
         """Answer summary queries."""
-        if use_llm:
-            agent = self._get_llm_agent()
-            if agent:
-                return agent.generate_daily_summary()
+        if use_llm and self._get_llm_agent():
+            yield from self._llm_text("generate_daily_summary", query, stream=stream, refresh=refresh,
+                                      session=session)
+            return
         
         # Fallback
-        return self.aggregator.format_for_llm()
+        yield self.aggregator.format_for_llm()
     
-    def _answer_specific_defect(self, query: str, use_llm: bool) -> str:
+    def _answer_specific_defect(self, query: str, use_llm: bool, refresh: bool = False,
+                                stream: bool = False, entities: Optional[Dict] = None,
+                                session: Optional[ConversationSession] = None) -> Iterator[str]:
         """Answer queries about specific defect types."""
-        defect_classes = ["Center", "Donut", "Edge-Loc", "Edge-Ring", "Local", 
-                         "Near-Full", "Normal", "Random", "Scratch"]
-        
-        for defect in defect_classes:
-            if defect.lower() in query.lower():
-                answer = explain_defect(defect)
-                if use_llm:
-                    agent = self._get_llm_agent()
-                    if agent:
-                        llm_answer = agent.explain_defect_with_llm(defect)
-                        # answer += "\n" + "="*50 + "\n"
-                        answer += "Enhanced Analysis:\n"
-                        answer += "="*50 + "\n" + llm_answer
-                return answer
-        
-        return "Please specify a defect type (Center, Scratch, Edge-Loc, etc.)"
+        entities = entities or self.analyze_query(query)["entities"]
+        machine_type = next(iter(entities["machine_types"]), None)
+        
+        for defect in entities["defect_classes"][:1]:
+            answer = explain_defect(defect, machine_type)
+            if use_llm and self._get_llm_agent():
+                # answer += "\n" + "="*50 + "\n"
+                answer += "Enhanced Analysis:\n"
+                answer += "="*50 + "\n"
+                yield answer
+                yield from self._llm_text("explain_defect_with_llm", query, defect, machine_type,
+                                          stream=stream, refresh=refresh, session=session)
+            else:
+                yield answer
+            return
+        
+        yield "Please specify a defect type (Center, Scratch, Edge-Loc, etc.)"
     
-    def _answer_anomaly_analysis(self, query: str, use_llm: bool) -> str:
+    def _answer_anomaly_analysis(self, query: str, use_llm: bool, refresh: bool = False,
+                                 stream: bool = False, entities: Optional[Dict] = None,
+                                 session: Optional[ConversationSession] = None) -> Iterator[str]:
         """Answer anomaly analysis queries."""
-        anomalies = self.aggregator.get_anomalies()
+        if not (use_llm and self._get_llm_agent()):
+            yield LocalAnswerEngine(self.aggregator).anomaly_analysis()
+            return
+        
+        anomalies = self.aggregator.get_anomalies(DEFECT_PERCENTAGE_THRESHOLD)
         
         answer = f"Anomaly Analysis:\n\n"
-        answer += f"Total Anomalies (>40% defect): {len(anomalies)}\n\n"
+        answer += f"Total Anomalies (>{DEFECT_PERCENTAGE_THRESHOLD:g}% defect): {len(anomalies)}\n\n"
         
         if anomalies:
             answer += "Top Anomalies:\n"
@@ -309,24 +444,31 @@ class QueryProcessor:
                 answer += f"Machine: {anomaly.get('machine_type')} {anomaly.get('machine_id')}, "
                 answer += f"Date: {sim_date}\n"
         
-        if use_llm:
-            agent = self._get_llm_agent()
-            if agent:
-                llm_answer = agent.answer_query(query)
-                # answer += "\n" + "="*50 + "\n"
-                answer += "Analysis:\n"
-                answer += "="*50 + "\n" + llm_answer
+        # answer += "\n" + "="*50 + "\n"
+        answer += "Analysis:\n"
+        answer += "="*50 + "\n"
+        yield answer
+        yield from self._llm_text("answer_query", query, stream=stream, refresh=refresh, session=session)
+    
+    def _answer_trend_analysis(self, query: str, use_llm: bool, refresh: bool = False,
+                               stream: bool = False, entities: Optional[Dict] = None,
+                               session: Optional[ConversationSession] = None) -> Iterator[str]:
+        """Answer trend queries."""
+        if use_llm and self._get_llm_agent():
+            yield from self._llm_text("answer_query", query, stream=stream, refresh=refresh, session=session)
+            return
         
-        return answer
+        yield LocalAnswerEngine(self.aggregator).trend_analysis()
     
-    def _answer_general(self, query: str, use_llm: bool) -> str:
+    def _answer_general(self, query: str, use_llm: bool, refresh: bool = False,
+                        stream: bool = False, entities: Optional[Dict] = None,
+                        session: Optional[ConversationSession] = None) -> Iterator[str]:
         """Answer general queries using LLM."""
-        if use_llm:
-            agent = self._get_llm_agent()
-            if agent:
-                return agent.answer_query(query)
+        if use_llm and self._get_llm_agent():
+            yield from self._llm_text("answer_query", query, stream=stream, refresh=refresh, session=session)
+            return
         
-        return "I can help you with questions about machine performance, defect distribution, root causes, and recommendations. Please try rephrasing your question."
+        yield "I can help you with questions about machine performance, defect distribution, root causes, and recommendations. Please try rephrasing your question."
 
 
 # ------------------------------------------------------------------------------------------
@@ -353,6 +495,6 @@ if __name__ == "__main__":
         print(f"Query: {query}")
         print(f"{'='*70}")
         result = processor.process_query(query, use_llm=False)  # Test without LLM first
-        print(f"Type: {result['query_type']}")
+        print(f"Type: {result['query_type']} (answered by: {result['answered_by']})")
         print(f"\nAnswer:\n{result['answer']}")
 
@@ -0,0 +1,282 @@
+"""
+Result Stream for the Manufacturing Simulation
+In-process publish/subscribe of wafer results as they are saved, plus a file-tail reader that
+follows the results shards for consumers running in another process
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from Repository.Results_Sink import load_manifest
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+# Number of most recent results kept in memory for cursors to replay
+RESULT_STREAM_RETENTION = 10000
+
+
+# ------------------------------------------------------------------------------------------
+# In-Process Stream
+# ------------------------------------------------------------------------------------------
+class ResultStream:
+    """
+    Append-only, in-memory log of wafer results.
+
+    Every published result gets a sequential offset (the same order in which it was written
+    to the results shards). Subscribers read through independent cursors and can start from
+    any retained offset, so a consumer can replay what it missed and then follow new results.
+    Thread-safe.
+    """
+
+    def __init__(self, retention: int = RESULT_STREAM_RETENTION):
+        """
+        Initialize the stream.
+
+        Args:
+            retention: Number of most recent results kept for replay
+        """
+        self.retention = retention
+        self._records = deque(maxlen=retention)
+        self._next_offset = 0
+        self._condition = threading.Condition()
+
+    @property
+    def next_offset(self) -> int:
+        """Offset the next published result will get."""
+        return self._next_offset
+
+    @property
+    def oldest_offset(self) -> int:
+        """Oldest offset still retained."""
+        with self._condition:
+            return self._next_offset - len(self._records)
+
+    def publish(self, result: Dict) -> int:
+        """
+        Publish one result and wake waiting subscribers.
+
+        Args:
+            result: Saved wafer result
+
+        Returns:
+            Offset assigned to the result
+        """
+        with self._condition:
+            offset = self._next_offset
+            self._records.append(result)
+            self._next_offset += 1
+            self._condition.notify_all()
+        return offset
+
+    def read(self, offset: int, max_records: Optional[int] = None, timeout: float = 0) -> Tuple[int, List[Dict]]:
+        """
+        Read results starting at an offset.
+
+        Args:
+            offset: First offset to read (clamped to the oldest retained offset)
+            max_records: Maximum number of results to return (None for all available)
+            timeout: Seconds to wait for new results when none are available
+
+        Returns:
+            Tuple (offset of the first returned result, list of results)
+        """
+        with self._condition:
+            if offset >= self._next_offset and timeout > 0:
+                self._condition.wait_for(lambda: self._next_offset > offset, timeout=timeout)
+            oldest = self._next_offset - len(self._records)
+            start = max(offset, oldest)
+            end = self._next_offset if max_records is None else min(self._next_offset, start + max_records)
+            records = [self._records[i - oldest] for i in range(start, end)]
+        return start, records
+
+    def subscribe(self, from_offset: Optional[int] = 0) -> "ResultCursor":
+        """
+        Create a cursor over the stream.
+
+        Args:
+            from_offset: Offset to start from (0 replays everything retained, None follows only new results)
+
+        Returns:
+            New ResultCursor
+        """
+        return ResultCursor(self, self.next_offset if from_offset is None else from_offset)
+
+
+class ResultCursor:
+    """Position of one subscriber in a ResultStream."""
+
+    def __init__(self, stream: ResultStream, offset: int):
+        """
+        Initialize the cursor.
+
+        Args:
+            stream: Stream to read from
+            offset: Offset of the next result to deliver
+        """
+        self.stream = stream
+        self.offset = offset
+        self.skipped = 0  # Results that fell out of retention before this cursor read them
+
+    def poll(self, max_records: Optional[int] = None, timeout: float = 0) -> List[Dict]:
+        """
+        Get the results published since the last poll.
+
+        Args:
+            max_records: Maximum number of results to return (None for all available)
+            timeout: Seconds to wait for a result when none are available
+
+        Returns:
+            List of results (empty if none arrived)
+        """
+        start, records = self.stream.read(self.offset, max_records, timeout)
+        self.skipped += start - self.offset
+        self.offset = start + len(records)
+        return records
+
+    def seek(self, offset: int):
+        """Move the cursor to another offset (e.g. to replay from an earlier point)."""
+        self.offset = offset
+
+
+# ------------------------------------------------------------------------------------------
+# File-Tail Fallback
+# ------------------------------------------------------------------------------------------
+class ResultsTail:
+    """
+    Follows the results shards on disk, for consumers outside the simulation process.
+
+    Offsets are per run and match the in-process ResultStream offsets of that run's controller.
+    Closed shards that were fully read are never opened again; the open shard is re-read only
+    when its file changed.
+    """
+
+    def __init__(self, output_dir: Path, run_id: Optional[str] = None,
+                 from_start: bool = True, from_offset: int = 0):
+        """
+        Initialize the tail reader.
+
+        Args:
+            output_dir: Directory containing the manifests and shards
+            run_id: Follow only this run (None follows every run, including new ones)
+            from_start: Deliver the results already on disk (False starts at the current end)
+            from_offset: Starting offset when following a single run from the start
+        """
+        self.output_dir = Path(output_dir)
+        self.run_id = run_id
+        self.offsets = {}  # run_id -> offset of the next result to deliver
+        self._file_state = {}  # shard file -> (mtime_ns, size) when it was last read
+        if run_id is not None and from_start:
+            self.offsets[run_id] = from_offset
+        if not from_start:
+            for run, manifest in self._manifests():
+                closed = sum(shard["records"] for shard in manifest["shards"] if shard.get("closed"))
+                self.offsets[run] = closed + sum(len(records) for _, records in self._read_shards(manifest, closed))
+
+    def _manifests(self):
+        """Yield (run_id, manifest) for the followed runs."""
+        for manifest_file in sorted(self.output_dir.glob("manifest_*.json")):
+            manifest = load_manifest(manifest_file)
+            if manifest is None:
+                continue
+            run = manifest.get("run_id")
+            if self.run_id is None or run == self.run_id:
+                yield run, manifest
+
+    def _read_shards(self, manifest: Dict, offset: int):
+        """Yield (start offset, records) of the shards that may hold records at or after offset."""
+        start = 0
+        for shard in manifest["shards"]:
+            if shard.get("closed") and start + shard["records"] <= offset:
+                start += shard["records"]
+                continue
+            path = self.output_dir / shard["file"]
+            try:
+                with open(path, 'r') as f:
+                    records = json.load(f)
+            except (OSError, ValueError):
+                records = []
+            yield start, records
+            start += len(records)
+
+    def _shard_changed(self, manifest: Dict, offset: int) -> bool:
+        """Check whether any shard of the run not yet fully read changed on disk since the last poll."""
+        changed = False
+        start = 0
+        for shard in manifest["shards"]:
+            start += shard["records"]
+            if shard.get("closed") and start <= offset:
+                continue
+            path = self.output_dir / shard["file"]
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state = (stat.st_mtime_ns, stat.st_size)
+            if self._file_state.get(path) != state:
+                self._file_state[path] = state
+                changed = True
+        return changed
+
+    def poll(self, max_records: Optional[int] = None) -> List[Dict]:
+        """
+        Get the results written since the last poll.
+
+        Args:
+            max_records: Maximum number of results to return (None for all available)
+
+        Returns:
+            List of results (empty if nothing new was written)
+        """
+        new_records = []
+        for run, manifest in self._manifests():
+            offset = self.offsets.get(run, 0)
+            if not self._shard_changed(manifest, offset):
+                continue
+            for start, records in self._read_shards(manifest, offset):
+                take = records[max(offset - start, 0):]
+                if max_records is not None:
+                    take = take[:max_records - len(new_records)]
+                new_records.extend(take)
+                offset = max(offset, start) + len(take)
+                if max_records is not None and len(new_records) >= max_records:
+                    self._file_state.clear()  # More may be pending; re-check every file next time
+                    break
+            self.offsets[run] = offset
+            if max_records is not None and len(new_records) >= max_records:
+                break
+        return new_records
+
+    def follow(self, interval: float = 1.0, stop_event: Optional[threading.Event] = None):
+        """
+        Yield results as they are written (blocking generator).
+
+        Args:
+            interval: Seconds between polls of the files
+            stop_event: Event that ends the generator when set
+        """
+        while stop_event is None or not stop_event.is_set():
+            for record in self.poll():
+                yield record
+            time.sleep(interval)
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    # Print results of every simulation run as they are written
+    from Repository.Manufacturing_Simulation import OUTPUT_DIR
+
+    tail = ResultsTail(OUTPUT_DIR, from_start=False)
+    print(f"Following results in {OUTPUT_DIR} (Ctrl+C to stop)")
+    try:
+        for result in tail.follow():
+            print(f"{result.get('wafer_id')}: {result.get('quality_status')} "
+                  f"({result.get('defect_percentage', 0):.2f}% defects)")
+    except KeyboardInterrupt:
+        pass
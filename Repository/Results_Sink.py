@@ -0,0 +1,294 @@
+"""
+Sharded Results Sink for the Manufacturing Simulation
+Writes wafer results into numbered, size/time-rotated JSON shards described by a small manifest
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+# Rotate to a new shard when any of these limits is reached (None disables a limit)
+RESULTS_SHARD_MAX_RECORDS = 500
+RESULTS_SHARD_MAX_BYTES = 8 * 1024 * 1024
+RESULTS_SHARD_MAX_SECONDS = 3600
+
+MANIFEST_VERSION = 1
+
+
+def atomic_write_json(file_path: Path, data, fsync: bool = True, **json_kwargs) -> int:
+    """
+    Write JSON to a file atomically (write to a temporary file, then rename over the target).
+
+    Readers see either the previous or the new content, never a partial file, even if the
+    process is stopped in the middle of the write.
+
+    Args:
+        file_path: Destination file
+        data: JSON-serializable data
+        fsync: Flush the data to disk before the rename (durable against power loss)
+        **json_kwargs: Extra arguments for json.dump (e.g. indent)
+
+    Returns:
+        Size of the written file in bytes
+    """
+    file_path = Path(file_path)
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, **json_kwargs)
+        size = f.tell()
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    return size
+
+
+def fsync_file(file_path: Path):
+    """Flush a file already written to disk (durable against power loss)."""
+    with open(file_path, 'r+b') as f:
+        os.fsync(f.fileno())
+
+
+def manifest_path(output_dir: Path, run_id: str) -> Path:
+    """Get the manifest file of a run."""
+    return Path(output_dir) / f"manifest_{run_id}.json"
+
+
+def shard_path(output_dir: Path, run_id: str, index: int) -> Path:
+    """Get the file of a numbered shard (matches the results_*.json pattern)."""
+    return Path(output_dir) / f"results_{run_id}_part{index:04d}.json"
+
+
+def load_manifest(file_path: Path) -> Optional[Dict]:
+    """
+    Load a manifest file.
+
+    Args:
+        file_path: Manifest file
+
+    Returns:
+        Manifest dictionary, or None if it cannot be read
+    """
+    try:
+        with open(file_path, 'r') as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) and "shards" in manifest else None
+    except (OSError, ValueError):
+        return None
+
+
+def shard_matches(shard: Dict, simulation_date: Optional[str] = None,
+                  start_time: Optional[str] = None, end_time: Optional[str] = None) -> bool:
+    """
+    Check whether a shard may contain records matching the filters.
+
+    Shards that are still open (not closed) always match because their metadata
+    in the manifest may be stale.
+
+    Args:
+        shard: Shard entry from a manifest
+        simulation_date: Required simulation date (YYYY-MM-DD)
+        start_time: Inclusive lower bound on the record timestamp (ISO format)
+        end_time: Inclusive upper bound on the record timestamp (ISO format)
+
+    Returns:
+        False only if the shard can be skipped entirely
+    """
+    if not shard.get("closed"):
+        return True
+    if simulation_date and simulation_date not in shard.get("simulation_dates", []):
+        return False
+    if start_time and shard.get("max_timestamp") and shard["max_timestamp"] < start_time:
+        return False
+    if end_time and shard.get("min_timestamp") and shard["min_timestamp"] > end_time:
+        return False
+    return True
+
+
+# ------------------------------------------------------------------------------------------
+# Sharded Results Sink
+# ------------------------------------------------------------------------------------------
+class ShardedResultsSink:
+    """
+    Appends wafer results to rotating JSON shard files.
+
+    Each shard is a JSON list (the same format as a classic results file), so only the
+    current shard is rewritten on append. The manifest records per-shard record counts,
+    sizes, min/max timestamps and simulation dates so readers can skip whole shards.
+    Every write goes to a temporary file that is renamed into place, so a shard or manifest
+    is never left half-written. Shards are flushed to disk (fsync) when they are closed, on
+    rotation and on close(), not on every append: appends run on the machines' hot path.
+    Not thread-safe: callers serialize access (the controller holds results_lock).
+    """
+
+    def __init__(self, output_dir: Path, run_id: str,
+                 max_records: Optional[int] = RESULTS_SHARD_MAX_RECORDS,
+                 max_bytes: Optional[int] = RESULTS_SHARD_MAX_BYTES,
+                 max_seconds: Optional[float] = RESULTS_SHARD_MAX_SECONDS,
+                 fsync: bool = True, fsync_every_write: bool = False):
+        """
+        Initialize the sink.
+
+        Args:
+            output_dir: Directory for shards and manifest
+            run_id: Run identifier used in file names
+            max_records: Rotate after this many records per shard
+            max_bytes: Rotate once a shard file reaches this size
+            max_seconds: Rotate once a shard has been open this long
+            fsync: fsync a shard and the manifest when the shard is closed
+            fsync_every_write: Also fsync every append (each wafer waits for the disk)
+        """
+        self.output_dir = Path(output_dir)
+        self.run_id = run_id
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.fsync = fsync
+        self.fsync_every_write = fsync and fsync_every_write
+        self.manifest_file = manifest_path(self.output_dir, run_id)
+        self.shards = []
+        self.total_records = 0
+        self._records = []
+        self._dates = set()
+        self._opened_at = None
+
+    @property
+    def current_shard(self) -> Optional[Dict]:
+        """Manifest entry of the open shard, if any."""
+        if self.shards and not self.shards[-1]["closed"]:
+            return self.shards[-1]
+        return None
+
+    @property
+    def current_path(self) -> Path:
+        """File of the open shard (or of the next shard to be opened)."""
+        shard = self.current_shard
+        index = shard["index"] if shard else len(self.shards) + 1
+        return shard_path(self.output_dir, self.run_id, index)
+
+    def _should_rotate(self) -> bool:
+        """Check whether the open shard reached one of its limits."""
+        shard = self.current_shard
+        if shard is None:
+            return False
+        if self.max_records and shard["records"] >= self.max_records:
+            return True
+        if self.max_bytes and shard["bytes"] >= self.max_bytes:
+            return True
+        if self.max_seconds and time.monotonic() - self._opened_at >= self.max_seconds:
+            return True
+        return False
+
+    def _open_shard(self):
+        """Start a new shard and register it in the manifest."""
+        index = len(self.shards) + 1
+        self.shards.append({
+            "index": index,
+            "file": shard_path(self.output_dir, self.run_id, index).name,
+            "records": 0,
+            "bytes": 0,
+            "min_timestamp": None,
+            "max_timestamp": None,
+            "simulation_dates": [],
+            "opened_at": datetime.now().isoformat(),
+            "closed": False
+        })
+        self._records = []
+        self._dates = set()
+        self._opened_at = time.monotonic()
+        self._write_manifest()
+
+    def _close_shard(self):
+        """Mark the open shard as closed in the manifest."""
+        shard = self.current_shard
+        if shard is None:
+            return
+        if self.fsync and self.current_path.exists():
+            fsync_file(self.current_path)
+        shard["closed"] = True
+        shard["closed_at"] = datetime.now().isoformat()
+        self._records = []
+        self._write_manifest(self.fsync)
+
+    def _write_shard(self):
+        """Atomically rewrite the open shard file."""
+        self.current_shard["bytes"] = atomic_write_json(self.current_path, self._records,
+                                                        self.fsync_every_write, indent=2)
+
+    def _write_manifest(self, fsync: Optional[bool] = None):
+        """Rewrite the manifest file (fsync: None to fsync only when every write is)."""
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "run_id": self.run_id,
+            "total_records": self.total_records,
+            "shards": self.shards
+        }
+        atomic_write_json(self.manifest_file, manifest,
+                          self.fsync_every_write if fsync is None else fsync, indent=2)
+
+    def _add_record(self, result: Dict):
+        """Add one result to the open shard and update its manifest entry (no file write)."""
+        shard = self.current_shard
+        self._records.append(result)
+        self.total_records += 1
+        shard["records"] += 1
+
+        timestamp = result.get("timestamp")
+        if timestamp:
+            if shard["min_timestamp"] is None or timestamp < shard["min_timestamp"]:
+                shard["min_timestamp"] = timestamp
+            if shard["max_timestamp"] is None or timestamp > shard["max_timestamp"]:
+                shard["max_timestamp"] = timestamp
+        sim_date = result.get("simulation_date")
+        if sim_date and sim_date not in self._dates:
+            self._dates.add(sim_date)
+            shard["simulation_dates"] = sorted(self._dates)
+
+    def append(self, result: Dict):
+        """
+        Append one wafer result, rotating to a new shard when a limit is reached.
+
+        Args:
+            result: Wafer result dictionary
+        """
+        if self._should_rotate():
+            self._close_shard()
+        if self.current_shard is None:
+            self._open_shard()
+        self._add_record(result)
+        self._write_shard()
+
+    def append_many(self, results: List[Dict]):
+        """
+        Append a batch of results, writing each affected shard once (bulk imports).
+
+        Args:
+            results: Wafer result dictionaries
+        """
+        i = 0
+        while i < len(results):
+            if self._should_rotate():
+                self._close_shard()
+            if self.current_shard is None:
+                self._open_shard()
+            room = len(results) - i
+            if self.max_records:
+                room = min(room, self.max_records - self.current_shard["records"])
+            for result in results[i:i + room]:
+                self._add_record(result)
+            i += room
+            self._write_shard()
+
+    def close(self):
+        """Close the open shard and write the final manifest."""
+        self._close_shard()
+
+    def list_files(self) -> List[Path]:
+        """Get all shard files written so far."""
+        return [self.output_dir / shard["file"] for shard in self.shards]
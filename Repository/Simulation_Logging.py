@@ -0,0 +1,194 @@
+"""
+Asynchronous Logging for the Manufacturing Simulation
+Moves log I/O off the machine threads with a QueueHandler/QueueListener pipeline,
+batches disk writes, writes structured per-wafer events and samples them on the console
+"""
+
+import atexit
+import json
+import logging
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from queue import SimpleQueue
+from typing import Optional
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Flush the log files after this many records or seconds, whichever comes first
+LOG_BATCH_SIZE = 200
+LOG_FLUSH_INTERVAL = 1.0
+
+# Show 1 out of every N per-wafer events on the console (1 = show all)
+CONSOLE_WAFER_SAMPLE_RATE = 1
+
+# Name of the LogRecord attribute carrying a structured per-wafer event
+WAFER_EVENT_ATTR = "wafer_event"
+
+_queue_handler = None
+_listener = None
+_listener_handlers = []
+
+
+# ------------------------------------------------------------------------------------------
+# Handlers, Filters and Formatters
+# ------------------------------------------------------------------------------------------
+class BatchingFileHandler(logging.FileHandler):
+    """File handler that flushes in batches instead of after every record."""
+
+    def __init__(self, filename, batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL, encoding: str = "utf-8"):
+        """
+        Initialize the handler.
+
+        Args:
+            filename: Log file path
+            batch_size: Flush after this many buffered records
+            flush_interval: Flush when this many seconds passed since the last flush
+            encoding: File encoding
+        """
+        super().__init__(str(filename), encoding=encoding)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord):
+        """Write the record and flush only when a batch is complete (or on warnings/errors)."""
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if (record.levelno >= logging.WARNING
+                    or self._pending >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """Flush buffered records to disk."""
+        super().flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+
+class WaferEventFilter(logging.Filter):
+    """Passes only records that carry a structured per-wafer event."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return hasattr(record, WAFER_EVENT_ATTR)
+
+
+class WaferEventFormatter(logging.Formatter):
+    """Formats per-wafer events as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "time": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            **getattr(record, WAFER_EVENT_ATTR)
+        }
+        return json.dumps(event, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Passes 1 out of every N per-wafer events; other records always pass."""
+
+    def __init__(self, sample_rate: int = CONSOLE_WAFER_SAMPLE_RATE):
+        """
+        Initialize the filter.
+
+        Args:
+            sample_rate: Keep one out of every sample_rate per-wafer events
+        """
+        super().__init__()
+        self.sample_rate = max(1, int(sample_rate))
+        self._seen = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, WAFER_EVENT_ATTR) or record.levelno >= logging.WARNING:
+            return True
+        self._seen += 1  # Only the listener thread calls this, so no lock is needed
+        return (self._seen - 1) % self.sample_rate == 0
+
+
+# ------------------------------------------------------------------------------------------
+# Setup
+# ------------------------------------------------------------------------------------------
+def configure_logging(log_file: Path, events_file: Optional[Path] = None, level: int = logging.INFO,
+                      console_sample_rate: int = CONSOLE_WAFER_SAMPLE_RATE,
+                      batch_size: int = LOG_BATCH_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL):
+    """
+    Route all logging through a queue to a background listener thread.
+
+    Calling this again replaces the previous configuration. Handlers already on the root
+    logger (e.g. from logging.basicConfig()) are removed, so records are not also written
+    synchronously and unsampled.
+
+    Args:
+        log_file: Text log file
+        events_file: JSON-lines file for structured per-wafer events (None to disable)
+        level: Root log level
+        console_sample_rate: Show 1 out of every N per-wafer events on the console
+        batch_size: Flush the log files after this many records
+        flush_interval: Flush the log files after this many seconds
+    """
+    global _queue_handler, _listener, _listener_handlers
+    shutdown_logging()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = BatchingFileHandler(log_file, batch_size, flush_interval)
+    file_handler.setFormatter(formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    console_handler.addFilter(SamplingFilter(console_sample_rate))
+
+    handlers = [file_handler, console_handler]
+    if events_file is not None:
+        events_handler = BatchingFileHandler(events_file, batch_size, flush_interval)
+        events_handler.setFormatter(WaferEventFormatter())
+        events_handler.addFilter(WaferEventFilter())
+        handlers.append(events_handler)
+
+    log_queue = SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener_handlers = handlers
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    _listener.start()
+
+
+def is_logging_configured() -> bool:
+    """Check whether configure_logging() is in effect."""
+    return _listener is not None
+
+
+def shutdown_logging():
+    """Drain the log queue, flush and close the handlers (safe to call repeatedly)."""
+    global _queue_handler, _listener, _listener_handlers
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()  # Processes everything still queued before returning
+        _listener = None
+    for handler in _listener_handlers:
+        handler.flush()
+        handler.close()
+    _listener_handlers = []
+
+
+atexit.register(shutdown_logging)
@@ -3,26 +3,21 @@ Summary Generator for Manufacturing Reports
 Generates formatted summaries and reports with LLM enhancement
 """
 
+import importlib.util
 import json
 import os
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from Repository.config_LLM import SUMMARIES_DIR, REPORTS_DIR, PDF_REPORTS_DIR, OPENAI_MODEL, PROCESSED_IMAGES_DIR
+from Repository.config_LLM import SUMMARIES_DIR, REPORTS_DIR, PDF_REPORTS_DIR, PROCESSED_IMAGES_DIR
 from Repository.Data_Aggregator import DataAggregator
 from Repository.LLM_Monitoring_Agent import LLMMonitoringAgent
 from Repository.MultiPhysics_Knowledge_Base import explain_defect, get_defect_info, get_recommendations
 
-# PDF generation imports
-try:
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import inch
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+# PDF generation (reportlab is imported when a PDF is generated, not at import time)
+REPORTLAB_AVAILABLE = importlib.util.find_spec("reportlab") is not None
+if not REPORTLAB_AVAILABLE:
     print("Warning: reportlab not installed. PDF generation will be unavailable.")
     print("Install with: pip install reportlab")
 
@@ -30,16 +25,21 @@ except ImportError:
 class SummaryGenerator:
     """Generates formatted summaries and reports."""
     
-    def __init__(self):
-        """Initialize the summary generator."""
-        self.aggregator = DataAggregator()
-        self.llm_agent = None  # Initialize on demand
+    def __init__(self, aggregator: Optional[DataAggregator] = None):
+        """
+        Initialize the summary generator.
+        
+        Args:
+            aggregator: Data aggregator to share with other components (default: a new one)
+        """
+        self.aggregator = aggregator or DataAggregator()
+        self.llm_agent = None  # Initialize on demand, sharing the aggregator
         
     def _get_llm_agent(self) -> LLMMonitoringAgent:
         """Get or create LLM agent."""
         if self.llm_agent is None:
             try:
-                self.llm_agent = LLMMonitoringAgent()
+                self.llm_agent = LLMMonitoringAgent(aggregator=self.aggregator)
             except Exception as e:
                 print(f"Warning: Could not initialize LLM agent: {e}")
                 print("Generating summary without LLM enhancement...")
@@ -55,7 +55,18 @@ class SummaryGenerator:
         Returns:
             Formatted text summary
         """
-        self.aggregator.load_results()
+        # Start the LLM analysis first so it runs while the statistics below are computed
+        llm_future = None
+        llm_error = None
+        if use_llm:
+            try:
+                agent = self._get_llm_agent()
+                if agent:
+                    llm_future = agent.submit_daily_summary()
+            except Exception as e:
+                llm_error = e
+        
+        self.aggregator.refresh()
         
         summary = "="*70 + "\n"
         summary += "MANUFACTURING PROCESS SUMMARY REPORT\n"
@@ -106,17 +117,17 @@ class SummaryGenerator:
             summary += "\n"
         
         # LLM-enhanced analysis
-        if use_llm:
+        if llm_future is not None:
             try:
-                agent = self._get_llm_agent()
-                if agent:
-                    summary += "="*70 + "\n"
-                    summary += "AI-ENHANCED ANALYSIS\n"
-                    summary += "="*70 + "\n\n"
-                    llm_summary = agent.generate_daily_summary()
-                    summary += llm_summary + "\n"
+                summary += "="*70 + "\n"
+                summary += "AI-ENHANCED ANALYSIS\n"
+                summary += "="*70 + "\n\n"
+                llm_summary = llm_future.result()
+                summary += llm_summary + "\n"
             except Exception as e:
                 summary += f"\nNote: LLM enhancement unavailable ({e})\n"
+        elif llm_error is not None:
+            summary += f"\nNote: LLM enhancement unavailable ({llm_error})\n"
         
         return summary
     
@@ -127,7 +138,7 @@ class SummaryGenerator:
         Returns:
             Dictionary with summary data
         """
-        self.aggregator.load_results()
+        self.aggregator.refresh()
         
         summary = {
             "timestamp": datetime.now().isoformat(),
@@ -165,6 +176,7 @@ class SummaryGenerator:
             filename = f"summary_{timestamp}.txt"
         
         filepath = SUMMARIES_DIR / filename
+        filepath.parent.mkdir(parents=True, exist_ok=True)
         
         summary_text = self.generate_text_summary(use_llm=use_llm)
         
@@ -189,6 +201,7 @@ class SummaryGenerator:
             filename = f"report_{timestamp}.json"
         
         filepath = REPORTS_DIR / filename
+        filepath.parent.mkdir(parents=True, exist_ok=True)
         
         summary_json = self.generate_json_summary()
         
@@ -208,7 +221,7 @@ class SummaryGenerator:
         Returns:
             Formatted analysis report
         """
-        self.aggregator.load_results()
+        self.aggregator.refresh()
         
         report = "="*70 + "\n"
         report = f"DETAILED ANALYSIS: {defect_class.upper()} DEFECTS\n"
@@ -384,7 +397,7 @@ class SummaryGenerator:
             Dictionary with LLM summary or fallback summary
         """
         agent = self._get_llm_agent()
-        if not agent or not agent.client:
+        if not agent or not agent.client or not agent.llm_client:
             # Use fallback summary
             return self._generate_fallback_summary(batch_stats)
         
@@ -402,16 +415,9 @@ Do NOT wrap output in ``` fences."""
         user_prompt = f"Batch statistics JSON:\n{json.dumps(batch_stats, indent=2)}"
         
         try:
-            response = agent.client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
-            cleaned = self._clean_llm_output(response.choices[0].message.content)
+            # Shared client: rate-limited, and 429/5xx responses are retried before falling back
+            response = agent.llm_client.complete_sync(user_prompt, system_prompt, temperature=0.3, max_tokens=1000)
+            cleaned = self._clean_llm_output(response)
             return json.loads(cleaned)
         except Exception as e:
             error_str = str(e)
@@ -442,27 +448,20 @@ Do NOT wrap output in ``` fences."""
         """
         if not REPORTLAB_AVAILABLE:
             raise ImportError("reportlab is not installed. Install with: pip install reportlab")
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import inch
         
-        self.aggregator.load_results()
-        
-        # Filter data by simulation date if provided
+        # Load data of the simulation date only (skipping shards of other dates) if provided
         if simulation_date:
-            filtered_data = self.aggregator.filter_by_simulation_date(simulation_date)
+            filtered_data = self.aggregator.load_simulation_date(simulation_date).data
             if not filtered_data:
                 raise ValueError(f"No data found for simulation date: {simulation_date}")
-            # Create temporary aggregator with filtered data
-            temp_aggregator = DataAggregator()
-            temp_aggregator.data = filtered_data
-            if filtered_data:
-                import pandas as pd
-                temp_aggregator.df = pd.DataFrame(filtered_data)
-                if 'timestamp' in temp_aggregator.df.columns:
-                    temp_aggregator.df['timestamp'] = pd.to_datetime(temp_aggregator.df['timestamp'])
             records_sorted = sorted(filtered_data, key=lambda r: r.get("timestamp", ""))
-            data_source = temp_aggregator
         else:
+            self.aggregator.refresh()
             records_sorted = sorted(self.aggregator.data, key=lambda r: r.get("timestamp", ""))
-            data_source = self.aggregator
         
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -470,6 +469,7 @@ Do NOT wrap output in ``` fences."""
             filename = f"batch_report{date_suffix}_{timestamp}.pdf"
         
         filepath = PDF_REPORTS_DIR / filename
+        filepath.parent.mkdir(parents=True, exist_ok=True)
         
         # Initialize PDF document
         styles = getSampleStyleSheet()
@@ -0,0 +1,236 @@
+"""
+Synthetic Wafer-Map Generator
+Procedurally renders wafer maps of the 9 defect patterns with vectorized NumPy, in the
+green wafer / yellow defect color scheme DefectCounter expects. Used as an alternative image
+source for WaferImageGenerator, so load tests are not limited by the test dataset.
+"""
+
+import random
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+# ------------------------------------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------------------------------------
+DEFECT_PATTERNS = ['Center', 'Donut', 'Edge-Loc', 'Edge-Ring', 'Local',
+                   'Near-Full', 'Normal', 'Random', 'Scratch']
+
+WAFER_IMAGE_SIZE = 256
+WAFER_DIES_PER_SIDE = 64  # Die grid resolution; each die is drawn as a block of pixels
+WAFER_RADIUS = 0.9  # Wafer radius as a fraction of half the image size
+JPEG_QUALITY = 95
+
+# BGR colors, chosen well inside DefectCounter's HSV ranges so JPEG artifacts stay in range
+# (green: H 35-85, yellow: H 20-30, both S/V >= 100)
+BACKGROUND_COLOR = (60, 20, 40)   # Dark purple outside the wafer (counted as neither)
+WAFER_COLOR = (60, 160, 34)       # Green wafer area (H ~67)
+DEFECT_COLOR = (20, 215, 250)     # Yellow defect dies (H ~25)
+
+# Source images drawn from the generator are identified as "synthetic:<pattern>:<seed>"
+SYNTHETIC_SOURCE_PREFIX = "synthetic:"
+
+
+def is_synthetic_source(source_image: Optional[str]) -> bool:
+    """Check whether a source image refers to a synthetic wafer rather than a dataset file."""
+    return bool(source_image) and source_image.startswith(SYNTHETIC_SOURCE_PREFIX)
+
+
+def synthetic_source(pattern: str, seed: int) -> str:
+    """Build the source image identifier of a synthetic wafer."""
+    return f"{SYNTHETIC_SOURCE_PREFIX}{pattern}:{seed}"
+
+
+def parse_synthetic_source(source_image: str) -> Tuple[str, int]:
+    """
+    Split a synthetic source image identifier.
+
+    Args:
+        source_image: Identifier built by synthetic_source()
+
+    Returns:
+        Tuple (pattern, seed)
+    """
+    pattern, seed = source_image[len(SYNTHETIC_SOURCE_PREFIX):].rsplit(":", 1)
+    if pattern not in DEFECT_PATTERNS:
+        raise ValueError(f"Unknown defect pattern: {pattern}")
+    return pattern, int(seed)
+
+
+# ------------------------------------------------------------------------------------------
+# Generator Class
+# ------------------------------------------------------------------------------------------
+class SyntheticWaferGenerator:
+    """
+    Renders synthetic wafer maps.
+
+    The die grid (polar coordinates and wafer mask) is computed once; each pattern is then a
+    handful of whole-array comparisons on it, and the image is a palette lookup of the die
+    labels scaled up to pixel blocks (solid blocks survive JPEG compression with their colors).
+    A (pattern, seed) pair always renders the same image, so synthetic workloads can be
+    recorded and replayed like dataset ones.
+    """
+
+    def __init__(self, size: int = WAFER_IMAGE_SIZE, dies_per_side: int = WAFER_DIES_PER_SIDE):
+        """
+        Initialize the generator.
+
+        Args:
+            size: Image width and height in pixels
+            dies_per_side: Number of dies across the image
+        """
+        self.size = size
+        self.dies_per_side = dies_per_side
+        self.die_pitch = 2.0 / dies_per_side
+        coords = (np.arange(dies_per_side, dtype=np.float32) + 0.5) * self.die_pitch - 1  # Die centers in [-1, 1]
+        self.y, self.x = np.meshgrid(coords, coords, indexing='ij')
+        self.r = np.hypot(self.x, self.y) / WAFER_RADIUS  # 1.0 at the wafer edge
+        self.theta = np.arctan2(self.y, self.x)
+        self.wafer = self.r <= 1.0
+        self.palette = np.array([BACKGROUND_COLOR, WAFER_COLOR, DEFECT_COLOR], dtype=np.uint8)
+        self._wafer_labels = self.wafer.astype(np.uint8)
+        self._patterns = {
+            'Center': self._center,
+            'Donut': self._donut,
+            'Edge-Loc': self._edge_loc,
+            'Edge-Ring': self._edge_ring,
+            'Local': self._local,
+            'Near-Full': self._near_full,
+            'Normal': self._normal,
+            'Random': self._random,
+            'Scratch': self._scratch,
+        }
+
+    # --------------------------------------------------------------------------------------
+    # Pattern Masks (True where a die is defective)
+    # --------------------------------------------------------------------------------------
+    def _fill(self, rng: np.random.Generator, region: np.ndarray, density: float) -> np.ndarray:
+        """Mark a random fraction of a region as defective (dies fail independently)."""
+        return region & (rng.random(region.shape, dtype=np.float32) < density)
+
+    def _center(self, rng: np.random.Generator) -> np.ndarray:
+        radius = rng.uniform(0.2, 0.4) * (1 + 0.08 * np.sin(3 * self.theta + rng.uniform(0, 2 * np.pi)))
+        return self._fill(rng, self.r < radius, rng.uniform(0.75, 0.95))
+
+    def _donut(self, rng: np.random.Generator) -> np.ndarray:
+        inner = rng.uniform(0.25, 0.45)
+        outer = inner + rng.uniform(0.15, 0.3)
+        return self._fill(rng, (self.r > inner) & (self.r < outer), rng.uniform(0.7, 0.9))
+
+    def _edge_loc(self, rng: np.random.Generator) -> np.ndarray:
+        angle = np.angle(np.exp(1j * (self.theta - rng.uniform(-np.pi, np.pi))))  # Wrapped to [-pi, pi]
+        region = (self.r > rng.uniform(0.7, 0.85)) & (np.abs(angle) < rng.uniform(0.3, 0.8))
+        return self._fill(rng, region, rng.uniform(0.7, 0.9))
+
+    def _edge_ring(self, rng: np.random.Generator) -> np.ndarray:
+        return self._fill(rng, self.r > rng.uniform(0.82, 0.92), rng.uniform(0.75, 0.95))
+
+    def _local(self, rng: np.random.Generator) -> np.ndarray:
+        region = np.zeros_like(self.wafer)
+        cr, ca = rng.uniform(0.2, 0.65), rng.uniform(-np.pi, np.pi)
+        cx, cy = cr * WAFER_RADIUS * np.cos(ca), cr * WAFER_RADIUS * np.sin(ca)
+        for _ in range(rng.integers(1, 4)):  # A cluster of 1-3 overlapping blobs
+            bx, by = cx + rng.normal(0, 0.06), cy + rng.normal(0, 0.06)
+            region |= np.hypot(self.x - bx, self.y - by) < rng.uniform(0.06, 0.16)
+        return self._fill(rng, region, rng.uniform(0.75, 0.95))
+
+    def _near_full(self, rng: np.random.Generator) -> np.ndarray:
+        return self._fill(rng, self.wafer, rng.uniform(0.8, 0.97))
+
+    def _normal(self, rng: np.random.Generator) -> np.ndarray:
+        return self._fill(rng, self.wafer, rng.uniform(0.0, 0.01))
+
+    def _random(self, rng: np.random.Generator) -> np.ndarray:
+        return self._fill(rng, self.wafer, rng.uniform(0.15, 0.5))
+
+    def _scratch(self, rng: np.random.Generator) -> np.ndarray:
+        # Slightly curved line segment: distance across the line with a quadratic bend along it
+        angle = rng.uniform(0, np.pi)
+        x0, y0 = rng.uniform(-0.4, 0.4, size=2)
+        along = (self.x - x0) * np.cos(angle) + (self.y - y0) * np.sin(angle)
+        across = -(self.x - x0) * np.sin(angle) + (self.y - y0) * np.cos(angle)
+        across = across - rng.uniform(-0.4, 0.4) * along ** 2
+        width = rng.uniform(0.5, 1.0) * self.die_pitch
+        region = (np.abs(across) < width) & (np.abs(along) < rng.uniform(0.3, 0.7))
+        return self._fill(rng, region, rng.uniform(0.85, 1.0))
+
+    # --------------------------------------------------------------------------------------
+    # Rendering
+    # --------------------------------------------------------------------------------------
+    def render(self, pattern: str, seed: int) -> np.ndarray:
+        """
+        Render one wafer map.
+
+        Args:
+            pattern: Defect pattern (one of DEFECT_PATTERNS)
+            seed: Seed for the pattern's random parameters and die failures
+
+        Returns:
+            BGR image as a (size, size, 3) uint8 array
+        """
+        import cv2  # Deferred so importing the simulation does not load OpenCV
+        if pattern not in self._patterns:
+            raise ValueError(f"Unknown defect pattern: {pattern}")
+        rng = np.random.default_rng(seed)
+        labels = self._wafer_labels.copy()
+        labels[self._patterns[pattern](rng) & self.wafer] = 2
+        return cv2.resize(self.palette[labels], (self.size, self.size), interpolation=cv2.INTER_NEAREST)
+
+    def write(self, source_image: str, output_path: str) -> bool:
+        """
+        Render a synthetic source image and save it as a JPEG.
+
+        Args:
+            source_image: Identifier built by synthetic_source()
+            output_path: Destination file
+
+        Returns:
+            True if the image was written
+        """
+        import cv2
+        pattern, seed = parse_synthetic_source(source_image)
+        return cv2.imwrite(output_path, self.render(pattern, seed), [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+
+    def select_source(self, normal_probability: float = 0.7, rng: Optional[random.Random] = None) -> str:
+        """
+        Draw a synthetic source image, with the same Normal bias as the dataset source.
+
+        Args:
+            normal_probability: Probability of drawing a Normal wafer
+            rng: Random generator to draw from (default: the global ``random`` module)
+
+        Returns:
+            Synthetic source image identifier
+        """
+        rng = rng or random
+        if rng.random() < normal_probability:
+            pattern = 'Normal'
+        else:
+            pattern = rng.choice([p for p in DEFECT_PATTERNS if p != 'Normal'])
+        return synthetic_source(pattern, rng.getrandbits(32))
+
+
+# ------------------------------------------------------------------------------------------
+# Main Entry Point
+# ------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    import cv2
+
+    # Measure rendering throughput per pattern (in memory and with JPEG encoding)
+    generator = SyntheticWaferGenerator()
+    count = 500
+    rates = {}
+    for pattern in DEFECT_PATTERNS:
+        start = time.perf_counter()
+        for seed in range(count):
+            generator.render(pattern, seed)
+        render_rate = count / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for seed in range(count):
+            cv2.imencode(".jpg", generator.render(pattern, seed), [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        rates[pattern] = (render_rate, count / (time.perf_counter() - start))
+
+    print(f"{'Pattern':12s} {'render/s':>10s} {'render+jpeg/s':>14s}")
+    for pattern, (render_rate, encode_rate) in rates.items():
+        print(f"{pattern:12s} {render_rate:10.0f} {encode_rate:14.0f}")
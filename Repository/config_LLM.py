@@ -14,6 +14,10 @@ from pathlib import Path
 OPENAI_API_KEY = os.getenv("ReplaceAPIKeyHere")  # Set via environment variable or replace with your key
 OPENAI_MODEL = "gpt-4.1-mini"  # Options: "gpt-4", "gpt-3.5-turbo", "gpt-4-turbo-preview" , "gpt-4.1-mini"
 
+# API endpoint: None for api.openai.com, or any OpenAI-compatible server, e.g. the local mock
+# (python -m Repository.Mock_LLM_Server) at "http://127.0.0.1:8808/v1"
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
 # ------------------------------------------------------------------------------------------
 # Paths Configuration
 # ------------------------------------------------------------------------------------------
@@ -27,15 +31,11 @@ RESULTS_DIR = MANUFACTURING_OUTPUT_DIR
 PROCESSED_IMAGES_DIR = MANUFACTURING_OUTPUT_DIR / "processed_images"
 LOGS_DIR = MANUFACTURING_OUTPUT_DIR / "logs"
 
-# LLM output directory
+# LLM output directory (created when the first summary/report is saved)
 LLM_OUTPUT_DIR = BASE_DIR / "LLM_Output"
-LLM_OUTPUT_DIR.mkdir(exist_ok=True)
 SUMMARIES_DIR = LLM_OUTPUT_DIR / "summaries"
-SUMMARIES_DIR.mkdir(exist_ok=True)
 REPORTS_DIR = LLM_OUTPUT_DIR / "reports"
-REPORTS_DIR.mkdir(exist_ok=True)
 PDF_REPORTS_DIR = LLM_OUTPUT_DIR / "pdf_reports"
-PDF_REPORTS_DIR.mkdir(exist_ok=True)
 
 # ------------------------------------------------------------------------------------------
 # LLM Agent Configuration
@@ -47,6 +47,32 @@ LLM_TEMPERATURE = 0.3  # Lower for more consistent, technical responses
 # Maximum tokens for responses
 MAX_TOKENS = 2000
 
+# Response cache: identical prompts (same question, same data) are answered from disk
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = LLM_OUTPUT_DIR / "cache" / "llm_responses.sqlite"
+LLM_CACHE_TTL_SECONDS = 24 * 3600  # Entry lifetime (None: never expire)
+LLM_CACHE_MAX_ENTRIES = 500  # Least recently used entries are evicted beyond this
+
+# API client: concurrent requests share one connection pool, bounded and rate limited
+LLM_MAX_CONCURRENCY = 4  # Requests in flight at once
+LLM_REQUESTS_PER_SECOND = 2.0  # Token-bucket refill rate
+LLM_RATE_BURST = 4  # Token-bucket capacity (requests that may start back to back)
+LLM_MAX_RETRIES = 4  # Retries of rate-limited (429), overloaded (5xx) or dropped requests
+LLM_BACKOFF_BASE_SECONDS = 0.5  # Exponential backoff: base * 2^attempt, with full jitter
+LLM_BACKOFF_MAX_SECONDS = 20.0
+LLM_REQUEST_TIMEOUT_SECONDS = 60.0
+
+# Prompt data context: compact tables fitted into a token budget (LLM_Context_Builder.py)
+LLM_CONTEXT_TOKEN_BUDGET = 1500  # Maximum tokens of the data embedded in a prompt
+LLM_CONTEXT_MAX_ROWS = 15  # Maximum rows per table (dates, defect classes, machines, anomalies)
+
+# AI assistant conversations (Conversation_Session.py): the data is sent once per conversation as
+# a stable prompt prefix; follow-ups add a rolling summary of earlier turns and the data changes
+CONVERSATION_SUMMARY_TOKEN_BUDGET = 300  # Maximum tokens of the earlier turns' summary
+CONVERSATION_LAST_ANSWER_TOKENS = 200  # The previous answer is kept verbatim up to this size
+CONVERSATION_TURN_SUMMARY_CHARS = 160  # Length of one earlier turn's summary line
+CONVERSATION_REBASE_GROWTH = 0.25  # Re-send the data once it grew by this fraction of its wafers
+
 # System prompt for the LLM agent
 SYSTEM_PROMPT = """You are an AI monitoring agent for semiconductor manufacturing processes. 
 Your role is to analyze wafer defect data, provide insights about multi-physics causes (thermal, mechanical, electrical), 
@@ -80,6 +106,24 @@ SUPPORTED_QUERIES = [
     "comparison"
 ]
 
+# Query types answered by the local answer engine (templated narrative from the statistics and
+# the knowledge base, no LLM call); other types, and deep queries of any type, use the LLM
+LOCAL_ANSWER_QUERY_TYPES = [
+    "machine_performance",
+    "defect_distribution",
+    "anomaly_analysis",
+    "trend_analysis"
+]
+
+# Words that mark a query as deep: it is escalated to the LLM whatever its type
+LLM_ESCALATION_KEYWORDS = [
+    "why", "explain", "in depth", "in-depth", "detailed", "deep", "elaborate",
+    "root cause", "analyze", "analyse", "insight"
+]
+
+# Machines below this pass rate (%) are flagged
+MACHINE_PASS_RATE_ALERT = 80.0
+
 # ------------------------------------------------------------------------------------------
 # Validation
 # ------------------------------------------------------------------------------------------
@@ -5,7 +5,6 @@ Landing Page
 import streamlit as st
 import sys
 from pathlib import Path
-from PIL import Image
 
 # Add Repository to path for imports
 sys.path.insert(0, str(Path(__file__).parent / "Repository"))